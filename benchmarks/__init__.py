@@ -0,0 +1,4 @@
+"""Benchmarks for ReservationService operations and CLI commands.
+
+Run with ``python -m benchmarks``; see ``python -m benchmarks --help``.
+"""
@@ -0,0 +1,59 @@
+import argparse
+import json
+import sys
+
+from infrastructure.config import STORAGE_ENGINES, storage_engine
+from .suite import SIZES, REPEAT, THRESHOLD, compare, run
+
+
+def _sizes(text: str) -> list[int]:
+    return [int(float(s)) for s in text.split(',') if s]
+
+
+def _print_comparison(rows: list[dict]) -> None:
+    for r in rows:
+        flag = '  REGRESSION' if r['regression'] else ''
+        print(f"{r['size']:>8}  {r['operation']:<32} {r['baseline_us']:>12.1f} {r['median_us']:>12.1f}"
+              f" {r['change']:>+8.1%}{flag}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks',
+                                     description='Time service operations and CLI commands.')
+    parser.add_argument('--engine', choices=STORAGE_ENGINES, default=None,
+                        help='storage engine (default: HOTEL_STORAGE or json)')
+    parser.add_argument('--sizes', type=_sizes, default=list(SIZES),
+                        help='comma separated record counts, e.g. 1e2,1e3,1e4')
+    parser.add_argument('--repeat', type=int, default=REPEAT)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--input', help='compare these stored results instead of running')
+    parser.add_argument('--compare', metavar='BASELINE', help='flag regressions against a baseline JSON file')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help='relative slowdown of the median counted as a regression')
+    args = parser.parse_args(argv)
+
+    if args.input:
+        with open(args.input, 'r', encoding='utf-8') as f:
+            results = json.load(f)
+    else:
+        engine = args.engine or storage_engine()
+        results = run(engine, args.sizes, args.repeat, args.seed,
+                      progress=lambda msg: print(msg, file=sys.stderr, flush=True))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    elif not args.compare:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    if not args.compare:
+        return 0
+    with open(args.compare, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    rows = compare(results, baseline, args.threshold)
+    _print_comparison(rows)
+    return 1 if any(r['regression'] for r in rows) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
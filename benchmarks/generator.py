@@ -0,0 +1,55 @@
+"""Deterministic synthetic databases of a configurable size."""
+import random
+from datetime import date, timedelta
+
+from domain.services import ReservationService
+
+ROOM_TYPES = (('standard', 50.0), ('superior', 100.0), ('suite', 200.0))
+CURRENCIES = ('EUR', 'USD', 'GBP', 'CHF')
+FIRST_DAY = date(2020, 1, 1)
+
+
+def counts_for(size: int) -> dict:
+    """Split about ``size`` records between the collections.
+
+    Every client makes one deposit and every reservation one deposit
+    payment; half of the reservations are confirmed, adding a balance
+    payment.
+    """
+    clients = max(1, size // 10)
+    rooms = max(3, size // 50)
+    reservations = size // 4
+    return {'clients': clients, 'rooms': rooms, 'reservations': reservations,
+            'payments': clients + reservations + reservations // 2}
+
+
+def generate(service: ReservationService, clients: int, rooms: int, reservations: int,
+             seed: int = 0) -> dict:
+    """Fill an empty database through the service, in one transaction.
+
+    The same arguments always produce the same clients, rooms and
+    reservations. Returns the ids of what was created.
+    """
+    rng = random.Random(seed)
+    with service.uow:
+        client_ids = []
+        for i in range(clients):
+            client = service.add_client(f"Client {i}", f"client{i}@example.com", f"+33{i:09d}")
+            service.deposit(client.id, 50000, rng.choice(CURRENCIES))
+            client_ids.append(client.id)
+        room_ids = []
+        for i in range(rooms):
+            room_type, price = rng.choice(ROOM_TYPES)
+            room_ids.append(service.add_room(room_type, price, f"{room_type} room {i}").id)
+        next_day = dict.fromkeys(room_ids, 0)
+        reservation_ids = []
+        for i in range(reservations):
+            room_id = room_ids[i % len(room_ids)]
+            nights = rng.randint(1, 7)
+            check_in = (FIRST_DAY + timedelta(days=next_day[room_id])).isoformat()
+            next_day[room_id] += nights + rng.randint(0, 3)
+            reservation = service.add_reservation(rng.choice(client_ids), room_id, check_in, nights)
+            if i % 2 == 0:
+                service.confirm_reservation(reservation.id)
+            reservation_ids.append(reservation.id)
+    return {'clients': client_ids, 'rooms': room_ids, 'reservations': reservation_ids}
@@ -0,0 +1,181 @@
+"""Time service operations and CLI commands on generated databases."""
+import contextlib
+import io
+import os
+import platform
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+from itertools import count
+
+from domain.services import ReservationService
+from infrastructure import cli, db
+from .generator import counts_for, generate
+
+SIZES = (100, 1000, 10000)
+REPEAT = 20
+THRESHOLD = 0.25
+# Bookings made while timing start far after the generated history.
+BENCH_DAY = date(2100, 1, 1)
+
+
+_DATABASE_NAMES = {'sqlite': 'database.sqlite3', 'sharded': 'database.d'}
+
+
+def _database_path(engine: str, directory: str) -> str:
+    return os.path.join(directory, _DATABASE_NAMES.get(engine, 'database.json'))
+
+
+def _stats(samples: list[float]) -> dict:
+    return {
+        'runs': len(samples),
+        'median_us': round(statistics.median(samples) * 1e6, 1),
+        'mean_us': round(statistics.fmean(samples) * 1e6, 1),
+        'min_us': round(min(samples) * 1e6, 1),
+    }
+
+
+def _time(call, repeat: int) -> dict:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        samples.append(time.perf_counter() - start)
+    return _stats(samples)
+
+
+class _Workload:
+    """Valid arguments for repeated calls of each operation."""
+
+    def __init__(self, service: ReservationService, created: dict):
+        self.service = service
+        self.rooms = created['rooms']
+        self.clients = created['clients']
+        self.client = service.add_client('Bench', 'bench@example.com', '0').id
+        service.deposit(self.client, 10 ** 7)
+        self.turn = count()
+        self.emails = (f"bench{i}@example.com" for i in count())
+        self.days = (BENCH_DAY + timedelta(days=3 * i) for i in count())
+        self.booked: list[int] = []
+        self.confirming = iter(self.booked)
+        self.cancelling = iter(self.booked)
+
+    def add_client(self):
+        self.service.add_client('Bench', next(self.emails), '0')
+
+    def deposit(self):
+        self.service.deposit(self.clients[next(self.turn) % len(self.clients)], 10)
+
+    def add_reservation(self):
+        room = self.rooms[next(self.turn) % len(self.rooms)]
+        day = next(self.days).isoformat()
+        self.booked.append(self.service.add_reservation(self.client, room, day, 2).id)
+
+    def confirm_reservation(self):
+        self.service.confirm_reservation(next(self.confirming))
+
+    def cancel_reservation(self):
+        self.service.cancel_reservation(next(self.cancelling))
+
+    def list_rooms(self):
+        self.service.list_rooms()
+
+    def find_available_rooms(self):
+        self.service.find_available_rooms('2020-06-01', 3)
+
+    def cli_commands(self) -> dict:
+        """CLI argument lists, built lazily so each run gets fresh values."""
+        return {
+            'add-client': lambda: ['add-client', '--name', 'Bench', '--email', next(self.emails),
+                                   '--phone', '0'],
+            'deposit': lambda: ['deposit', '--client', str(self.client), '--amount', '10'],
+            'reserve': lambda: ['reserve', '--client', str(self.client), '--room', str(self.rooms[0]),
+                                '--check-in', next(self.days).isoformat(), '--nights', '2'],
+            'list-rooms': lambda: ['list-rooms'],
+            'available-rooms': lambda: ['available-rooms', '--check-in', '2020-06-01', '--nights', '3'],
+            'ledger': lambda: ['ledger', '--client', str(self.client)],
+            'report': lambda: ['report', 'occupancy', '--from', '2020-01-01', '--to', '2020-12-31'],
+        }
+
+
+# Confirm and cancel consume the reservations made by add_reservation.
+OPERATIONS = ('add_client', 'deposit', 'add_reservation', 'confirm_reservation',
+              'cancel_reservation', 'list_rooms', 'find_available_rooms')
+
+
+@contextlib.contextmanager
+def _cli_service(service: ReservationService):
+    """Point the CLI's database facade at service for the duration of the block."""
+    saved = db._service, db._uow
+    db._service, db._uow = service, service.uow
+    try:
+        yield
+    finally:
+        db._service, db._uow = saved
+
+
+def _run_cli(argv: list[str]) -> None:
+    with contextlib.redirect_stdout(io.StringIO()):
+        cli.run(argv)
+
+
+def bench_size(engine: str, size: int, repeat: int = REPEAT, seed: int = 0) -> dict:
+    """Generate a database of about size records and time every operation on it."""
+    counts = counts_for(size)
+    with tempfile.TemporaryDirectory() as directory:
+        service = db.create_service(engine, _database_path(engine, directory))
+        try:
+            start = time.perf_counter()
+            created = generate(service, counts['clients'], counts['rooms'], counts['reservations'], seed)
+            generated = time.perf_counter() - start
+            workload = _Workload(service, created)
+            results = {}
+            for name in OPERATIONS:
+                results[f"service.{name}"] = _time(getattr(workload, name), repeat)
+            with _cli_service(service):
+                for name, argv in workload.cli_commands().items():
+                    results[f"cli.{name}"] = _time(lambda: _run_cli(argv()), repeat)
+        finally:
+            close = getattr(service.uow, 'close', None)
+            if close is not None:
+                close()
+    return {'records': counts, 'generate_s': round(generated, 3), 'operations': results}
+
+
+def run(engine: str, sizes=SIZES, repeat: int = REPEAT, seed: int = 0, progress=None) -> dict:
+    results = {
+        'engine': engine,
+        'python': platform.python_version(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'repeat': repeat,
+        'seed': seed,
+        'sizes': {},
+    }
+    for size in sizes:
+        if progress:
+            progress(f"{engine}: {size} records")
+        results['sizes'][str(size)] = bench_size(engine, size, repeat, seed)
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float = THRESHOLD) -> list[dict]:
+    """Median timings of results against baseline, for every size and operation in both.
+
+    An entry is flagged as a regression when its median grew by more than
+    ``threshold`` (0.25 = 25%).
+    """
+    rows = []
+    for size, current in results['sizes'].items():
+        previous = baseline.get('sizes', {}).get(size)
+        if previous is None:
+            continue
+        for name, timing in current['operations'].items():
+            before = previous['operations'].get(name)
+            if before is None or not before['median_us']:
+                continue
+            change = timing['median_us'] / before['median_us'] - 1
+            rows.append({'size': int(size), 'operation': name, 'baseline_us': before['median_us'],
+                         'median_us': timing['median_us'], 'change': round(change, 3),
+                         'regression': change > threshold})
+    return rows
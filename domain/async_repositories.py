@@ -0,0 +1,108 @@
+"""Asyncio counterparts of the repository interfaces.
+
+Each call is its own transaction. Streaming methods of the synchronous
+interfaces (``history``) return lists here.
+"""
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+
+from .entities import Client, Room, Reservation, Payment
+from .value_objects import Money
+
+
+class ServiceExecutor(ABC):
+    """Runs methods of a synchronous ``ReservationService`` off the event loop."""
+
+    @abstractmethod
+    async def call(self, target: str | None, method: str, *args, write: bool = False):
+        """Return the result of ``method(*args)`` on the service's target repository.
+
+        target names a repository attribute of the service (``'clients'``,
+        ...), or None for the service itself. Iterators are returned as
+        lists. write marks calls that modify the database.
+        """
+        ...
+
+    def close(self) -> None:
+        pass
+
+
+class AsyncClientRepository(ABC):
+    @abstractmethod
+    async def add(self, client: Client) -> None:
+        ...
+
+    @abstractmethod
+    async def get(self, client_id: int) -> Client | None:
+        ...
+
+    @abstractmethod
+    async def find_by_email(self, email: str) -> Client | None:
+        ...
+
+    @abstractmethod
+    async def save(self, client: Client) -> None:
+        ...
+
+
+class AsyncRoomRepository(ABC):
+    @abstractmethod
+    async def add(self, room: Room) -> None:
+        ...
+
+    @abstractmethod
+    async def get(self, room_id: int) -> Room | None:
+        ...
+
+    @abstractmethod
+    async def list(self) -> list[Room]:
+        ...
+
+
+class AsyncReservationRepository(ABC):
+    @abstractmethod
+    async def add(self, reservation: Reservation) -> None:
+        ...
+
+    @abstractmethod
+    async def get(self, reservation_id: int) -> Reservation | None:
+        ...
+
+    @abstractmethod
+    async def list(self) -> list[Reservation]:
+        ...
+
+    @abstractmethod
+    async def remove(self, reservation_id: int) -> None:
+        ...
+
+    @abstractmethod
+    async def save(self, reservation: Reservation) -> None:
+        ...
+
+    @abstractmethod
+    async def find_overlapping(self, room_id: int, check_in: str, nights: int) -> list[Reservation]:
+        ...
+
+
+class AsyncPaymentRepository(ABC):
+    @abstractmethod
+    async def add(self, payment: Payment) -> None:
+        ...
+
+    @abstractmethod
+    async def get(self, payment_id: int) -> Payment | None:
+        ...
+
+    @abstractmethod
+    async def list_for_client(self, client_id: int) -> list[Payment]:
+        ...
+
+    @abstractmethod
+    async def history(self, client_id: int, since: str | None = None) -> list[Payment]:
+        ...
+
+    @abstractmethod
+    async def balance(self, client_id: int, as_of: str | None = None) -> Money:
+        ...
@@ -0,0 +1,158 @@
+"""Asyncio front of ``ReservationService``.
+
+Every method runs the synchronous service method of the same name (one
+transaction) through a ``ServiceExecutor``, so the business rules exist
+only once. Identical reads in flight at the same time are coalesced
+into a single call whose result all callers receive, and share; a read
+started after a mutation completed never joins one started before it.
+Mutations first lock the aggregates they touch (clients, rooms,
+reservations, emails) in a fixed order: concurrent bookings of a room or
+debits of a wallet run one after the other, unrelated ones do not wait
+for each other.
+"""
+import asyncio
+from contextlib import asynccontextmanager
+from functools import partial
+
+from .async_repositories import (
+    AsyncClientRepository,
+    AsyncRoomRepository,
+    AsyncReservationRepository,
+    AsyncPaymentRepository,
+    ServiceExecutor,
+)
+from .entities import Client, Room, Reservation, Payment
+from .value_objects import Money
+
+
+class _KeyedLocks:
+    """asyncio locks created on first use and dropped once nobody holds or awaits them."""
+
+    def __init__(self):
+        self._locks: dict[tuple, list] = {}  # key -> [lock, users]
+
+    @asynccontextmanager
+    async def hold(self, keys):
+        entries = []
+        for key in sorted(set(keys)):
+            entry = self._locks.setdefault(key, [asyncio.Lock(), 0])
+            entry[1] += 1
+            entries.append((key, entry))
+        acquired = []
+        try:
+            for _, entry in entries:
+                await entry[0].acquire()
+                acquired.append(entry[0])
+            yield
+        finally:
+            for lock in acquired:
+                lock.release()
+            for key, entry in entries:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._locks[key]
+
+
+class AsyncReservationService:
+    def __init__(self, executor: ServiceExecutor, client_repo: AsyncClientRepository,
+                 room_repo: AsyncRoomRepository, reservation_repo: AsyncReservationRepository,
+                 payment_repo: AsyncPaymentRepository):
+        self.executor = executor
+        self.clients = client_repo
+        self.rooms = room_repo
+        self.reservations = reservation_repo
+        self.payments = payment_repo
+        self._locks = _KeyedLocks()
+        self._reads: dict[tuple, asyncio.Future] = {}
+        self._writes = 0
+
+    async def _read(self, method: str, *args):
+        key = (self._writes, method, args)
+        future = self._reads.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self.executor.call(None, method, *args))
+            self._reads[key] = future
+            future.add_done_callback(partial(self._read_done, key))
+        # One caller giving up must not cancel the call for the others.
+        return await asyncio.shield(future)
+
+    def _read_done(self, key: tuple, _future) -> None:
+        self._reads.pop(key, None)
+
+    async def _write(self, aggregates, method: str, *args):
+        async with self._locks.hold(aggregates):
+            try:
+                return await self.executor.call(None, method, *args, write=True)
+            finally:
+                self._writes += 1
+
+    async def _reservation_aggregates(self, reservation_id: int) -> list[tuple]:
+        reservation = await self.reservations.get(reservation_id)
+        if reservation is None:
+            raise ValueError("reservation not found")
+        return [('client', reservation.client_id), ('reservation', reservation_id),
+                ('room', reservation.room_id)]
+
+    def close(self) -> None:
+        self.executor.close()
+
+    async def add_client(self, full_name: str, email: str, phone: str) -> Client:
+        return await self._write([('email', email)], 'add_client', full_name, email, phone)
+
+    async def deposit(self, client_id: int, amount: float, currency: str = "EUR") -> float:
+        return await self._write([('client', client_id)], 'deposit', client_id, amount, currency)
+
+    async def payment_history(self, client_id: int, since: str | None = None) -> list[Payment]:
+        return await self._read('payment_history', client_id, since)
+
+    async def wallet_balance(self, client_id: int, as_of: str | None = None) -> Money:
+        return await self._read('wallet_balance', client_id, as_of)
+
+    async def verify_wallet(self, client_id: int) -> bool:
+        return await self._read('verify_wallet', client_id)
+
+    async def add_room(self, room_type: str, price: float, description: str) -> Room:
+        return await self._write([], 'add_room', room_type, price, description)
+
+    async def list_rooms(self) -> list[Room]:
+        return await self._read('list_rooms')
+
+    async def find_available_rooms(self, check_in: str, nights: int) -> list[Room]:
+        return await self._read('find_available_rooms', check_in, nights)
+
+    async def is_room_free(self, room_id: int, check_in: str, nights: int) -> bool:
+        return await self._read('is_room_free', room_id, check_in, nights)
+
+    async def free_days(self, room_id: int, start: str, end: str) -> list[str]:
+        return await self._read('free_days', room_id, start, end)
+
+    async def occupancy_calendar(self, start: str, end: str, room_id: int | None = None,
+                                 room_type: str | None = None) -> list[tuple[Room, int]]:
+        return await self._read('occupancy_calendar', start, end, room_id, room_type)
+
+    async def first_free_window(self, nights: int, after: str, room_id: int | None = None,
+                                room_type: str | None = None) -> tuple[Room, str]:
+        return await self._read('first_free_window', nights, after, room_id, room_type)
+
+    async def occupancy_report(self, start: str, end: str, by: str = 'room') -> dict:
+        return await self._read('occupancy_report', start, end, by)
+
+    async def revenue_report(self, start: str, end: str) -> dict:
+        return await self._read('revenue_report', start, end)
+
+    async def add_reservation(self, client_id: int, room_id: int, check_in: str, nights: int) -> Reservation:
+        return await self._write([('client', client_id), ('room', room_id)],
+                                 'add_reservation', client_id, room_id, check_in, nights)
+
+    async def reserve_group(self, client_id: int, room_ids: list[int], check_in: str,
+                            nights: int) -> list[Reservation]:
+        aggregates = [('client', client_id)] + [('room', room_id) for room_id in room_ids]
+        return await self._write(aggregates, 'reserve_group', client_id, list(room_ids), check_in, nights)
+
+    async def confirm_reservation(self, reservation_id: int) -> None:
+        aggregates = await self._reservation_aggregates(reservation_id)
+        await self._write(aggregates, 'confirm_reservation', reservation_id)
+
+    async def cancel_reservation(self, reservation_id: int) -> None:
+        aggregates = await self._reservation_aggregates(reservation_id)
+        await self._write(aggregates, 'cancel_reservation', reservation_id)
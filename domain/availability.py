@@ -0,0 +1,46 @@
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+
+
+def day_ordinal(check_in: str) -> int:
+    """Return the proleptic Gregorian ordinal of an ISO check-in date."""
+    return datetime.fromisoformat(check_in).toordinal()
+
+
+class IntervalIndex:
+    """Per-room index of reserved ``[check_in, check_out)`` day ordinals.
+
+    The service never lets two reservations of the same room overlap, so
+    once a room's intervals are sorted by check-in their check-outs are
+    sorted too. An overlap query is then a single bisect on the check-outs
+    followed by a walk over the (at most few) matching intervals.
+    """
+
+    def __init__(self):
+        self._rooms: dict[int, tuple[list[int], list[int], list[int]]] = {}
+
+    def add(self, room_id: int, start: int, end: int, reservation_id: int) -> None:
+        starts, ends, ids = self._rooms.setdefault(room_id, ([], [], []))
+        i = bisect_right(starts, start)
+        starts.insert(i, start)
+        ends.insert(i, end)
+        ids.insert(i, reservation_id)
+
+    def remove(self, room_id: int, start: int, reservation_id: int) -> None:
+        starts, ends, ids = self._rooms.get(room_id, ([], [], []))
+        i = bisect_left(starts, start)
+        while i < len(starts) and starts[i] == start:
+            if ids[i] == reservation_id:
+                del starts[i], ends[i], ids[i]
+                return
+            i += 1
+
+    def overlapping(self, room_id: int, start: int, end: int) -> list[int]:
+        """Ids of the reservations of room_id intersecting ``[start, end)``."""
+        starts, ends, ids = self._rooms.get(room_id, ([], [], []))
+        found = []
+        i = bisect_right(ends, start)
+        while i < len(starts) and starts[i] < end:
+            found.append(ids[i])
+            i += 1
+        return found
@@ -0,0 +1,80 @@
+"""Per-room occupancy bitmaps at day granularity.
+
+Each room's booked nights are one Python integer: bit ``i`` is set when
+the night starting on day ordinal ``origin + i`` is reserved. Reserving
+or cancelling a stay sets or clears a run of bits, and every query is a
+few shifts and masks over the requested days instead of a walk over the
+room's reservations.
+"""
+from datetime import date
+
+
+def _mask(nights: int) -> int:
+    return (1 << nights) - 1
+
+
+def _runs(free: int, nights: int) -> int:
+    """Bits of free starting a run of at least nights set bits."""
+    length = 1
+    while length < nights:
+        step = min(length, nights - length)
+        free &= free >> step
+        length += step
+    return free
+
+
+class OccupancyCalendar:
+    def __init__(self):
+        self._rooms: dict[int, list[int]] = {}  # room id -> [origin, bits]
+
+    def _bits(self, room_id: int, start: int) -> int:
+        """The room's bitmap shifted so that bit 0 is day start."""
+        origin, bits = self._rooms.get(room_id, (start, 0))
+        return bits >> (start - origin) if start >= origin else bits << (origin - start)
+
+    def add(self, room_id: int, start: int, end: int) -> None:
+        """Mark the nights of ``[start, end)`` as booked."""
+        room = self._rooms.get(room_id)
+        if room is None:
+            room = self._rooms[room_id] = [start, 0]
+        elif start < room[0]:
+            room[1] <<= room[0] - start
+            room[0] = start
+        room[1] |= _mask(end - start) << (start - room[0])
+
+    def remove(self, room_id: int, start: int, end: int) -> None:
+        room = self._rooms.get(room_id)
+        if room is None:
+            return
+        first = max(start, room[0])
+        if first < end:
+            room[1] &= ~(_mask(end - first) << (first - room[0]))
+
+    def is_free(self, room_id: int, start: int, nights: int) -> bool:
+        return self._bits(room_id, start) & _mask(nights) == 0
+
+    def booked(self, room_id: int, start: int, end: int) -> int:
+        """Bitmap of the booked nights of ``[start, end)``, bit 0 being start."""
+        return self._bits(room_id, start) & _mask(end - start)
+
+    def free_days(self, room_id: int, start: int, end: int) -> list[int]:
+        """Day ordinals of ``[start, end)`` whose night is free."""
+        free = ~self.booked(room_id, start, end) & _mask(end - start)
+        days = []
+        while free:
+            low = free & -free
+            days.append(start + low.bit_length() - 1)
+            free ^= low
+        return days
+
+    def first_free(self, room_id: int, nights: int, after: int) -> int:
+        """First day, on or after after, starting nights free nights in a row."""
+        booked = self._bits(room_id, after)
+        # Every night past the last booking is free, so a run always exists.
+        free = ~booked & _mask(booked.bit_length() + nights)
+        runs = _runs(free, nights)
+        return after + (runs & -runs).bit_length() - 1
+
+
+def iso_day(ordinal: int) -> str:
+    return date.fromordinal(ordinal).isoformat()
@@ -1,45 +1,26 @@
 from dataclasses import dataclass
+from datetime import datetime
 from .value_objects import Money
 
 
-auto_increment_id = {
-    'client': 0,
-    'room': 0,
-    'reservation': 0,
-    'payment': 0,
-}
-
-def _next_id(entity: str) -> int:
-    auto_increment_id[entity] += 1
-    return auto_increment_id[entity]
-
-
-@dataclass
+@dataclass(slots=True)
 class Client:
     full_name: str
     email: str
     phone: str
     wallet: float = 0.0
-    id: int = None
-
-    def __post_init__(self):
-        if self.id is None:
-            self.id = _next_id('client')
+    id: int | None = None
 
 
-@dataclass
+@dataclass(slots=True)
 class Room:
     room_type: str
     price_per_night: Money
     description: str
-    id: int = None
-
-    def __post_init__(self):
-        if self.id is None:
-            self.id = _next_id('room')
+    id: int | None = None
 
 
-@dataclass
+@dataclass(slots=True)
 class Reservation:
     client_id: int
     room_id: int
@@ -47,21 +28,20 @@ class Reservation:
     nights: int
     total_amount: Money
     confirmed: bool = False
-    id: int = None
-
-    def __post_init__(self):
-        if self.id is None:
-            self.id = _next_id('reservation')
+    id: int | None = None
 
 
-@dataclass
+@dataclass(slots=True)
 class Payment:
     client_id: int
     amount: Money
     kind: str
     reservation_id: int | None = None
-    id: int = None
+    created_at: str | None = None
+    id: int | None = None
+    # Euro cents the amount was worth when the payment was recorded (see ``ledger``).
+    eur_minor: int | None = None
 
     def __post_init__(self):
-        if self.id is None:
-            self.id = _next_id('payment')
+        if self.created_at is None:
+            self.created_at = datetime.now().isoformat(timespec='seconds')
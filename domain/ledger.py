@@ -0,0 +1,54 @@
+from .entities import Payment
+from .value_objects import Money, Currency
+
+# Payment standing in for a client's archived payments (see ``balance_forward``).
+BALANCE_FORWARD = 'balance_forward'
+# Payment kinds that credit the wallet; every other kind debits it. The
+# amount of a balance forward is signed.
+CREDIT_KINDS = frozenset({'deposit', BALANCE_FORWARD})
+
+
+def wallet_effect_minor(amount: float, currency: str, kind: str, created_at: str | None = None,
+                        eur_minor: int | None = None) -> int:
+    """Signed change, in euro cents, of the wallet caused by a payment.
+
+    eur_minor is the value stored with the payment when it was recorded.
+    Without it (payments stored before it was kept) the amount is
+    converted at the rates of the payment's day; a payment recorded
+    without a date gets the earliest rates.
+    """
+    if eur_minor is None:
+        eur_minor = Money(amount, currency).convert_to(Currency.EUR, payment_day(created_at)).minor
+    return eur_minor if kind in CREDIT_KINDS else -eur_minor
+
+
+def wallet_effect(payment: Payment) -> Money:
+    return Money.from_minor(wallet_effect_minor(payment.amount.amount, payment.amount.currency,
+                                                payment.kind, payment.created_at, payment.eur_minor))
+
+
+def settle(payment: Payment) -> int:
+    """Fix the euro value of payment at the current rates, unless it already has one.
+
+    Called when a payment is stored, so rates published later do not
+    change what it did to the wallet. Returns the value in cents.
+    """
+    if payment.eur_minor is None:
+        payment.eur_minor = payment.amount.convert_to(Currency.EUR, payment_day(payment.created_at)).minor
+    return payment.eur_minor
+
+
+def payment_day(created_at: str | None) -> str:
+    """Calendar day of a payment; payments recorded without a date sort first."""
+    return (created_at or '')[:10]
+
+
+def balance_forward(payments: list[Payment]) -> Payment:
+    """One EUR payment with the combined wallet effect of payments (of one client).
+
+    It takes the id and date of the newest of them, so it keeps their place
+    in the client's payment order.
+    """
+    newest = max(payments, key=lambda p: p.id)
+    total = sum((wallet_effect(p) for p in payments), Money(0))
+    return Payment(newest.client_id, total, BALANCE_FORWARD, created_at=newest.created_at, id=newest.id)
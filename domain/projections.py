@@ -0,0 +1,40 @@
+"""Lightweight read-only views of stored records.
+
+A repository's ``project(*fields)`` yields one ``RowView`` per record
+instead of an entity. The view references the row the backend already
+holds and exposes only the requested fields (plus ``id``) as attributes,
+with the values as stored: a ``Money`` field gives its amount, and a
+payment's ``currency`` its code. ``hydrate()`` builds the full entity
+for the rows a caller actually needs.
+"""
+
+
+class RowView:
+    __slots__ = ('_row', '_columns', '_hydrate')
+
+    def __init__(self, row, columns: dict[str, str], hydrate):
+        self._row = row
+        self._columns = columns
+        self._hydrate = hydrate
+
+    def __getattr__(self, name: str):
+        try:
+            column = self._columns[name]
+        except KeyError:
+            raise AttributeError(name) from None
+        return self._row[column]
+
+    def hydrate(self):
+        return self._hydrate(self._row)
+
+    def __repr__(self) -> str:
+        fields = ', '.join(f"{name}={getattr(self, name)!r}" for name in self._columns)
+        return f"RowView({fields})"
+
+
+def select_columns(available: dict[str, str], fields) -> dict[str, str]:
+    """Storage column of every requested field, and of ``id``."""
+    for field in fields:
+        if field not in available:
+            raise ValueError(f"unknown field '{field}'")
+    return {'id': available['id'], **{f: available[f] for f in fields}}
@@ -0,0 +1,76 @@
+"""Exchange rates that change over time.
+
+A ``RateTable`` holds the rates published on successive days, each
+already turned into a minor-unit cross-rate matrix, so converting an
+amount at some date is a bisection over the days and one multiplication.
+A ``RateProvider`` supplies the current table; installing one with
+``value_objects.set_rate_provider`` makes every conversion use it.
+"""
+from abc import ABC, abstractmethod
+from bisect import bisect_right
+from datetime import date
+
+from .value_objects import Currency, RATES_TO_EUR, minor_cross_rates
+
+
+class RateTable:
+    """Rates to EUR by day of publication.
+
+    A day only needs to list the rates that changed: the others carry over
+    from the previous day, and EUR is always 1. Rates apply from their day
+    until the next one; dates before the first day use the first rates.
+    Currencies the hotel does not handle are ignored.
+    """
+
+    def __init__(self, rates_by_day: dict[str, dict[str, float]]):
+        if not rates_by_day:
+            raise ValueError("no exchange rates")
+        by_day = {}
+        for day, rates in rates_by_day.items():
+            try:
+                by_day[date.fromisoformat(day).isoformat()] = rates
+            except (TypeError, ValueError):
+                raise ValueError(f"invalid rate date '{day}'") from None
+        self.days = sorted(by_day)
+        self._matrices = []
+        current = {Currency.EUR.value: 1.0}
+        for day in self.days:
+            for code, rate in by_day[day].items():
+                if code in Currency.__members__:
+                    try:
+                        rate = float(rate)
+                    except (TypeError, ValueError):
+                        rate = None
+                    if rate is None or not rate > 0:
+                        raise ValueError(f"invalid {code} rate on {day}")
+                    current[code] = rate
+            missing = [c.value for c in Currency if c.value not in current]
+            if missing:
+                raise ValueError(f"no {missing[0]} rate on {day}")
+            self._matrices.append(minor_cross_rates(current))
+
+    def minor_cross_rates(self, as_of: str | None = None) -> list[list[float]]:
+        """Cross-rate matrix (see ``minor_cross_rates``) in effect on day as_of, or the latest."""
+        if as_of is None:
+            return self._matrices[-1]
+        return self._matrices[max(bisect_right(self.days, as_of) - 1, 0)]
+
+
+class RateProvider(ABC):
+    @abstractmethod
+    def table(self) -> RateTable:
+        """The current rate table."""
+        ...
+
+    def minor_cross_rates(self, as_of: str | None = None) -> list[list[float]]:
+        return self.table().minor_cross_rates(as_of)
+
+
+class StaticRateProvider(RateProvider):
+    """The same rates at every date, RATES_TO_EUR by default."""
+
+    def __init__(self, rates: dict[str, float] = RATES_TO_EUR):
+        self._table = RateTable({date.min.isoformat(): rates})
+
+    def table(self) -> RateTable:
+        return self._table
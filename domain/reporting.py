@@ -0,0 +1,228 @@
+"""Occupancy and revenue analytics over columnar copies of the data.
+
+Reservations and payments are loaded once into parallel columns (NumPy
+arrays when NumPy is installed, ``array.array`` otherwise) and every
+figure is computed in a few passes over those columns instead of one
+service call per reservation.
+"""
+from array import array
+from datetime import date
+from itertools import accumulate
+from typing import Iterable
+
+from .availability import day_ordinal
+from .entities import Room
+from .ledger import CREDIT_KINDS
+from .value_objects import Currency, MINOR_UNITS, convert_many
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - NumPy is optional
+    np = None
+
+OCCUPANCY_GROUPS = ('room', 'type', 'day')
+
+_CURRENCIES = [c.value for c in Currency]
+_CURRENCY_INDEX = {c: i for i, c in enumerate(_CURRENCIES)}
+
+if np is not None:
+    _NP_SCALE = np.array([10 ** MINOR_UNITS[c] for c in _CURRENCIES])
+
+
+def _transpose(rows: Iterable[tuple], width: int) -> list[tuple]:
+    return list(zip(*rows)) or [()] * width
+
+
+def _period(start: str, end: str) -> tuple[int, int]:
+    """Day ordinals of the inclusive period [start, end] as a half-open range."""
+    lo, hi = day_ordinal(start), day_ordinal(end) + 1
+    if hi <= lo:
+        raise ValueError("end of period is before its start")
+    return lo, hi
+
+
+def _ratio(part: float, whole: float) -> float:
+    return round(part / whole, 4) if whole else 0.0
+
+
+class ReportData:
+    """Columnar snapshot of the rooms, reservations and payments.
+
+    ``rooms`` may be entities or views with ``id`` and ``room_type``;
+    ``stays`` are ``(room_id, check_in, nights, confirmed)`` rows and
+    ``payments`` are ``(created_at, amount, currency, kind)`` rows, as
+    returned by the repositories' ``scan`` methods.
+    """
+
+    def __init__(self, rooms: Iterable[Room], stays: Iterable[tuple] = (),
+                 payments: Iterable[tuple] = ()):
+        rooms = sorted(rooms, key=lambda r: r.id)
+        self.room_ids = [r.id for r in rooms]
+        self.types = sorted({r.room_type for r in rooms})
+        type_index = {t: i for i, t in enumerate(self.types)}
+        self.room_type = [type_index[r.room_type] for r in rooms]
+        position = {r.id: i for i, r in enumerate(rooms)}
+
+        room_ids, check_ins, nights, confirmed = _transpose(stays, 4)
+        created, amounts, currencies, kinds = _transpose(payments, 4)
+        if np is not None:
+            room = np.array([position.get(r, -1) for r in room_ids], dtype=np.int64)
+            known = room >= 0
+            self.room = room[known]
+            # Parsed like everywhere else: NumPy would read a basic '20250601' as a year.
+            self.start = np.array([day_ordinal(c) for c in check_ins], dtype=np.int64)[known]
+            self.nights = np.array(nights, dtype=np.int64)[known]
+            self.confirmed = np.array(confirmed, dtype=np.int8)[known]
+
+            debit = ~np.isin(np.array(kinds, dtype=str), list(CREDIT_KINDS))
+            codes, inverse = np.unique(np.array(currencies, dtype=str), return_inverse=True)
+            currency = np.array([_CURRENCY_INDEX[c] for c in codes.tolist()], dtype=np.int64)[inverse]
+            amounts = np.array(amounts, dtype=np.float64)[debit]
+            self.days = np.array([c or '' for c in created], dtype='U10')[debit]
+            self.currency = currency[debit]
+            self.minor = np.rint(amounts * _NP_SCALE[self.currency]).astype(np.int64)
+            self.eur = convert_many(amounts, [_CURRENCIES[c] for c in self.currency.tolist()], Currency.EUR,
+                                    self.days)
+            self.balance = (np.array(kinds, dtype=str)[debit] == 'reservation_balance').astype(np.int8)
+        else:
+            rows = [(position[r], day_ordinal(c), n, 1 if ok else 0)
+                    for r, c, n, ok in zip(room_ids, check_ins, nights, confirmed) if r in position]
+            room, start, nights, confirmed = _transpose(rows, 4)
+            self.room = array('q', room)
+            self.start = array('q', start)
+            self.nights = array('q', nights)
+            self.confirmed = array('b', confirmed)
+
+            rows = [((c or '')[:10], a, cur, k) for c, a, cur, k in zip(created, amounts, currencies, kinds)
+                    if k not in CREDIT_KINDS]
+            days, amounts, currencies, kinds = _transpose(rows, 4)
+            self.days = list(days)
+            self.currency = array('q', [_CURRENCY_INDEX[c] for c in currencies])
+            self.minor = array('q', [round(a * 10 ** MINOR_UNITS[c]) for a, c in zip(amounts, currencies)])
+            self.eur = array('d', convert_many(amounts, currencies, Currency.EUR, self.days))
+            self.balance = array('b', [1 if k == 'reservation_balance' else 0 for k in kinds])
+
+
+def occupancy(data: ReportData, start: str, end: str, by: str = 'room') -> dict:
+    """Share of room-nights booked between start and end (inclusive).
+
+    Rows are per room, per room type or per day depending on ``by``; the
+    summary holds the overall rate and the average length of the stays
+    checking in during the period.
+    """
+    if by not in OCCUPANCY_GROUPS:
+        raise ValueError(f"cannot group occupancy by '{by}'")
+    lo, hi = _period(start, end)
+    days = hi - lo
+    rooms = len(data.room_ids)
+    if np is not None:
+        first = np.clip(data.start, lo, hi)
+        last = np.clip(data.start + data.nights, lo, hi)
+        per_room = np.bincount(data.room, weights=last - first, minlength=rooms).astype(np.int64).tolist()
+        per_day = np.cumsum(np.bincount(first - lo, minlength=days + 1)
+                            - np.bincount(last - lo, minlength=days + 1))[:days].tolist()
+        arriving = (data.start >= lo) & (data.start < hi)
+        stays = int(arriving.sum())
+        stay_nights = int(data.nights[arriving].sum())
+    else:
+        per_room = [0] * rooms
+        change = [0] * (days + 1)
+        stays = stay_nights = 0
+        for room, check_in, nights in zip(data.room, data.start, data.nights):
+            first = min(max(check_in, lo), hi)
+            last = min(max(check_in + nights, lo), hi)
+            if first < last:
+                per_room[room] += last - first
+                change[first - lo] += 1
+                change[last - lo] -= 1
+            if lo <= check_in < hi:
+                stays += 1
+                stay_nights += nights
+        per_day = list(accumulate(change))[:days]
+
+    if by == 'room':
+        rows = [{'room': room_id, 'room_type': data.types[t], 'booked': booked,
+                 'available': days, 'rate': _ratio(booked, days)}
+                for room_id, t, booked in zip(data.room_ids, data.room_type, per_room)]
+    elif by == 'type':
+        booked = [0] * len(data.types)
+        count = [0] * len(data.types)
+        for t, nights in zip(data.room_type, per_room):
+            booked[t] += nights
+            count[t] += 1
+        rows = [{'room_type': name, 'rooms': n, 'booked': b, 'available': n * days,
+                 'rate': _ratio(b, n * days)}
+                for name, n, b in zip(data.types, count, booked)]
+    else:
+        rows = [{'day': date.fromordinal(lo + i).isoformat(), 'booked': n, 'available': rooms,
+                 'rate': _ratio(n, rooms)}
+                for i, n in enumerate(per_day)]
+    booked = sum(per_room)
+    return {'rows': rows, 'summary': {
+        'booked': booked,
+        'available': rooms * days,
+        'rate': _ratio(booked, rooms * days),
+        'stays': stays,
+        'average_stay': round(stay_nights / stays, 2) if stays else 0.0,
+    }}
+
+
+def revenue(data: ReportData, start: str, end: str) -> dict:
+    """Reservation payments collected between start and end (inclusive).
+
+    Rows hold the deposits and balances collected per month and currency;
+    the summary gives the EUR totals, how they split between deposits and
+    balances, and the share of the stays checking in during the period
+    whose balance was collected.
+    """
+    lo, hi = _period(start, end)
+    if np is not None:
+        selected = (data.days >= start) & (data.days <= end)
+        months, month = np.unique(data.days[selected].astype('U7'), return_inverse=True)
+        months = months.tolist()
+        key = (month * len(_CURRENCIES) + data.currency[selected]) * 2 + data.balance[selected]
+        sums = np.bincount(key, weights=data.minor[selected],
+                           minlength=len(months) * len(_CURRENCIES) * 2).astype(np.int64).tolist()
+        eur_balance = float(data.eur[selected & (data.balance == 1)].sum())
+        eur_deposit = float(data.eur[selected].sum()) - eur_balance
+        arriving = (data.start >= lo) & (data.start < hi)
+        stays = int(arriving.sum())
+        settled = int(data.confirmed[arriving].sum())
+    else:
+        months = sorted({day[:7] for day in data.days if start <= day <= end})
+        month_index = {m: i for i, m in enumerate(months)}
+        sums = [0] * (len(months) * len(_CURRENCIES) * 2)
+        eur_deposit = eur_balance = 0.0
+        for day, currency, minor, eur, balance in zip(data.days, data.currency, data.minor,
+                                                      data.eur, data.balance):
+            if not start <= day <= end:
+                continue
+            sums[(month_index[day[:7]] * len(_CURRENCIES) + currency) * 2 + balance] += minor
+            if balance:
+                eur_balance += eur
+            else:
+                eur_deposit += eur
+        stays = settled = 0
+        for check_in, confirmed in zip(data.start, data.confirmed):
+            if lo <= check_in < hi:
+                stays += 1
+                settled += confirmed
+
+    rows = []
+    for m, name in enumerate(months):
+        for c, currency in enumerate(_CURRENCIES):
+            deposits, balances = sums[(m * len(_CURRENCIES) + c) * 2:(m * len(_CURRENCIES) + c) * 2 + 2]
+            if deposits or balances:
+                scale = 10 ** MINOR_UNITS[currency]
+                rows.append({'month': name, 'currency': currency, 'deposits': deposits / scale,
+                             'balances': balances / scale, 'total': (deposits + balances) / scale})
+    collected = eur_deposit + eur_balance
+    return {'rows': rows, 'summary': {
+        'deposits_eur': round(eur_deposit, 2),
+        'balances_eur': round(eur_balance, 2),
+        'total_eur': round(collected, 2),
+        'deposit_share': _ratio(eur_deposit, collected),
+        'balance_share': _ratio(eur_balance, collected),
+        'stays': stays,
+        'balance_collected_rate': _ratio(settled, stays),
+    }}
@@ -1,5 +1,15 @@
+from __future__ import annotations
+
 from abc import ABC, abstractmethod
+from itertools import islice
+from typing import Iterator
+
 from .entities import Client, Room, Reservation, Payment
+from .availability import day_ordinal
+from .calendar import OccupancyCalendar
+from .ledger import payment_day, wallet_effect
+from .projections import RowView
+from .value_objects import Money
 
 
 class ClientRepository(ABC):
@@ -19,6 +29,11 @@ class ClientRepository(ABC):
     def save(self, client: Client) -> None:
         ...
 
+    @abstractmethod
+    def project(self, *fields: str) -> Iterator[RowView]:
+        """Every client as a view exposing only fields (see ``projections``)."""
+        ...
+
 
 class RoomRepository(ABC):
     @abstractmethod
@@ -33,6 +48,11 @@ class RoomRepository(ABC):
     def list(self) -> list[Room]:
         ...
 
+    @abstractmethod
+    def project(self, *fields: str) -> Iterator[RowView]:
+        """Every room as a view exposing only fields (see ``projections``)."""
+        ...
+
 
 class ReservationRepository(ABC):
     @abstractmethod
@@ -55,12 +75,219 @@ class ReservationRepository(ABC):
     def save(self, reservation: Reservation) -> None:
         ...
 
+    @abstractmethod
+    def project(self, *fields: str) -> Iterator[RowView]:
+        """Every reservation as a view exposing only fields (see ``projections``)."""
+        ...
+
+    def find_overlapping(self, room_id: int, check_in: str, nights: int) -> list[Reservation]:
+        """Reservations of room_id overlapping the stay starting on check_in.
+
+        The default implementation scans every reservation; backends are
+        expected to answer from an index.
+        """
+        start = day_ordinal(check_in)
+        end = start + nights
+        found = []
+        for r in self.project('room_id', 'check_in', 'nights'):
+            if r.room_id != room_id:
+                continue
+            existing_start = day_ordinal(r.check_in)
+            if start < existing_start + r.nights and end > existing_start:
+                found.append(r.hydrate())
+        return found
+
+    def booked_rooms(self, room_ids, check_in: str, nights: int) -> set[int]:
+        """Those of room_ids with a reservation overlapping the stay.
+
+        The default implementation checks every room in a single scan of
+        the reservations.
+        """
+        wanted = set(room_ids)
+        start = day_ordinal(check_in)
+        end = start + nights
+        booked = set()
+        for r in self.project('room_id', 'check_in', 'nights'):
+            if r.room_id in wanted and r.room_id not in booked:
+                existing_start = day_ordinal(r.check_in)
+                if start < existing_start + r.nights and end > existing_start:
+                    booked.add(r.room_id)
+        return booked
+
+    def calendar(self, room_id: int) -> OccupancyCalendar:
+        """Occupancy calendar holding (at least) the bookings of room_id.
+
+        The default implementation builds it from every reservation;
+        backends are expected to keep one up to date.
+        """
+        calendar = OccupancyCalendar()
+        for r in self.project('room_id', 'check_in', 'nights'):
+            if r.room_id == room_id:
+                start = day_ordinal(r.check_in)
+                calendar.add(room_id, start, start + r.nights)
+        return calendar
+
+    def query(self, client_id: int | None = None, room_id: int | None = None, start: str | None = None,
+              end: str | None = None, confirmed: bool | None = None, after_id: int = 0,
+              limit: int | None = None) -> Iterator[Reservation]:
+        """Reservations matching every given filter, in id order.
+
+        start and end (YYYY-MM-DD) bound the check-in day, inclusively. For
+        keyset pagination only ids above after_id are returned, at most limit
+        of them. The default implementation scans every reservation;
+        backends are expected to filter in storage.
+        """
+        rows = sorted(self.project('client_id', 'room_id', 'check_in', 'confirmed'), key=lambda r: r.id)
+        matches = (r.hydrate() for r in rows
+                   if r.id > after_id
+                   and (client_id is None or r.client_id == client_id)
+                   and (room_id is None or r.room_id == room_id)
+                   and (start is None or day_ordinal(r.check_in) >= day_ordinal(start))
+                   and (end is None or day_ordinal(r.check_in) <= day_ordinal(end))
+                   and (confirmed is None or bool(r.confirmed) == confirmed))
+        return islice(matches, limit)
+
+    def scan(self) -> Iterator[tuple]:
+        """Every reservation as a ``(room_id, check_in, nights, confirmed)`` row.
+
+        Used for bulk reporting; backends may read the columns straight
+        from storage instead of building entities.
+        """
+        for r in self.project('room_id', 'check_in', 'nights', 'confirmed'):
+            yield r.room_id, r.check_in, r.nights, r.confirmed
+
 
 class PaymentRepository(ABC):
     @abstractmethod
     def add(self, payment: Payment) -> None:
         ...
 
+    @abstractmethod
+    def get(self, payment_id: int) -> Payment | None:
+        ...
+
+    @abstractmethod
+    def list(self) -> list[Payment]:
+        ...
+
     @abstractmethod
     def list_for_client(self, client_id: int) -> list[Payment]:
         ...
+
+    @abstractmethod
+    def project(self, *fields: str) -> Iterator[RowView]:
+        """Every payment as a view exposing only fields (see ``projections``)."""
+        ...
+
+    @abstractmethod
+    def replace(self, payments: list[Payment], payment: Payment) -> None:
+        """Remove payments and store payment under the id it already has."""
+        ...
+
+    def query(self, client_id: int | None = None, kind: str | None = None, start: str | None = None,
+              end: str | None = None, after_id: int = 0, limit: int | None = None) -> Iterator[Payment]:
+        """Payments matching every given filter, in id order.
+
+        start and end (YYYY-MM-DD) bound the day a payment was recorded,
+        inclusively; after_id and limit are as for ``ReservationRepository.query``.
+        """
+        rows = sorted(self.project('client_id', 'kind', 'created_at'), key=lambda p: p.id)
+        matches = (p.hydrate() for p in rows
+                   if p.id > after_id
+                   and (client_id is None or p.client_id == client_id)
+                   and (kind is None or p.kind == kind)
+                   and (start is None or payment_day(p.created_at) >= start)
+                   and (end is None or payment_day(p.created_at) <= end))
+        return islice(matches, limit)
+
+    def history(self, client_id: int, since: str | None = None) -> Iterator[Payment]:
+        """Payments of client_id recorded on day since (YYYY-MM-DD) or later."""
+        for payment in self.list_for_client(client_id):
+            if since is None or payment_day(payment.created_at) >= since:
+                yield payment
+
+    def balance(self, client_id: int, as_of: str | None = None) -> Money:
+        """EUR wallet balance implied by the client's payments at the end of day as_of."""
+        total = Money(0)
+        for payment in self.list_for_client(client_id):
+            if as_of is None or payment_day(payment.created_at) <= as_of:
+                total += wallet_effect(payment)
+        return total
+
+    def scan(self) -> Iterator[tuple]:
+        """Every payment as a ``(created_at, amount, currency, kind)`` row."""
+        for p in self.project('created_at', 'amount', 'currency', 'kind'):
+            yield p.created_at, p.amount, p.currency, p.kind
+
+
+class ArchiveRepository(ABC):
+    """Append-only store of the reservations and payments moved out of the working set.
+
+    Archived records never change; besides ``add_reservations`` and
+    ``add_payments`` every method only reads.
+    """
+
+    @abstractmethod
+    def add_reservations(self, reservations: list[Reservation]) -> None:
+        ...
+
+    @abstractmethod
+    def add_payments(self, payments: list[Payment]) -> None:
+        ...
+
+    @abstractmethod
+    def reservations(self, start: str | None = None, end: str | None = None) -> Iterator[Reservation]:
+        """Archived reservations checking in between start and end (inclusive)."""
+        ...
+
+    @abstractmethod
+    def payments(self, client_id: int | None = None, start: str | None = None,
+                 end: str | None = None) -> Iterator[Payment]:
+        """Archived payments (of client_id) recorded between start and end (inclusive)."""
+        ...
+
+
+class UnitOfWork(ABC):
+    """Groups repository calls so they are committed or rolled back together.
+
+    Used as a context manager: leaving the block normally commits, leaving
+    it with an exception (typically a ``ValueError`` raised by the service)
+    rolls every change made inside the block back. Blocks may be nested;
+    an inner block behaves as a savepoint of the outer one.
+    """
+
+    def __enter__(self) -> 'UnitOfWork':
+        self.begin()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+        return False
+
+    @abstractmethod
+    def begin(self) -> None:
+        ...
+
+    @abstractmethod
+    def commit(self) -> None:
+        ...
+
+    @abstractmethod
+    def rollback(self) -> None:
+        ...
+
+
+class NullUnitOfWork(UnitOfWork):
+    """Unit of work for repositories that persist every call on their own."""
+
+    def begin(self) -> None:
+        pass
+
+    def commit(self) -> None:
+        pass
+
+    def rollback(self) -> None:
+        pass
@@ -1,24 +1,70 @@
-from datetime import datetime, timedelta
+from functools import wraps
+from itertools import chain
+from typing import Callable, Iterable, Iterator
 
 from .entities import Client, Room, Reservation, Payment
 from .value_objects import Money, Currency
+from .availability import day_ordinal
+from .calendar import iso_day
+from .ledger import BALANCE_FORWARD, balance_forward, payment_day, settle
+from . import reporting
 from .repositories import (
     ClientRepository,
     RoomRepository,
     ReservationRepository,
     PaymentRepository,
+    ArchiveRepository,
+    UnitOfWork,
+    NullUnitOfWork,
 )
 
 
+def transactional(method):
+    """Run a service method inside the service's unit of work."""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.uow:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def _day(value: str | None) -> str | None:
+    """value as a YYYY-MM-DD day, None staying None."""
+    return None if value is None else iso_day(day_ordinal(value))
+
+
+def _archived_only(records: Iterable, working_ids: Callable[[], set[int]]) -> Iterator:
+    """records whose id is not in the working set, read only if there are records.
+
+    A run of ``archive_before`` whose commit fails leaves its records in
+    the archive and in the working set: reports count them once.
+    """
+    ids = None
+    for record in records:
+        if ids is None:
+            ids = working_ids()
+        if record.id not in ids:
+            yield record
+
+
+def _check_page(limit: int | None) -> None:
+    if limit is not None and limit < 1:
+        raise ValueError("limit must be positive")
+
+
 class ReservationService:
     def __init__(self, client_repo: ClientRepository, room_repo: RoomRepository,
                  reservation_repo: ReservationRepository,
-                 payment_repo: PaymentRepository):
+                 payment_repo: PaymentRepository, uow: UnitOfWork | None = None,
+                 archive: ArchiveRepository | None = None):
         self.clients = client_repo
         self.rooms = room_repo
         self.reservations = reservation_repo
         self.payments = payment_repo
+        self.uow = uow or NullUnitOfWork()
+        self.archive = archive
 
+    @transactional
     def add_client(self, full_name: str, email: str, phone: str) -> Client:
         if self.clients.find_by_email(email) is not None:
             raise ValueError("client already exists")
@@ -26,6 +72,7 @@ class ReservationService:
         self.clients.add(client)
         return client
 
+    @transactional
     def deposit(self, client_id: int, amount: float, currency: str = "EUR") -> float:
         client = self.clients.get(client_id)
         if client is None:
@@ -35,19 +82,148 @@ class ReservationService:
             raise ValueError('unsupported currency')
         rate = Currency(cur)
         money = Money(amount, rate)
-        client.wallet += money.convert_to(Currency.EUR).amount
+        payment = Payment(client_id=client.id, amount=money, kind="deposit")
+        client.wallet = (Money(client.wallet) + Money.from_minor(settle(payment))).amount
         self.clients.save(client)
-        self.payments.add(Payment(client_id=client.id, amount=money, kind="deposit"))
+        self.payments.add(payment)
         return client.wallet
 
+    def payment_history(self, client_id: int, since: str | None = None) -> Iterator[Payment]:
+        return self.payments.history(client_id, since)
+
+    def query_payments(self, client_id: int | None = None, kind: str | None = None, start: str | None = None,
+                       end: str | None = None, after_id: int = 0, limit: int | None = None) -> Iterator[Payment]:
+        """Payments matching the filters, limit at a time after after_id (see ``PaymentRepository.query``)."""
+        _check_page(limit)
+        return self.payments.query(client_id, kind, _day(start), _day(end), after_id, limit)
+
+    @transactional
+    def wallet_balance(self, client_id: int, as_of: str | None = None) -> Money:
+        if self.clients.get(client_id) is None:
+            raise ValueError("client not found")
+        return self.payments.balance(client_id, as_of)
+
+    @transactional
+    def verify_wallet(self, client_id: int) -> bool:
+        """Check that the stored wallet matches the balance of the client's payments."""
+        client = self.clients.get(client_id)
+        if client is None:
+            raise ValueError("client not found")
+        return Money(client.wallet) == self.payments.balance(client_id)
+
+    def query_reservations(self, client_id: int | None = None, room_id: int | None = None,
+                           start: str | None = None, end: str | None = None, confirmed: bool | None = None,
+                           after_id: int = 0, limit: int | None = None) -> Iterator[Reservation]:
+        """Reservations matching the filters, limit at a time after after_id (see ``ReservationRepository.query``)."""
+        _check_page(limit)
+        return self.reservations.query(client_id, room_id, _day(start), _day(end), confirmed, after_id, limit)
+
+    @transactional
     def add_room(self, room_type: str, price: float, description: str) -> Room:
         room = Room(room_type=room_type, price_per_night=Money(price), description=description)
         self.rooms.add(room)
         return room
 
+    @transactional
     def list_rooms(self) -> list[Room]:
         return self.rooms.list()
 
+    @transactional
+    def find_available_rooms(self, check_in: str, nights: int) -> list[Room]:
+        return [room for room in self.rooms.list()
+                if not self.reservations.find_overlapping(room.id, check_in, nights)]
+
+    def _require_room(self, room_id: int) -> Room:
+        room = self.rooms.get(room_id)
+        if room is None:
+            raise ValueError("room not found")
+        return room
+
+    def _select_rooms(self, room_id: int | None, room_type: str | None) -> list[Room]:
+        if room_id is not None:
+            return [self._require_room(room_id)]
+        rooms = [r for r in self.rooms.list() if room_type is None or r.room_type == room_type]
+        if not rooms:
+            raise ValueError(f"no rooms of type '{room_type}'")
+        return rooms
+
+    @transactional
+    def is_room_free(self, room_id: int, check_in: str, nights: int) -> bool:
+        self._require_room(room_id)
+        return self.reservations.calendar(room_id).is_free(room_id, day_ordinal(check_in), nights)
+
+    @transactional
+    def free_days(self, room_id: int, start: str, end: str) -> list[str]:
+        """Days between start and end (inclusive) whose night room_id has free."""
+        self._require_room(room_id)
+        lo, hi = day_ordinal(start), day_ordinal(end) + 1
+        return [iso_day(d) for d in self.reservations.calendar(room_id).free_days(room_id, lo, hi)]
+
+    @transactional
+    def occupancy_calendar(self, start: str, end: str, room_id: int | None = None,
+                           room_type: str | None = None) -> list[tuple[Room, int]]:
+        """Booked nights of the selected rooms between start and end (inclusive).
+
+        Each room comes with a bitmap whose bit i is set when the night of
+        day start + i is booked.
+        """
+        lo, hi = day_ordinal(start), day_ordinal(end) + 1
+        if hi <= lo:
+            raise ValueError("end of period is before its start")
+        return [(room, self.reservations.calendar(room.id).booked(room.id, lo, hi))
+                for room in self._select_rooms(room_id, room_type)]
+
+    @transactional
+    def first_free_window(self, nights: int, after: str, room_id: int | None = None,
+                          room_type: str | None = None) -> tuple[Room, str]:
+        """Earliest check-in on or after after with nights free nights, and its room."""
+        if nights < 1:
+            raise ValueError("nights must be positive")
+        start = day_ordinal(after)
+        best = None
+        for room in self._select_rooms(room_id, room_type):
+            day = self.reservations.calendar(room.id).first_free(room.id, nights, start)
+            if best is None or day < best[0]:
+                best = (day, room)
+        return best[1], iso_day(best[0])
+
+    def _stays(self, end: str):
+        """Report rows of the reservations, archived ones checking in by end included."""
+        stays = self.reservations.scan()
+        if self.archive is None:
+            return stays
+        archived = ((r.room_id, r.check_in, r.nights, r.confirmed)
+                    for r in _archived_only(self.archive.reservations(end=end), self._reservation_ids))
+        return chain(stays, archived)
+
+    def _payment_rows(self, start: str, end: str):
+        """Report rows of the payments, archived ones recorded between start and end included."""
+        payments = self.payments.scan()
+        if self.archive is None:
+            return payments
+        archived = ((p.created_at, p.amount.amount, p.amount.currency.value, p.kind)
+                    for p in _archived_only(self.archive.payments(start=start, end=end), self._payment_ids))
+        return chain(payments, archived)
+
+    def _reservation_ids(self) -> set[int]:
+        return {v.id for v in self.reservations.project()}
+
+    def _payment_ids(self) -> set[int]:
+        # A balance forward takes the id of the newest payment it replaced.
+        return {v.id for v in self.payments.project('kind') if v.kind != BALANCE_FORWARD}
+
+    @transactional
+    def occupancy_report(self, start: str, end: str, by: str = 'room') -> dict:
+        data = reporting.ReportData(self.rooms.project('room_type'), self._stays(end))
+        return reporting.occupancy(data, start, end, by)
+
+    @transactional
+    def revenue_report(self, start: str, end: str) -> dict:
+        data = reporting.ReportData(self.rooms.project('room_type'), self._stays(end),
+                                    self._payment_rows(start, end))
+        return reporting.revenue(data, start, end)
+
+    @transactional
     def add_reservation(self, client_id: int, room_id: int, check_in: str, nights: int) -> Reservation:
         client = self.clients.get(client_id)
         if client is None:
@@ -55,30 +231,73 @@ class ReservationService:
         room = self.rooms.get(room_id)
         if room is None:
             raise ValueError("room not found")
-        start = datetime.fromisoformat(check_in)
-        end = start + timedelta(days=nights)
-        for r in self.reservations.list():
-            if r.room_id != room_id:
-                continue
-            existing_start = datetime.fromisoformat(r.check_in)
-            existing_end = existing_start + timedelta(days=r.nights)
-            if start < existing_end and end > existing_start:
-                raise ValueError("room not available for the selected dates")
-        total = room.price_per_night.amount * nights
-        if client.wallet < total / 2:
+        if self.reservations.find_overlapping(room_id, check_in, nights):
+            raise ValueError("room not available for the selected dates")
+        total = room.price_per_night * nights
+        deposit = total / 2
+        wallet = Money(client.wallet)
+        if wallet < deposit:
             raise ValueError("insufficient funds")
-        client.wallet -= total / 2
+        client.wallet = (wallet - deposit).amount
         reservation = Reservation(client_id=client_id, room_id=room_id,
                                   check_in=check_in, nights=nights,
-                                  total_amount=Money(total))
+                                  total_amount=total)
         self.reservations.add(reservation)
         self.clients.save(client)
         self.payments.add(Payment(client_id=client.id,
-                                  amount=Money(total/2),
+                                  amount=deposit,
                                   kind="reservation_deposit",
                                   reservation_id=reservation.id))
         return reservation
 
+    @transactional
+    def reserve_group(self, client_id: int, room_ids: list[int], check_in: str,
+                      nights: int) -> list[Reservation]:
+        """Reserve every room of room_ids for the same stay, or none of them.
+
+        Availability is checked for all the rooms at once and the combined
+        deposit is taken from the wallet in one debit; each reservation
+        still gets its own deposit payment.
+        """
+        if not room_ids:
+            raise ValueError("no rooms given")
+        if len(set(room_ids)) != len(room_ids):
+            raise ValueError("a room is listed twice")
+        client = self.clients.get(client_id)
+        if client is None:
+            raise ValueError("client not found")
+        rooms = []
+        for room_id in room_ids:
+            room = self.rooms.get(room_id)
+            if room is None:
+                raise ValueError(f"room {room_id} not found")
+            rooms.append(room)
+        booked = self.reservations.booked_rooms(room_ids, check_in, nights)
+        if booked:
+            listed = ", ".join(str(r) for r in room_ids if r in booked)
+            raise ValueError(f"rooms not available for the selected dates: {listed}")
+        totals = [room.price_per_night * nights for room in rooms]
+        deposits = [total / 2 for total in totals]
+        combined = sum(deposits, Money(0))
+        wallet = Money(client.wallet)
+        if wallet < combined:
+            raise ValueError("insufficient funds")
+        client.wallet = (wallet - combined).amount
+        self.clients.save(client)
+        reservations = []
+        for room, total, deposit in zip(rooms, totals, deposits):
+            reservation = Reservation(client_id=client_id, room_id=room.id,
+                                      check_in=check_in, nights=nights,
+                                      total_amount=total)
+            self.reservations.add(reservation)
+            self.payments.add(Payment(client_id=client.id,
+                                      amount=deposit,
+                                      kind="reservation_deposit",
+                                      reservation_id=reservation.id))
+            reservations.append(reservation)
+        return reservations
+
+    @transactional
     def confirm_reservation(self, reservation_id: int) -> None:
         reservation = self.reservations.get(reservation_id)
         if reservation is None:
@@ -88,19 +307,66 @@ class ReservationService:
         client = self.clients.get(reservation.client_id)
         if client is None:
             raise ValueError("client not found")
-        remaining = reservation.total_amount.amount / 2
-        if client.wallet < remaining:
+        total = reservation.total_amount
+        remaining = total - total / 2
+        wallet = Money(client.wallet)
+        if wallet < remaining:
             raise ValueError("insufficient funds")
-        client.wallet -= remaining
+        client.wallet = (wallet - remaining).amount
         reservation.confirmed = True
         self.clients.save(client)
         self.reservations.save(reservation)
-        self.payments.add(Payment(client_id=client.id, amount=Money(remaining),
+        self.payments.add(Payment(client_id=client.id, amount=remaining,
                                   kind="reservation_balance",
                                   reservation_id=reservation_id))
 
+    @transactional
     def cancel_reservation(self, reservation_id: int) -> None:
         reservation = self.reservations.get(reservation_id)
         if reservation is None:
             raise ValueError("reservation not found")
         self.reservations.remove(reservation_id)
+
+    def _require_archive(self) -> ArchiveRepository:
+        if self.archive is None:
+            raise ValueError("this storage engine has no archive")
+        return self.archive
+
+    @transactional
+    def archive_before(self, before: str) -> dict[str, int]:
+        """Move the stays that ended by before, and the settled payments recorded before it, to the archive.
+
+        A payment is settled once the reservation it belongs to, if any, is
+        no longer in the working set. The archived payments of a client are
+        replaced by one balance forward payment (see ``ledger``): wallet
+        balances do not change, though a balance as of a day before the
+        newest archived payment no longer counts the archived ones.
+        """
+        archive = self._require_archive()
+        cutoff = day_ordinal(before)
+        before = iso_day(cutoff)
+        stays = [r.hydrate() for r in self.reservations.project('check_in', 'nights')
+                 if day_ordinal(r.check_in) + r.nights <= cutoff]
+        active = {r.id for r in self.reservations.project()} - {r.id for r in stays}
+        settled: dict[int, list[Payment]] = {}
+        for p in self.payments.project('client_id', 'reservation_id', 'created_at'):
+            if payment_day(p.created_at) < before and p.reservation_id not in active:
+                settled.setdefault(p.client_id, []).append(p.hydrate())
+        # A client whose only settled payment is an earlier balance forward has nothing new to fold.
+        groups = [payments for payments in settled.values()
+                  if any(p.kind != BALANCE_FORWARD for p in payments)]
+        archived = [p for payments in groups for p in payments if p.kind != BALANCE_FORWARD]
+        archive.add_reservations(stays)
+        archive.add_payments(archived)
+        for reservation in stays:
+            self.reservations.remove(reservation.id)
+        for payments in groups:
+            self.payments.replace(payments, balance_forward(payments))
+        return {'reservations': len(stays), 'payments': len(archived)}
+
+    def archived_reservations(self, start: str | None = None, end: str | None = None) -> Iterator[Reservation]:
+        return self._require_archive().reservations(start, end)
+
+    def archived_payments(self, client_id: int | None = None, start: str | None = None,
+                          end: str | None = None) -> Iterator[Payment]:
+        return self._require_archive().payments(client_id, start, end)
@@ -1,5 +1,10 @@
-from dataclasses import dataclass
 from enum import Enum
+from itertools import repeat
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - NumPy is optional
+    np = None
 
 RATES_TO_EUR = {
     'EUR': 1.0,
@@ -9,6 +14,15 @@ RATES_TO_EUR = {
     'CHF': 1.0,
 }
 
+# Number of decimal digits of each currency's minor unit.
+MINOR_UNITS = {
+    'EUR': 2,
+    'USD': 2,
+    'GBP': 2,
+    'JPY': 0,
+    'CHF': 2,
+}
+
 
 class Currency(str, Enum):
     EUR = "EUR"
@@ -18,22 +32,182 @@ class Currency(str, Enum):
     CHF = "CHF"
 
 
-@dataclass(frozen=True)
+_CURRENCIES = list(Currency)
+# Currency members hash like their value, so plain codes index this too.
+_INDEX = {c: i for i, c in enumerate(_CURRENCIES)}
+_SCALE = [10 ** MINOR_UNITS[c.value] for c in _CURRENCIES]
+
+# CROSS_RATES[i][j]: units of currency j worth one unit of currency i.
+CROSS_RATES = [[RATES_TO_EUR[a.value] / RATES_TO_EUR[b.value] for b in _CURRENCIES]
+               for a in _CURRENCIES]
+
+
+def minor_cross_rates(rates_to_eur: dict[str, float]) -> list[list[float]]:
+    """Cross rates between minor units, indexed like ``list(Currency)``.
+
+    Entry [i][j] is the number of minor units of currency j worth one minor
+    unit of currency i, so a conversion is one multiplication.
+    """
+    return [[rates_to_eur[a.value] / rates_to_eur[b.value] * _SCALE[j] / _SCALE[i]
+             for j, b in enumerate(_CURRENCIES)]
+            for i, a in enumerate(_CURRENCIES)]
+
+
+_MINOR_CROSS_RATES = minor_cross_rates(RATES_TO_EUR)
+
+if np is not None:
+    _NP_SCALE = np.array(_SCALE, dtype=float)
+    _NP_MINOR_CROSS_RATES = np.array(_MINOR_CROSS_RATES)
+
+# Source of the rates used by conversions; None means RATES_TO_EUR at any date.
+_rate_provider = None
+
+
+def set_rate_provider(provider) -> None:
+    """Convert with provider (see ``domain.rates``), or RATES_TO_EUR if None."""
+    global _rate_provider
+    _rate_provider = provider
+
+
+def rate_provider():
+    return _rate_provider
+
+
+def _minor_rates(as_of: str | None) -> list[list[float]]:
+    if _rate_provider is None:
+        return _MINOR_CROSS_RATES
+    return _rate_provider.minor_cross_rates(as_of)
+
+
 class Money:
-    amount: float
-    currency: Currency = Currency.EUR
+    """Immutable amount of money held as an integer number of minor units."""
+
+    __slots__ = ('minor', 'currency')
+
+    def __init__(self, amount: float = 0, currency: Currency = Currency.EUR):
+        if not isinstance(currency, Currency):
+            currency = Currency(currency)
+        object.__setattr__(self, 'currency', currency)
+        object.__setattr__(self, 'minor', round(amount * _SCALE[_INDEX[currency]]))
+
+    @classmethod
+    def from_minor(cls, minor: int, currency: Currency = Currency.EUR) -> 'Money':
+        if not isinstance(currency, Currency):
+            currency = Currency(currency)
+        money = object.__new__(cls)
+        object.__setattr__(money, 'currency', currency)
+        object.__setattr__(money, 'minor', int(minor))
+        return money
+
+    @property
+    def amount(self) -> float:
+        return self.minor / _SCALE[_INDEX[self.currency]]
+
+    def __setattr__(self, name, value):
+        raise AttributeError('Money is immutable')
+
+    def __reduce__(self):
+        return Money.from_minor, (self.minor, self.currency)
+
+    def __repr__(self) -> str:
+        return f"Money(amount={self.amount!r}, currency={self.currency!r})"
 
     def __str__(self) -> str:
         return f"{self.amount:.2f} {self.currency}"
 
-    def convert_to(self, target: Currency) -> 'Money':
-        """Return a new Money value converted to another currency."""
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Money):
+            return NotImplemented
+        return self.minor == other.minor and self.currency == other.currency
+
+    def __hash__(self) -> int:
+        return hash((self.minor, self.currency))
+
+    def _check(self, other: 'Money') -> None:
+        if not isinstance(other, Money) or other.currency != self.currency:
+            raise ValueError('currency mismatch')
+
+    def __add__(self, other: 'Money') -> 'Money':
+        self._check(other)
+        return Money.from_minor(self.minor + other.minor, self.currency)
+
+    def __sub__(self, other: 'Money') -> 'Money':
+        self._check(other)
+        return Money.from_minor(self.minor - other.minor, self.currency)
+
+    def __mul__(self, factor: float) -> 'Money':
+        return Money.from_minor(round(self.minor * factor), self.currency)
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, divisor: float) -> 'Money':
+        return Money.from_minor(round(self.minor / divisor), self.currency)
+
+    def __lt__(self, other: 'Money') -> bool:
+        self._check(other)
+        return self.minor < other.minor
+
+    def __le__(self, other: 'Money') -> bool:
+        self._check(other)
+        return self.minor <= other.minor
+
+    def __gt__(self, other: 'Money') -> bool:
+        self._check(other)
+        return self.minor > other.minor
+
+    def __ge__(self, other: 'Money') -> bool:
+        self._check(other)
+        return self.minor >= other.minor
+
+    def convert_to(self, target: Currency, as_of: str | None = None) -> 'Money':
+        """Return a new Money value converted to another currency.
+
+        The rates are those in effect on day as_of (YYYY-MM-DD, or a
+        timestamp starting with it), or the latest ones if it is None.
+        """
         if self.currency == target:
-            return Money(self.amount, self.currency)
-        rate_from = RATES_TO_EUR[self.currency.value]
-        amount_in_eur = self.amount * rate_from
-        if target == Currency.EUR:
-            return Money(amount_in_eur, Currency.EUR)
-        rate_to = RATES_TO_EUR[target.value]
-        converted = amount_in_eur / rate_to
-        return Money(converted, target)
+            return self
+        rate = _minor_rates(as_of)[_INDEX[self.currency]][_INDEX[target]]
+        return Money.from_minor(round(self.minor * rate), target)
+
+
+def _np_minor_rates(idx, target: int, as_of):
+    """Rate to target of every amount, looking the rates up once per distinct day."""
+    if _rate_provider is None:
+        return _NP_MINOR_CROSS_RATES[idx, target]
+    if as_of is None or isinstance(as_of, str):
+        return np.array(_rate_provider.minor_cross_rates(as_of))[idx, target]
+    days, inverse = np.unique(np.asarray(as_of, dtype=str), return_inverse=True)
+    columns = np.array([[row[target] for row in _rate_provider.minor_cross_rates(day)]
+                        for day in days.tolist()]).reshape(len(days), len(_CURRENCIES))
+    return columns[inverse.reshape(-1), idx]
+
+
+def convert_many(amounts, from_currencies, to: Currency, as_of=None):
+    """Convert many amounts to one currency in a single pass.
+
+    ``amounts`` are in major units and ``from_currencies`` holds the
+    matching currencies (members or codes). ``as_of`` is a day for all the
+    amounts or a sequence of one day per amount (see ``Money.convert_to``).
+    Each amount is rounded to its minor unit, converted and rounded to the
+    target's minor unit, exactly as ``Money(amount, cur).convert_to(to,
+    as_of).amount`` would. Returns a NumPy array when NumPy is installed,
+    a list of floats otherwise.
+    """
+    target = _INDEX[Currency(to)]
+    if np is not None:
+        amounts = np.asarray(amounts, dtype=float)
+        idx = np.fromiter((_INDEX[c] for c in from_currencies), dtype=np.intp, count=len(amounts))
+        minor = np.rint(amounts * _NP_SCALE[idx])
+        return np.rint(minor * _np_minor_rates(idx, target, as_of)) / _SCALE[target]
+    days = repeat(as_of) if as_of is None or isinstance(as_of, str) else as_of
+    columns = {}
+    scale = _SCALE[target]
+    result = []
+    for amount, cur, day in zip(amounts, from_currencies, days):
+        column = columns.get(day)
+        if column is None:
+            column = columns[day] = [row[target] for row in _minor_rates(day)]
+        i = _INDEX[cur]
+        result.append(round(round(amount * _SCALE[i]) * column[i]) / scale)
+    return result
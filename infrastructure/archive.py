@@ -0,0 +1,118 @@
+"""Compressed, append-only archive of reservations and payments.
+
+The archive of a database lives next to it, in ``<database>.archive/``.
+Records are partitioned by month, reservations by check-in day and
+payments by the day they were recorded, into gzip segments such as
+``payments-2025-06.jsonl.gz`` holding one record per line in the layout
+of ``main.py export --format jsonl``. Every archive run appends one gzip
+member per segment it touches and fsyncs it; segments are never
+rewritten, and gzip readers see their members as one stream.
+
+Segments are written before the working set drops the records. A run
+failing after that leaves copies behind, which the next run appends
+again: reads keep one copy of every id, and the service's reports skip
+archived records that are still in the working set.
+"""
+import gzip
+import json
+import os
+from typing import Iterator
+
+from domain.entities import Reservation, Payment
+from domain.ledger import payment_day
+from domain.repositories import ArchiveRepository
+from domain.value_objects import Money, Currency
+
+ARCHIVE_SUFFIX = '.archive'
+SEGMENT_SUFFIX = '.jsonl.gz'
+# Partition of payments recorded without a date.
+UNDATED = '0000-00'
+
+
+def archive_path(path: str) -> str:
+    """Archive directory of the database (file or directory) at path."""
+    return path.rstrip('/\\') + ARCHIVE_SUFFIX
+
+
+def _reservation_record(r: Reservation) -> dict:
+    return {'id': r.id, 'client_id': r.client_id, 'room_id': r.room_id, 'check_in': r.check_in,
+            'nights': r.nights, 'total_amount': r.total_amount.amount, 'confirmed': r.confirmed}
+
+
+def _payment_record(p: Payment) -> dict:
+    return {'id': p.id, 'client_id': p.client_id, 'reservation_id': p.reservation_id,
+            'amount': p.amount.amount, 'currency': p.amount.currency.value, 'kind': p.kind,
+            'created_at': p.created_at, 'eur_minor': p.eur_minor}
+
+
+def _reservation(d: dict) -> Reservation:
+    return Reservation(d['client_id'], d['room_id'], d['check_in'], d['nights'],
+                       Money(d['total_amount']), confirmed=d['confirmed'], id=d['id'])
+
+
+def _payment(d: dict) -> Payment:
+    return Payment(d['client_id'], Money(d['amount'], Currency(d['currency'])), d['kind'],
+                   d['reservation_id'], created_at=d['created_at'], id=d['id'], eur_minor=d.get('eur_minor'))
+
+
+class FileArchiveRepository(ArchiveRepository):
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def _segment(self, collection: str, month: str) -> str:
+        return os.path.join(self.directory, f"{collection}-{month}{SEGMENT_SUFFIX}")
+
+    def _append(self, collection: str, rows: list[tuple[str, dict]]) -> None:
+        """Append (day, record) rows to the segments of their months."""
+        months: dict[str, list[dict]] = {}
+        for day, record in rows:
+            months.setdefault(day[:7] or UNDATED, []).append(record)
+        if not months:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        for month, records in sorted(months.items()):
+            lines = ''.join(json.dumps(record) + '\n' for record in records)
+            with open(self._segment(collection, month), 'ab') as f:
+                f.write(gzip.compress(lines.encode('utf-8')))
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _read(self, collection: str, first: str | None, last: str | None) -> Iterator[dict]:
+        """Records of the segments of months first to last, month by month in id order."""
+        prefix = f"{collection}-"
+        try:
+            names = sorted(name for name in os.listdir(self.directory)
+                           if name.startswith(prefix) and name.endswith(SEGMENT_SUFFIX))
+        except FileNotFoundError:
+            return
+        for name in names:
+            month = name[len(prefix):-len(SEGMENT_SUFFIX)]
+            if (first is not None and month < first[:7]) or (last is not None and month > last[:7]):
+                continue
+            records = {}
+            with gzip.open(os.path.join(self.directory, name), 'rt', encoding='utf-8') as f:
+                for line in f:
+                    record = json.loads(line)
+                    records[record['id']] = record
+            for record_id in sorted(records):
+                yield records[record_id]
+
+    def add_reservations(self, reservations: list[Reservation]) -> None:
+        self._append('reservations', [(r.check_in, _reservation_record(r)) for r in reservations])
+
+    def add_payments(self, payments: list[Payment]) -> None:
+        self._append('payments', [(payment_day(p.created_at), _payment_record(p)) for p in payments])
+
+    def reservations(self, start: str | None = None, end: str | None = None) -> Iterator[Reservation]:
+        for record in self._read('reservations', start, end):
+            if (start is None or record['check_in'] >= start) and (end is None or record['check_in'] <= end):
+                yield _reservation(record)
+
+    def payments(self, client_id: int | None = None, start: str | None = None,
+                 end: str | None = None) -> Iterator[Payment]:
+        for record in self._read('payments', start, end):
+            day = payment_day(record['created_at'])
+            if client_id is not None and record['client_id'] != client_id:
+                continue
+            if (start is None or day >= start) and (end is None or day <= end):
+                yield _payment(record)
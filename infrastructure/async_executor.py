@@ -0,0 +1,148 @@
+"""Thread-pool execution of the synchronous service for asyncio callers.
+
+Every worker thread builds its own ``ReservationService`` (units of work
+are not shared between threads); parsed JSON documents are still shared
+through the process-wide document cache. Reads run on a pool of
+``readers`` threads. Mutations run on a separate pool of ``writers``
+threads, one by default: the JSON, log and sharded stores rewrite
+files that concurrent transactions would overwrite, so more than one
+writer is only safe for an engine such as SQLite that isolates
+transactions itself.
+"""
+from __future__ import annotations
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator
+
+from domain.async_repositories import (
+    AsyncClientRepository,
+    AsyncRoomRepository,
+    AsyncReservationRepository,
+    AsyncPaymentRepository,
+    ServiceExecutor,
+)
+from domain.entities import Client, Room, Reservation, Payment
+from domain.services import ReservationService
+from domain.value_objects import Money
+
+READERS = 4
+
+
+class ThreadedServiceExecutor(ServiceExecutor):
+    """writer_factory, if given, builds the services of the writer threads."""
+
+    def __init__(self, factory: Callable[[], ReservationService], readers: int = READERS, writers: int = 1,
+                 writer_factory: Callable[[], ReservationService] | None = None):
+        self._local = threading.local()
+        self._readers = ThreadPoolExecutor(readers, 'hotel-read', initializer=self._start, initargs=(factory,))
+        self._writers = ThreadPoolExecutor(writers, 'hotel-write', initializer=self._start,
+                                           initargs=(writer_factory or factory,))
+
+    def _start(self, factory: Callable[[], ReservationService]) -> None:
+        self._local.service = factory()
+
+    def _run(self, target: str | None, method: str, args: tuple):
+        obj = self._local.service
+        if target is not None:
+            obj = getattr(obj, target)
+        result = getattr(obj, method)(*args)
+        return list(result) if isinstance(result, Iterator) else result
+
+    async def call(self, target: str | None, method: str, *args, write: bool = False):
+        pool = self._writers if write else self._readers
+        return await asyncio.get_running_loop().run_in_executor(pool, self._run, target, method, args)
+
+    def close(self) -> None:
+        self._readers.shutdown()
+        self._writers.shutdown()
+
+
+class _ExecutorRepository:
+    """Runs each call on the matching repository of a worker's service.
+
+    Entities are passed to the worker as they are, so ``add`` sets the id
+    of the caller's entity.
+    """
+
+    target = ''
+
+    def __init__(self, executor: ServiceExecutor):
+        self.executor = executor
+
+    async def _read(self, method: str, *args):
+        return await self.executor.call(self.target, method, *args)
+
+    async def _write(self, method: str, *args):
+        return await self.executor.call(self.target, method, *args, write=True)
+
+
+class ExecutorClientRepository(_ExecutorRepository, AsyncClientRepository):
+    target = 'clients'
+
+    async def add(self, client: Client) -> None:
+        await self._write('add', client)
+
+    async def get(self, client_id: int) -> Client | None:
+        return await self._read('get', client_id)
+
+    async def find_by_email(self, email: str) -> Client | None:
+        return await self._read('find_by_email', email)
+
+    async def save(self, client: Client) -> None:
+        await self._write('save', client)
+
+
+class ExecutorRoomRepository(_ExecutorRepository, AsyncRoomRepository):
+    target = 'rooms'
+
+    async def add(self, room: Room) -> None:
+        await self._write('add', room)
+
+    async def get(self, room_id: int) -> Room | None:
+        return await self._read('get', room_id)
+
+    async def list(self) -> list[Room]:
+        return await self._read('list')
+
+
+class ExecutorReservationRepository(_ExecutorRepository, AsyncReservationRepository):
+    target = 'reservations'
+
+    async def add(self, reservation: Reservation) -> None:
+        await self._write('add', reservation)
+
+    async def get(self, reservation_id: int) -> Reservation | None:
+        return await self._read('get', reservation_id)
+
+    async def list(self) -> list[Reservation]:
+        return await self._read('list')
+
+    async def remove(self, reservation_id: int) -> None:
+        await self._write('remove', reservation_id)
+
+    async def save(self, reservation: Reservation) -> None:
+        await self._write('save', reservation)
+
+    async def find_overlapping(self, room_id: int, check_in: str, nights: int) -> list[Reservation]:
+        return await self._read('find_overlapping', room_id, check_in, nights)
+
+
+class ExecutorPaymentRepository(_ExecutorRepository, AsyncPaymentRepository):
+    target = 'payments'
+
+    async def add(self, payment: Payment) -> None:
+        await self._write('add', payment)
+
+    async def get(self, payment_id: int) -> Payment | None:
+        return await self._read('get', payment_id)
+
+    async def list_for_client(self, client_id: int) -> list[Payment]:
+        return await self._read('list_for_client', client_id)
+
+    async def history(self, client_id: int, since: str | None = None) -> list[Payment]:
+        return await self._read('history', client_id, since)
+
+    async def balance(self, client_id: int, as_of: str | None = None) -> Money:
+        return await self._read('balance', client_id, as_of)
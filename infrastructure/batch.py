@@ -0,0 +1,123 @@
+import json
+from typing import Iterable, TextIO
+
+from domain.services import ReservationService
+
+
+def _field(op: dict, name: str):
+    for key in (name, name.replace('_', '-')):
+        if key in op:
+            return op[key]
+    raise ValueError(f"missing field '{name}'")
+
+
+def _text(op: dict, name: str, default: str | None = None) -> str:
+    value = _field(op, name) if default is None else op.get(name, default)
+    if not isinstance(value, str):
+        raise ValueError(f"field '{name}' must be a string")
+    return value
+
+
+def _add_client(service: ReservationService, op: dict) -> dict:
+    client = service.add_client(_text(op, 'name'), _text(op, 'email'), _text(op, 'phone'))
+    return {'id': client.id}
+
+
+def _add_room(service: ReservationService, op: dict) -> dict:
+    room = service.add_room(_text(op, 'type'), float(_field(op, 'price')), _text(op, 'description'))
+    return {'id': room.id}
+
+
+def _deposit(service: ReservationService, op: dict) -> dict:
+    balance = service.deposit(int(_field(op, 'client')), float(_field(op, 'amount')),
+                              _text(op, 'currency', 'EUR'))
+    return {'balance': balance}
+
+
+def _reserve(service: ReservationService, op: dict) -> dict:
+    reservation = service.add_reservation(int(_field(op, 'client')), int(_field(op, 'room')),
+                                          _text(op, 'check_in'), int(_field(op, 'nights')))
+    return {'id': reservation.id}
+
+
+def _reserve_group(service: ReservationService, op: dict) -> dict:
+    reservations = service.reserve_group(int(_field(op, 'client')),
+                                         [int(r) for r in _field(op, 'rooms')],
+                                         _text(op, 'check_in'), int(_field(op, 'nights')))
+    return {'ids': [r.id for r in reservations]}
+
+
+def _confirm(service: ReservationService, op: dict) -> dict:
+    service.confirm_reservation(int(_field(op, 'reservation')))
+    return {}
+
+
+def _cancel(service: ReservationService, op: dict) -> dict:
+    service.cancel_reservation(int(_field(op, 'reservation')))
+    return {}
+
+
+OPERATIONS = {
+    'add-client': _add_client,
+    'add-room': _add_room,
+    'deposit': _deposit,
+    'reserve': _reserve,
+    'reserve-group': _reserve_group,
+    'confirm': _confirm,
+    'cancel': _cancel,
+}
+
+
+def _execute(service: ReservationService, line_no: int, line: str) -> dict:
+    result = {'line': line_no}
+    try:
+        op = json.loads(line)
+        if not isinstance(op, dict):
+            raise ValueError('operation must be a JSON object')
+        result['op'] = op.get('op')
+        handler = OPERATIONS.get(op.get('op'))
+        if handler is None:
+            raise ValueError(f"unknown operation '{op.get('op')}'")
+        result['result'] = handler(service, op)
+        result['ok'] = True
+    except (ValueError, TypeError) as e:
+        result['ok'] = False
+        result['error'] = str(e)
+    return result
+
+
+def run_batch(service: ReservationService, lines: Iterable[str], out: TextIO,
+              commit_every: int = 0, stop_on_error: bool = False) -> int:
+    """Run JSONL operations against one service and stream JSONL results.
+
+    Operations share the service's unit of work: each one is a savepoint,
+    so a failing operation leaves no trace, and the changes are committed
+    every ``commit_every`` operations (0 commits once at the end). With
+    ``stop_on_error`` the batch ends at the first failure; operations that
+    succeeded before it are still committed. Returns the number of failed
+    operations.
+    """
+    failures = 0
+    pending = 0
+    stop = False
+    lines = iter(enumerate(lines, start=1))
+    while not stop:
+        with service.uow:
+            for line_no, line in lines:
+                if not line.strip():
+                    continue
+                result = _execute(service, line_no, line)
+                out.write(json.dumps(result) + '\n')
+                if not result['ok']:
+                    failures += 1
+                    if stop_on_error:
+                        stop = True
+                        break
+                pending += 1
+                if commit_every and pending >= commit_every:
+                    pending = 0
+                    break
+            else:
+                stop = True
+        out.flush()
+    return failures
@@ -1,6 +1,11 @@
 import argparse
+import json
+import sys
+from itertools import chain
 
-from . import db
+from . import db, metrics
+from .config import ARCHIVE_ENV, DB_ENV, STORAGE_ENGINES, STORAGE_ENV
+from .daemon_client import forward, socket_path
 
 
 def cmd_init(_args):
@@ -30,12 +35,31 @@ def cmd_reserve(args):
         print(str(e))
 
 
+def cmd_reserve_group(args):
+    try:
+        ids = db.reserve_group(args.client, args.rooms, args.check_in, args.nights)
+    except ValueError as e:
+        print(str(e))
+        return
+    print(f"Reservations created with ids {', '.join(str(i) for i in ids)}")
+
+
 def cmd_list_rooms(_args):
     rooms = db.list_rooms()
     for r in rooms:
         print(f"{r['id']}: {r['room_type']} - {r['price']}€ - {r['description']}")
 
 
+def cmd_available_rooms(args):
+    try:
+        rooms = db.find_available_rooms(args.check_in, args.nights)
+    except ValueError as e:
+        print(str(e))
+        return
+    for r in rooms:
+        print(f"{r['id']}: {r['room_type']} - {r['price']}€ - {r['description']}")
+
+
 def cmd_confirm(args):
     try:
         db.confirm_reservation(args.reservation)
@@ -60,8 +84,264 @@ def cmd_deposit(args):
         print(str(e))
 
 
-def main(argv=None):
+def cmd_ledger(args):
+    try:
+        balance = db.wallet_balance(args.client, args.as_of)
+        payments = db.payment_history(args.client, args.since)
+        if args.archived:
+            payments = chain(db.archived_payments(args.client, args.since), payments)
+        for p in payments:
+            reservation = f" (reservation {p['reservation_id']})" if p['reservation_id'] else ""
+            print(f"{p['id']}: {p['created_at'] or '-'} {p['kind']} "
+                  f"{p['amount']:.2f} {p['currency']}{reservation}")
+        consistent = db.verify_wallet(args.client)
+    except ValueError as e:
+        print(str(e))
+        return
+    print(f"Balance: {balance:.2f} EUR")
+    print("Wallet matches ledger" if consistent else "Wallet does NOT match ledger")
+
+
+def _stream(rows, fmt: str, line, limit: int | None) -> None:
+    """Print rows one at a time, as JSON lines or as table lines from line(row)."""
+    last = None
+    count = 0
+    try:
+        for row in rows:
+            print(json.dumps(row) if fmt == "jsonl" else line(row))
+            last = row["id"]
+            count += 1
+    except ValueError as e:
+        print(str(e))
+        return
+    if fmt == "table" and limit is not None and count == limit:
+        print(f"-- next page: --after-id {last}")
+
+
+def _reservation_line(r: dict) -> str:
+    status = "confirmed" if r["confirmed"] else "unconfirmed"
+    return (f"{r['id']}: room {r['room_id']} client {r['client_id']} {r['check_in']} "
+            f"{r['nights']} nights {r['total_amount']:.2f}€ {status}")
+
+
+def _payment_line(p: dict) -> str:
+    reservation = f" (reservation {p['reservation_id']})" if p['reservation_id'] else ""
+    return (f"{p['id']}: {p['created_at'] or '-'} client {p['client_id']} {p['kind']} "
+            f"{p['amount']:.2f} {p['currency']}{reservation}")
+
+
+def cmd_list_reservations(args):
+    rows = db.list_reservations(args.client, args.room, args.start, args.end, args.confirmed,
+                                args.after_id, args.limit)
+    _stream(rows, args.format, _reservation_line, args.limit)
+
+
+def cmd_list_payments(args):
+    rows = db.list_payments(args.client, args.kind, args.start, args.end, args.after_id, args.limit)
+    _stream(rows, args.format, _payment_line, args.limit)
+
+
+def cmd_archive(args):
+    try:
+        counts = db.archive(args.before)
+    except ValueError as e:
+        print(str(e))
+        return
+    print(f"Archived {counts['reservations']} reservations and {counts['payments']} payments")
+
+
+def cmd_report(args):
+    from .reports import render
+
+    try:
+        if args.kind == "occupancy":
+            report = db.occupancy_report(args.start, args.end, args.by)
+        else:
+            report = db.revenue_report(args.start, args.end)
+    except ValueError as e:
+        print(str(e))
+        return
+    render(report, args.format, sys.stdout)
+
+
+def _calendar_period(args) -> tuple[str, str]:
+    from calendar import monthrange
+    from datetime import datetime
+
+    if args.month:
+        try:
+            first = datetime.strptime(args.month, "%Y-%m").date()
+        except ValueError:
+            raise ValueError(f"invalid month '{args.month}', expected YYYY-MM") from None
+        return first.isoformat(), first.replace(day=monthrange(first.year, first.month)[1]).isoformat()
+    if not (args.start and args.end):
+        raise ValueError("give --month, or --from and --to")
+    return args.start, args.end
+
+
+def _month_grids(start: str, end: str, booked: int) -> list[str]:
+    """Month calendars of [start, end], booked nights shown as '--'."""
+    from calendar import monthrange
+    from datetime import date, timedelta
+
+    first, last = date.fromisoformat(start), date.fromisoformat(end)
+    month = first.replace(day=1)
+    lines = []
+    while month <= last:
+        days = monthrange(month.year, month.month)[1]
+        lines.append(month.strftime("%B %Y").center(20).rstrip())
+        lines.append("Mo Tu We Th Fr Sa Su")
+        cells = ["  "] * month.weekday()
+        for n in range(1, days + 1):
+            day = month.replace(day=n)
+            if not first <= day <= last:
+                cells.append("  ")
+            elif booked >> (day - first).days & 1:
+                cells.append("--")
+            else:
+                cells.append(f"{n:2d}")
+        weeks = (" ".join(cells[i:i + 7]).rstrip() for i in range(0, len(cells), 7))
+        lines.extend(week for week in weeks if week)
+        month += timedelta(days=days)
+    return lines
+
+
+def cmd_calendar(args):
+    from datetime import date
+
+    try:
+        start, end = _calendar_period(args)
+        rooms = db.occupancy_calendar(start, end, args.room, args.type)
+        window = db.first_free_window(args.nights, start, args.room, args.type) if args.nights else None
+    except ValueError as e:
+        print(str(e))
+        return
+    days = (date.fromisoformat(end) - date.fromisoformat(start)).days + 1
+    for room in rooms:
+        print(f"Room {room['id']} ({room['room_type']})")
+        for line in _month_grids(start, end, room["booked"]):
+            print(line)
+        print(f"Free nights: {days - bin(room['booked']).count('1')}/{days}")
+        print()
+    if window:
+        room_id, check_in = window
+        print(f"First free {args.nights}-night stay from {start}: {check_in} in room {room_id}")
+
+
+def cmd_stats(args):
+    if args.reset:
+        db.reset_stats()
+        print("Metrics cleared")
+        return
+    data = db.stats()
+    if args.format == "json":
+        print(json.dumps(data, indent=2))
+    elif args.format == "prometheus":
+        print(metrics.render_prometheus(data), end="")
+    else:
+        print(metrics.render_table(data), end="")
+
+
+def cmd_compact(_args):
+    if db.compact():
+        print("Database compacted")
+    else:
+        print("Nothing to compact for this storage engine")
+
+
+def cmd_migrate_sqlite(args):
+    try:
+        counts = db.migrate_to_sqlite(args.source, args.target)
+    except (OSError, ValueError) as e:
+        print(str(e))
+        return
+    summary = ", ".join(f"{n} {name}" for name, n in counts.items())
+    print(f"Imported {summary} into {args.target}")
+
+
+def cmd_migrate_sharded(args):
+    try:
+        counts = db.migrate_to_sharded(args.source, args.target)
+    except (OSError, ValueError) as e:
+        print(str(e))
+        return
+    summary = ", ".join(f"{n} {name}" for name, n in counts.items())
+    print(f"Converted {summary} into {args.target}")
+
+
+def cmd_batch(args):
+    from .batch import run_batch
+
+    source = sys.stdin if args.file == "-" else open(args.file, "r", encoding="utf-8")
+    try:
+        failures = run_batch(db.warm_up(), source, sys.stdout,
+                             commit_every=args.commit_every, stop_on_error=args.stop_on_error)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+    if failures:
+        sys.exit(1)
+
+
+def cmd_import(args):
+    from contextlib import ExitStack
+    from .transfer import COLLECTIONS, Importer, file_format, read_rows
+
+    files = [(name, getattr(args, name)) for name in COLLECTIONS if getattr(args, name)]
+    if not files:
+        print("give at least one of --clients, --rooms, --reservations or --payments")
+        return
+    with ExitStack() as stack:
+        try:
+            sources = [(name, path, stack.enter_context(open(path, "r", encoding="utf-8", newline="")))
+                       for name, path in files]
+        except OSError as e:
+            print(str(e))
+            sys.exit(1)
+        importer = Importer(db.warm_up(), args.commit_every, args.stop_on_error)
+        for name, path, source in sources:
+            importer.load(name, read_rows(source, file_format(path, args.format)), sys.stdout)
+            if importer.stopped:
+                break
+    summary = ", ".join(f"{importer.counts[name]} {name}" for name, _ in files)
+    print(f"Imported {summary}")
+    if importer.failures:
+        print(f"{importer.failures} rows rejected")
+        sys.exit(1)
+
+
+def cmd_export(args):
+    from .transfer import export_collection, file_format
+
+    fmt = file_format(args.output or "", args.format)
+    if not args.output:
+        export_collection(db.warm_up(), args.collection, sys.stdout, fmt)
+        return
+    try:
+        with open(args.output, "w", encoding="utf-8", newline="") as out:
+            count = export_collection(db.warm_up(), args.collection, out, fmt)
+    except OSError as e:
+        print(str(e))
+        sys.exit(1)
+    print(f"Exported {count} {args.collection} to {args.output}")
+
+
+def cmd_serve(args):
+    from .server import serve
+
+    path = args.socket or socket_path()
+    print(f"Listening on {path}", flush=True)
+    serve(path)
+
+
+def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description="XYZ Hotel CLI")
+    parser.add_argument("--metrics", action="store_true",
+                        help="record storage and latency metrics (see the stats command)")
+    parser.add_argument("--db", metavar="PATH",
+                        help=f"database file (directory for sharded); default: ${DB_ENV} or the engine's own")
+    parser.add_argument("--storage", choices=STORAGE_ENGINES,
+                        help=f"storage engine; default: ${STORAGE_ENV} or json")
     sub = parser.add_subparsers(dest="command")
 
     init_p = sub.add_parser("init-db")
@@ -82,6 +362,22 @@ def main(argv=None):
     list_rooms_p = sub.add_parser("list-rooms")
     list_rooms_p.set_defaults(func=cmd_list_rooms)
 
+    available_p = sub.add_parser("available-rooms")
+    available_p.add_argument("--check-in", required=True)
+    available_p.add_argument("--nights", type=int, required=True)
+    available_p.set_defaults(func=cmd_available_rooms)
+
+    calendar_p = sub.add_parser("calendar")
+    rooms = calendar_p.add_mutually_exclusive_group(required=True)
+    rooms.add_argument("--room", type=int)
+    rooms.add_argument("--type")
+    calendar_p.add_argument("--month", help="YYYY-MM, instead of --from/--to")
+    calendar_p.add_argument("--from", dest="start")
+    calendar_p.add_argument("--to", dest="end")
+    calendar_p.add_argument("--nights", type=int, default=0,
+                            help="also find the first free stay of that many nights")
+    calendar_p.set_defaults(func=cmd_calendar)
+
     res_p = sub.add_parser("reserve")
     res_p.add_argument("--client", type=int, required=True)
     res_p.add_argument("--room", type=int, required=True)
@@ -89,6 +385,13 @@ def main(argv=None):
     res_p.add_argument("--nights", type=int, required=True)
     res_p.set_defaults(func=cmd_reserve)
 
+    group_p = sub.add_parser("reserve-group")
+    group_p.add_argument("--client", type=int, required=True)
+    group_p.add_argument("--rooms", type=int, nargs="+", required=True)
+    group_p.add_argument("--check-in", required=True)
+    group_p.add_argument("--nights", type=int, required=True)
+    group_p.set_defaults(func=cmd_reserve_group)
+
     confirm_p = sub.add_parser("confirm")
     confirm_p.add_argument("--reservation", type=int, required=True)
     confirm_p.set_defaults(func=cmd_confirm)
@@ -103,12 +406,124 @@ def main(argv=None):
     deposit_p.add_argument("--currency", default="EUR")
     deposit_p.set_defaults(func=cmd_deposit)
 
+    ledger_p = sub.add_parser("ledger")
+    ledger_p.add_argument("--client", type=int, required=True)
+    ledger_p.add_argument("--since")
+    ledger_p.add_argument("--as-of")
+    ledger_p.add_argument("--archived", action="store_true", help="also list archived payments")
+    ledger_p.set_defaults(func=cmd_ledger)
+
+    list_res_p = sub.add_parser("list-reservations")
+    list_res_p.add_argument("--client", type=int)
+    list_res_p.add_argument("--room", type=int)
+    list_res_p.add_argument("--from", dest="start", help="first check-in day")
+    list_res_p.add_argument("--to", dest="end", help="last check-in day")
+    status = list_res_p.add_mutually_exclusive_group()
+    status.add_argument("--confirmed", dest="confirmed", action="store_true", default=None)
+    status.add_argument("--unconfirmed", dest="confirmed", action="store_false")
+    list_res_p.set_defaults(func=cmd_list_reservations)
+
+    list_pay_p = sub.add_parser("list-payments")
+    list_pay_p.add_argument("--client", type=int)
+    list_pay_p.add_argument("--kind")
+    list_pay_p.add_argument("--from", dest="start", help="first day recorded")
+    list_pay_p.add_argument("--to", dest="end", help="last day recorded")
+    list_pay_p.set_defaults(func=cmd_list_payments)
+
+    for list_p in (list_res_p, list_pay_p):
+        list_p.add_argument("--after-id", type=int, default=0, help="only ids above this one (next page)")
+        list_p.add_argument("--limit", type=int, help="page size; default: every match")
+        list_p.add_argument("--format", choices=["table", "jsonl"], default="table")
+
+    archive_p = sub.add_parser("archive")
+    archive_p.add_argument("--before", help=f"DATE; default: today minus ${ARCHIVE_ENV} days")
+    archive_p.set_defaults(func=cmd_archive)
+
+    report_p = sub.add_parser("report")
+    report_p.add_argument("kind", choices=["occupancy", "revenue"])
+    report_p.add_argument("--from", dest="start", required=True)
+    report_p.add_argument("--to", dest="end", required=True)
+    report_p.add_argument("--by", choices=["room", "type", "day"], default="room")
+    report_p.add_argument("--format", choices=["table", "csv", "json"], default="table")
+    report_p.set_defaults(func=cmd_report)
+
+    stats_p = sub.add_parser("stats")
+    stats_p.add_argument("--format", choices=["table", "json", "prometheus"], default="table")
+    stats_p.add_argument("--reset", action="store_true")
+    stats_p.set_defaults(func=cmd_stats)
+
+    compact_p = sub.add_parser("compact")
+    compact_p.set_defaults(func=cmd_compact)
+
+    migrate_p = sub.add_parser("migrate-sqlite")
+    migrate_p.add_argument("--source", default=db.DB_PATH)
+    migrate_p.add_argument("--target", default=db.sqlite.SQLITE_PATH)
+    migrate_p.set_defaults(func=cmd_migrate_sqlite)
+
+    sharded_p = sub.add_parser("migrate-sharded")
+    sharded_p.add_argument("--source", default=db.DB_PATH)
+    sharded_p.add_argument("--target", default=db.sharded.SHARDED_PATH)
+    sharded_p.set_defaults(func=cmd_migrate_sharded)
+
+    batch_p = sub.add_parser("batch")
+    batch_p.add_argument("file", nargs="?", default="-")
+    batch_p.add_argument("--commit-every", type=int, default=0)
+    policy = batch_p.add_mutually_exclusive_group()
+    policy.add_argument("--stop-on-error", dest="stop_on_error", action="store_true")
+    policy.add_argument("--continue", dest="stop_on_error", action="store_false")
+    batch_p.set_defaults(func=cmd_batch)
+
+    import_p = sub.add_parser("import")
+    for name in ("clients", "rooms", "reservations", "payments"):
+        import_p.add_argument(f"--{name}", metavar="FILE")
+    import_p.add_argument("--format", choices=["csv", "jsonl"], help="default: from the file extension")
+    import_p.add_argument("--commit-every", type=int, default=0)
+    policy = import_p.add_mutually_exclusive_group()
+    policy.add_argument("--stop-on-error", dest="stop_on_error", action="store_true")
+    policy.add_argument("--continue", dest="stop_on_error", action="store_false")
+    import_p.set_defaults(func=cmd_import)
+
+    export_p = sub.add_parser("export")
+    export_p.add_argument("collection", choices=["clients", "rooms", "reservations", "payments"])
+    export_p.add_argument("--format", choices=["csv", "jsonl"], help="default: from the file extension")
+    export_p.add_argument("--output", help="file to write instead of stdout")
+    export_p.set_defaults(func=cmd_export)
+
+    serve_p = sub.add_parser("serve")
+    serve_p.add_argument("--socket", default=None)
+    serve_p.set_defaults(func=cmd_serve)
+
+    return parser
+
+
+def run(argv=None):
+    parser = build_parser()
     args = parser.parse_args(argv)
+    if args.db or args.storage:
+        db.configure(args.storage, args.db)
+    if args.metrics:
+        db.enable_metrics()
     if hasattr(args, "func"):
-        args.func(args)
+        try:
+            args.func(args)
+        except ValueError as e:  # such as a database locked by another process
+            print(str(e))
     else:
         parser.print_help()
 
 
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    status = forward(argv)
+    if status is None:
+        try:
+            run(argv)
+        finally:
+            if metrics.ENABLED:
+                metrics.flush()
+    elif status:
+        sys.exit(status)
+
+
 if __name__ == "__main__":
     main()
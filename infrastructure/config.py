@@ -0,0 +1,42 @@
+import os
+
+STORAGE_ENV = 'HOTEL_STORAGE'
+RATES_ENV = 'HOTEL_RATES'
+DB_ENV = 'HOTEL_DB'
+ARCHIVE_ENV = 'HOTEL_ARCHIVE_DAYS'
+STORAGE_ENGINES = ('json', 'log', 'sqlite', 'sharded', 'memory')
+
+
+def storage_engine() -> str:
+    """Storage engine selected through the ``HOTEL_STORAGE`` variable."""
+    engine = os.environ.get(STORAGE_ENV, 'json').lower()
+    if engine not in STORAGE_ENGINES:
+        raise ValueError(f"unknown storage engine '{engine}'")
+    return engine
+
+
+def database_path() -> str | None:
+    """Database location named by the ``HOTEL_DB`` variable, if any.
+
+    None leaves each engine at its default location.
+    """
+    return os.environ.get(DB_ENV) or None
+
+
+def rates_file() -> str | None:
+    """Exchange rates file named by the ``HOTEL_RATES`` variable, if any."""
+    return os.environ.get(RATES_ENV) or None
+
+
+def archive_days() -> int | None:
+    """Age in days past which the ``HOTEL_ARCHIVE_DAYS`` policy archives records, if set."""
+    value = os.environ.get(ARCHIVE_ENV)
+    if not value:
+        return None
+    try:
+        days = int(value)
+    except ValueError:
+        days = -1
+    if days < 0:
+        raise ValueError(f"invalid {ARCHIVE_ENV} '{value}', expected a number of days")
+    return days
@@ -0,0 +1,59 @@
+"""Thin client forwarding CLI invocations to a running ``main.py serve`` daemon.
+
+Deliberately limited to the standard library (and ``config``) and free of
+domain imports so a forwarded command does not pay for loading the
+application.
+"""
+import json
+import os
+import socket
+import sys
+
+from .config import DB_ENV, STORAGE_ENV
+
+SOCKET_PATH = os.path.join(os.path.dirname(__file__), '..', 'hotel.sock')
+SOCKET_ENV = 'HOTEL_SOCKET'
+NO_DAEMON_ENV = 'HOTEL_NO_DAEMON'
+LOCAL_COMMANDS = {'serve', 'migrate-sqlite', 'migrate-sharded', 'batch', 'import', 'export',
+                  'list-reservations', 'list-payments'}
+# Options and variables naming another database than the daemon's.
+LOCAL_OPTIONS = {'--db', '--storage'}
+LOCAL_ENV = (DB_ENV, STORAGE_ENV)
+
+
+def socket_path() -> str:
+    return os.environ.get(SOCKET_ENV, SOCKET_PATH)
+
+
+def forward(argv: list[str], path: str | None = None) -> int | None:
+    """Run argv on the daemon and relay its output.
+
+    Returns the command's exit status, or None when the command must run
+    locally or no daemon is listening.
+    """
+    if not argv or argv[0] in LOCAL_COMMANDS or os.environ.get(NO_DAEMON_ENV):
+        return None
+    if any(arg.split('=', 1)[0] in LOCAL_OPTIONS for arg in argv):
+        return None
+    if any(os.environ.get(name) for name in LOCAL_ENV):
+        return None
+    path = path or socket_path()
+    if not hasattr(socket, 'AF_UNIX') or not os.path.exists(path):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    with sock:
+        try:
+            sock.connect(path)
+        except OSError:
+            return None
+        # From here on the daemon may have run the command: never fall back.
+        try:
+            sock.sendall((json.dumps({'argv': argv}) + '\n').encode('utf-8'))
+            with sock.makefile('r', encoding='utf-8') as f:
+                response = json.loads(f.readline())
+        except (OSError, ValueError) as e:
+            sys.stderr.write(f"lost connection to daemon: {e}\n")
+            return 1
+    sys.stdout.write(response['stdout'])
+    sys.stderr.write(response['stderr'])
+    return response['status']
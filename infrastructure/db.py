@@ -1,35 +1,183 @@
+from domain.repositories import UnitOfWork
 from domain.services import ReservationService
+from domain.value_objects import set_rate_provider
+from .archive import FileArchiveRepository, archive_path
+from .config import ARCHIVE_ENV, archive_days, database_path, rates_file, storage_engine
+from . import metrics
+from .log_store import LogUnitOfWork
+from .memory_store import MemoryUnitOfWork
 from .repositories import (
     init_schema as _init_schema,
     DB_PATH as _DB_PATH,
+    DOCUMENT_CACHE,
     JsonClientRepository,
     JsonRoomRepository,
     JsonReservationRepository,
     JsonPaymentRepository,
+    JsonUnitOfWork,
 )
+from . import sharded_store as sharded
+from . import sqlite_repositories as sqlite
 
 DB_PATH = _DB_PATH
 
 
+_service: ReservationService | None = None
+_uow: UnitOfWork | None = None
+# Engine and location chosen with configure(); None defers to the environment.
+_engine: str | None = None
+_path: str | None = None
+
+
+def configure(engine: str | None = None, path: str | None = None) -> None:
+    """Select the storage engine and database location used by this module.
+
+    None falls back to ``HOTEL_STORAGE`` and ``HOTEL_DB``. A shared service
+    that was already built is dropped, so the next call builds one over the
+    new database.
+    """
+    global _engine, _path, _service, _uow
+    _engine, _path = engine, path
+    _service = _uow = None
+
+
+def _storage() -> tuple[str, str | None]:
+    return _engine or storage_engine(), _path or database_path()
+
+
 def init_schema() -> None:
-    _init_schema()
+    engine, path = _storage()
+    if engine == 'sqlite':
+        sqlite.init_schema(path or sqlite.SQLITE_PATH)
+    elif engine == 'sharded':
+        sharded.init_schema(path or sharded.SHARDED_PATH)
+    elif engine != 'memory':
+        _init_schema(path or DB_PATH)
 
-_service: ReservationService | None = None
+_ENGINES = {
+    'json': JsonUnitOfWork,
+    'log': LogUnitOfWork,
+}
+
+
+def _install_rates() -> None:
+    """Convert with the rates file named by ``HOTEL_RATES``, if any."""
+    path = rates_file()
+    if path:
+        from .rates import FileRateProvider
 
+        set_rate_provider(FileRateProvider(path))
 
-def _get_service() -> ReservationService:
-    global _service
+
+def create_service(engine: str, path: str | None = None, keep_loaded: bool = False,
+                   immediate: bool = False) -> ReservationService:
+    """Build a service over the given storage engine and database file.
+
+    The database (a directory for the sharded engine) is created, with its
+    default rooms, if it does not exist. The ``memory`` engine ignores path
+    and gives every service a new database of its own, without an archive;
+    the others archive to ``<path>.archive`` (see ``archive``). immediate
+    makes SQLite transactions take the write lock when they begin (for
+    services that write concurrently). With ``HOTEL_RATES`` set, conversions
+    use that rates file.
+    """
+    _install_rates()
+    if engine == 'memory':
+        uow = MemoryUnitOfWork()
+        repos = (JsonClientRepository(uow), JsonRoomRepository(uow),
+                 JsonReservationRepository(uow), JsonPaymentRepository(uow))
+    elif engine == 'sqlite':
+        path = path or sqlite.SQLITE_PATH
+        sqlite.init_schema(path)
+        uow = sqlite.SqliteUnitOfWork(path, immediate=immediate)
+        repos = (sqlite.SqliteClientRepository(uow), sqlite.SqliteRoomRepository(uow),
+                 sqlite.SqliteReservationRepository(uow), sqlite.SqlitePaymentRepository(uow))
+    elif engine == 'sharded':
+        path = path or sharded.SHARDED_PATH
+        sharded.init_schema(path)
+        uow = sharded.ShardedUnitOfWork(path, keep_loaded=keep_loaded)
+        repos = (JsonClientRepository(uow), JsonRoomRepository(uow),
+                 sharded.ShardedReservationRepository(uow), JsonPaymentRepository(uow))
+    else:
+        path = path or DB_PATH
+        _init_schema(path)
+        uow = (JsonUnitOfWork(path, keep_loaded=keep_loaded) if engine == 'json'
+               else _ENGINES[engine](path))
+        repos = (JsonClientRepository(uow), JsonRoomRepository(uow),
+                 JsonReservationRepository(uow), JsonPaymentRepository(uow))
+    archive = None if engine == 'memory' else FileArchiveRepository(archive_path(path))
+    service = ReservationService(*repos, uow, archive)
+    if metrics.ENABLED:
+        metrics.instrument(service)
+    return service
+
+
+def create_async_service(engine: str | None = None, path: str | None = None,
+                         readers: int = 4, writers: int = 1):
+    """Build an ``AsyncReservationService`` whose calls run on worker threads (see ``async_executor``)."""
+    from functools import partial
+
+    from domain.async_services import AsyncReservationService
+    from .async_executor import (
+        ThreadedServiceExecutor,
+        ExecutorClientRepository,
+        ExecutorRoomRepository,
+        ExecutorReservationRepository,
+        ExecutorPaymentRepository,
+    )
+
+    default_engine, default_path = _storage()
+    engine, path = engine or default_engine, path or default_path
+    if engine == 'memory':
+        # Every worker thread would get a database of its own.
+        raise ValueError("the memory engine cannot be shared between worker threads")
+    executor = ThreadedServiceExecutor(partial(create_service, engine, path), readers, writers,
+                                       writer_factory=partial(create_service, engine, path, immediate=True))
+    return AsyncReservationService(executor, ExecutorClientRepository(executor), ExecutorRoomRepository(executor),
+                                   ExecutorReservationRepository(executor), ExecutorPaymentRepository(executor))
+
+
+def _get_service(keep_loaded: bool = False) -> ReservationService:
+    global _service, _uow
     if _service is None:
-        init_schema()
-        _service = ReservationService(
-            JsonClientRepository(),
-            JsonRoomRepository(),
-            JsonReservationRepository(),
-            JsonPaymentRepository(),
-        )
+        engine, path = _storage()
+        # Service calls read before they write: with deferred SQLite
+        # transactions a concurrent writer would make the upgrade fail.
+        _service = create_service(engine, path, keep_loaded=keep_loaded, immediate=True)
+        _uow = _service.uow
     return _service
 
 
+def enable_metrics() -> None:
+    """Turn metrics on, including for a service that was already built."""
+    if not metrics.ENABLED:
+        metrics.enable()
+        if _service is not None:
+            metrics.instrument(_service)
+
+
+def stats() -> dict:
+    return metrics.load()
+
+
+def reset_stats() -> None:
+    metrics.clear()
+
+
+def invalidate_cache() -> None:
+    """Forget the parsed JSON documents this process keeps between calls."""
+    DOCUMENT_CACHE.invalidate()
+
+
+def warm_up() -> ReservationService:
+    """Build the shared service for a long-running process.
+
+    The parsed database is kept in memory between calls instead of being
+    re-read by every operation.
+    """
+    return _get_service(keep_loaded=True)
+
+
 def add_client(full_name: str, email: str, phone: str) -> int:
     return _get_service().add_client(full_name, email, phone).id
 
@@ -55,13 +203,158 @@ def list_rooms() -> list:
     ]
 
 
+def find_available_rooms(check_in: str, nights: int) -> list:
+    rooms = _get_service().find_available_rooms(check_in, nights)
+    return [
+        {
+            "id": r.id,
+            "room_type": r.room_type,
+            "price": r.price_per_night.amount,
+            "description": r.description,
+        }
+        for r in rooms
+    ]
+
+
+def payment_history(client_id: int, since: str | None = None):
+    for p in _get_service().payment_history(client_id, since):
+        yield {
+            "id": p.id,
+            "created_at": p.created_at,
+            "kind": p.kind,
+            "amount": p.amount.amount,
+            "currency": p.amount.currency.value,
+            "reservation_id": p.reservation_id,
+        }
+
+
+def wallet_balance(client_id: int, as_of: str | None = None) -> float:
+    return _get_service().wallet_balance(client_id, as_of).amount
+
+
+def verify_wallet(client_id: int) -> bool:
+    return _get_service().verify_wallet(client_id)
+
+
+def occupancy_calendar(start: str, end: str, room_id: int | None = None,
+                       room_type: str | None = None) -> list:
+    return [
+        {"id": room.id, "room_type": room.room_type, "booked": booked}
+        for room, booked in _get_service().occupancy_calendar(start, end, room_id, room_type)
+    ]
+
+
+def first_free_window(nights: int, after: str, room_id: int | None = None,
+                      room_type: str | None = None) -> tuple[int, str]:
+    room, check_in = _get_service().first_free_window(nights, after, room_id, room_type)
+    return room.id, check_in
+
+
+def occupancy_report(start: str, end: str, by: str = "room") -> dict:
+    return _get_service().occupancy_report(start, end, by)
+
+
+def revenue_report(start: str, end: str) -> dict:
+    return _get_service().revenue_report(start, end)
+
+
 def add_reservation(client_id: int, room_id: int, check_in: str, nights: int) -> int:
     return _get_service().add_reservation(client_id, room_id, check_in, nights).id
 
 
+def reserve_group(client_id: int, room_ids: list[int], check_in: str, nights: int) -> list[int]:
+    return [r.id for r in _get_service().reserve_group(client_id, room_ids, check_in, nights)]
+
+
 def confirm_reservation(reservation_id: int) -> None:
     _get_service().confirm_reservation(reservation_id)
 
 
 def cancel_reservation(reservation_id: int) -> None:
     _get_service().cancel_reservation(reservation_id)
+
+
+def archive(before: str | None = None) -> dict[str, int]:
+    """Archive the records older than before (by default, the ``HOTEL_ARCHIVE_DAYS`` policy)."""
+    if before is None:
+        days = archive_days()
+        if days is None:
+            raise ValueError(f"give --before or set {ARCHIVE_ENV}")
+        from datetime import date, timedelta
+
+        before = (date.today() - timedelta(days=days)).isoformat()
+    return _get_service().archive_before(before)
+
+
+def archived_payments(client_id: int | None = None, start: str | None = None, end: str | None = None):
+    for p in _get_service().archived_payments(client_id, start, end):
+        yield {
+            "id": p.id,
+            "created_at": p.created_at,
+            "kind": p.kind,
+            "amount": p.amount.amount,
+            "currency": p.amount.currency.value,
+            "reservation_id": p.reservation_id,
+        }
+
+
+def archived_reservations(start: str | None = None, end: str | None = None):
+    for r in _get_service().archived_reservations(start, end):
+        yield {
+            "id": r.id,
+            "client_id": r.client_id,
+            "room_id": r.room_id,
+            "check_in": r.check_in,
+            "nights": r.nights,
+            "total": r.total_amount.amount,
+            "confirmed": r.confirmed,
+        }
+
+
+def list_reservations(client_id: int | None = None, room_id: int | None = None, start: str | None = None,
+                      end: str | None = None, confirmed: bool | None = None, after_id: int = 0,
+                      limit: int | None = None):
+    """Matching reservations one at a time, in the layout of ``export --format jsonl``."""
+    for r in _get_service().query_reservations(client_id, room_id, start, end, confirmed, after_id, limit):
+        yield {
+            "id": r.id,
+            "client_id": r.client_id,
+            "room_id": r.room_id,
+            "check_in": r.check_in,
+            "nights": r.nights,
+            "total_amount": r.total_amount.amount,
+            "confirmed": r.confirmed,
+        }
+
+
+def list_payments(client_id: int | None = None, kind: str | None = None, start: str | None = None,
+                  end: str | None = None, after_id: int = 0, limit: int | None = None):
+    """Matching payments one at a time, in the layout of ``export --format jsonl``."""
+    for p in _get_service().query_payments(client_id, kind, start, end, after_id, limit):
+        yield {
+            "id": p.id,
+            "client_id": p.client_id,
+            "reservation_id": p.reservation_id,
+            "amount": p.amount.amount,
+            "currency": p.amount.currency.value,
+            "kind": p.kind,
+            "created_at": p.created_at,
+            "eur_minor": p.eur_minor,
+        }
+
+
+def compact() -> bool:
+    """Fold the write-ahead log into the snapshot; False if the engine has none."""
+    _get_service()
+    if not isinstance(_uow, LogUnitOfWork):
+        return False
+    _uow.compact()
+    return True
+
+
+def migrate_to_sqlite(json_path: str = DB_PATH, sqlite_path: str = sqlite.SQLITE_PATH) -> dict:
+    return sqlite.migrate_from_json(json_path, sqlite_path)
+
+
+def migrate_to_sharded(json_path: str = DB_PATH, directory: str = sharded.SHARDED_PATH) -> dict:
+    return sharded.convert_from_json(json_path, directory)
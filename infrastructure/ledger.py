@@ -0,0 +1,86 @@
+"""Per-client payment ledger for the document (JSON and log) stores.
+
+Payments are append-only, and the ``client_payments`` index lists each
+client's payment ids in the order they were recorded, which is also date
+order. Every ``CHECKPOINT_EVERY`` payments of a client a checkpoint row
+stores the client's running wallet balance, so a balance as of any day
+only sums the payments recorded after the closest earlier checkpoint.
+"""
+from bisect import bisect_left, bisect_right
+
+from domain.ledger import payment_day, wallet_effect_minor
+
+CHECKPOINT_EVERY = 64
+
+
+def _effect(record: dict) -> int:
+    return wallet_effect_minor(record['amount'], record['currency'], record['type'],
+                               record.get('created_at'), record.get('eur_minor'))
+
+
+def build_checkpoints(data: dict) -> None:
+    """Recompute every checkpoint of a document from its payments."""
+    data['checkpoints'] = {}
+    counts: dict[int, int] = {}
+    balances: dict[int, int] = {}
+    for record in sorted(data['payments'].values(), key=lambda r: r['id']):
+        client_id = record['client_id']
+        counts[client_id] = counts.get(client_id, 0) + 1
+        balances[client_id] = balances.get(client_id, 0) + _effect(record)
+        if counts[client_id] % CHECKPOINT_EVERY == 0:
+            data['checkpoints'][str(record['id'])] = _checkpoint(record, balances[client_id])
+
+
+def _checkpoint(record: dict, balance: int) -> dict:
+    return {'id': record['id'], 'client_id': record['client_id'],
+            'created_at': record.get('created_at'), 'balance': balance}
+
+
+def record_payment(uow, record: dict) -> None:
+    """Add a checkpoint if record completes a block of the client's payments."""
+    ids = uow.lookup('client_payments', record['client_id'])
+    if len(ids) % CHECKPOINT_EVERY == 0:
+        uow.insert('checkpoints', _checkpoint(record, balance_minor(uow, record['client_id'])))
+
+
+def drop_checkpoints(uow, client_id: int, through: int) -> None:
+    """Delete the client's checkpoints at payment ids up to through.
+
+    Used when payments up to through are replaced by a balance forward,
+    which already carries what those checkpoints counted.
+    """
+    for checkpoint_id in uow.lookup('client_checkpoints', client_id):
+        if checkpoint_id <= through:
+            uow.delete('checkpoints', checkpoint_id)
+
+
+def _day(uow, table: str):
+    return lambda record_id: payment_day(uow.find(table, record_id).get('created_at'))
+
+
+def history(uow, client_id: int, since: str | None = None):
+    """Yield the client's payment records from day since onwards."""
+    ids = uow.lookup('client_payments', client_id)
+    start = 0
+    if since is not None:
+        start = bisect_left(ids, since, key=_day(uow, 'payments'))
+    for payment_id in ids[start:]:
+        yield uow.find('payments', payment_id)
+
+
+def balance_minor(uow, client_id: int, as_of: str | None = None) -> int:
+    """Wallet balance in euro cents at the end of day as_of (now if None)."""
+    checkpoints = uow.lookup('client_checkpoints', client_id)
+    if as_of is not None:
+        checkpoints = checkpoints[:bisect_right(checkpoints, as_of, key=_day(uow, 'checkpoints'))]
+    balance, after = 0, 0
+    if checkpoints:
+        latest = uow.find('checkpoints', checkpoints[-1])
+        balance, after = latest['balance'], latest['id']
+    ids = uow.lookup('client_payments', client_id)
+    for payment_id in ids[bisect_right(ids, after):]:
+        record = uow.find('payments', payment_id)
+        if as_of is not None and payment_day(record.get('created_at')) > as_of:
+            break
+        balance += _effect(record)
+    return balance
@@ -0,0 +1,141 @@
+import json
+import os
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+from . import metrics
+from .repositories import JsonUnitOfWork, _drop, _load_document, _put, _save, _signature
+
+LOG_SUFFIX = '.log'
+COMPACT_EVERY = 1000
+
+
+@contextmanager
+def _locked(path: str):
+    """Hold an exclusive lock on the log so appends never race a compaction."""
+    fd = os.open(path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        yield fd
+    finally:
+        os.close(fd)
+
+
+def _apply(data: dict, ops: list) -> None:
+    """Apply the operations of one logged transaction to a document."""
+    for op in ops:
+        if op[0] == 'auto_id':
+            data['auto_id'] = dict(op[1])
+            continue
+        kind, name, value = op
+        if kind == 'put':
+            _put(data, name, value)
+        else:
+            _drop(data, name, value)
+
+
+class LogUnitOfWork(JsonUnitOfWork):
+    """Unit of work that appends each commit to a write-ahead log.
+
+    The database file acts as the snapshot; every committed transaction is
+    appended to ``<snapshot>.log`` as a single JSON line holding the final
+    value of each record it touched, so a write costs the size of the
+    change rather than the size of the database. The parsed state is kept
+    warm between transactions and only the log tail written by other
+    processes is replayed at the start of the next one. Records are
+    idempotent, which makes a crash during compaction harmless: replaying
+    an already folded log over the new snapshot yields the same state.
+    """
+
+    def __init__(self, path: str | None = None, compact_every: int = COMPACT_EVERY):
+        super().__init__(path, snapshot=False)
+        self.log_path = self.path + LOG_SUFFIX
+        self.compact_every = compact_every
+        self._state: dict | None = None
+        self._snapshot_sig: tuple | None = None
+        self._offset = 0
+        self._pending = 0
+
+    def _read(self) -> dict:
+        sig = _signature(self.path)
+        if self._state is None or sig != self._snapshot_sig:
+            self._state = _load_document(self.path)
+            self._snapshot_sig = _signature(self.path)
+            self._offset = 0
+            self._pending = 0
+        self._replay()
+        return self._state
+
+    def _replay(self) -> None:
+        try:
+            size = os.path.getsize(self.log_path)
+        except FileNotFoundError:
+            size = 0
+        if size < self._offset:
+            self._state = None
+            self._read()
+            return
+        if size == self._offset:
+            return
+        if metrics.ENABLED:
+            metrics.count('bytes_read', size - self._offset)
+        with open(self.log_path, 'rb') as f:
+            f.seek(self._offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                self._offset += len(line)
+                try:
+                    ops = json.loads(line)['ops']
+                except ValueError:
+                    continue
+                _apply(self._state, ops)
+                self._pending += 1
+
+    def _write(self, data: dict) -> None:
+        ops = []
+        for name, ids in self._dirty.items():
+            if name == 'auto_id':
+                ops.append(['auto_id', data['auto_id']])
+                continue
+            for record_id in sorted(ids):
+                record = self.find(name, record_id)
+                ops.append(['put', name, record] if record else ['del', name, record_id])
+        line = (json.dumps({'ops': ops}) + '\n').encode('utf-8')
+        try:
+            with _locked(self.log_path) as fd:
+                start = os.fstat(fd).st_size
+                if start and os.pread(fd, 1, start - 1) != b'\n':
+                    # Isolate the torn tail of a crashed writer on its own line.
+                    line = b'\n' + line
+                os.write(fd, line)
+                os.fsync(fd)
+            if metrics.ENABLED:
+                metrics.count('saves')
+                metrics.count('bytes_written', len(line))
+        except BaseException:
+            self._state = None
+            raise
+        if start == self._offset:
+            self._offset += len(line)
+        self._pending += 1
+        if self._pending >= self.compact_every:
+            self.compact()
+
+    def compact(self) -> None:
+        """Fold the log into a fresh snapshot and truncate it."""
+        if self._savepoints:
+            raise RuntimeError('cannot compact inside a transaction')
+        with _locked(self.log_path) as fd:
+            state = self._read()
+            _save(state, self.path)
+            os.ftruncate(fd, 0)
+            os.fsync(fd)
+        self._snapshot_sig = _signature(self.path)
+        self._offset = 0
+        self._pending = 0
@@ -0,0 +1,34 @@
+"""Storage engine keeping the whole database in process memory.
+
+Nothing is read from or written to disk. Every ``MemoryUnitOfWork`` owns
+a separate database, created with the preloaded rooms, that lives as long
+as the unit of work. It backs the JSON repositories with the same
+document layout, secondary indexes and undo log, so commits, rollbacks
+and savepoints behave as with the ``json`` engine, and the lookup
+structures the repositories derive from the document are kept between
+transactions. Suited to tests and to programs embedding the service.
+"""
+from .repositories import JsonUnitOfWork, empty_document, highest_id
+
+MEMORY_PATH = ':memory:'
+
+
+class MemoryUnitOfWork(JsonUnitOfWork):
+    def __init__(self):
+        super().__init__(MEMORY_PATH, keep_loaded=True)
+        self._document = empty_document()
+        self._last_ids: dict[str, int] = {}
+
+    def _read(self) -> dict:
+        return self._document
+
+    def _write(self, data: dict) -> None:
+        pass  # committed changes are already in the document
+
+    def next_id(self, entity: str) -> int:
+        # As with the id blocks of the file engines, an id is never reused,
+        # even if the insert that took it is rolled back.
+        if entity not in self._last_ids:
+            self._last_ids[entity] = highest_id(self._document, entity)
+        self._last_ids[entity] += 1
+        return self._last_ids[entity]
@@ -0,0 +1,229 @@
+"""Opt-in counters and latency histograms for the storage layer and the service.
+
+Metrics are off unless ``HOTEL_METRICS=1`` is set or ``main.py --metrics``
+is used. Every hook is guarded by ``if metrics.ENABLED``, so when they are
+off the cost is one attribute lookup per hook.
+
+A CLI process merges what it recorded into ``metrics.json`` (or
+``HOTEL_METRICS_FILE``) when it exits and the daemon does so when it
+stops; ``main.py stats`` reports that file plus the live numbers of the
+process answering it.
+"""
+import json
+import os
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+METRICS_ENV = 'HOTEL_METRICS'
+METRICS_FILE_ENV = 'HOTEL_METRICS_FILE'
+METRICS_PATH = os.path.join(os.path.dirname(__file__), '..', 'metrics.json')
+
+# Upper bounds, in seconds, of the latency histogram buckets (plus +Inf).
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+           0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Name of the label distinguishing the series of a metric, if any.
+LABELS = {
+    'rows_scanned': 'collection',
+    'lookups': 'collection',
+    'service_latency_seconds': 'method',
+}
+
+ENABLED = os.environ.get(METRICS_ENV, '') not in ('', '0')
+
+_counters: dict[str, dict[str, float]] = {}
+_histograms: dict[str, dict[str, dict]] = {}
+
+
+def metrics_path() -> str:
+    return os.environ.get(METRICS_FILE_ENV) or METRICS_PATH
+
+
+def enable() -> None:
+    global ENABLED
+    ENABLED = True
+
+
+def count(name: str, value: float = 1, label: str = '') -> None:
+    series = _counters.setdefault(name, {})
+    series[label] = series.get(label, 0) + value
+
+
+def observe(name: str, seconds: float, label: str = '') -> None:
+    series = _histograms.setdefault(name, {})
+    histogram = series.get(label)
+    if histogram is None:
+        histogram = series[label] = {'buckets': [0] * (len(BUCKETS) + 1), 'sum': 0.0, 'count': 0}
+    histogram['buckets'][bisect_left(BUCKETS, seconds)] += 1
+    histogram['sum'] += seconds
+    histogram['count'] += 1
+
+
+def _timed(name: str, method):
+    @wraps(method)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            observe('service_latency_seconds', time.perf_counter() - start, name)
+    return wrapper
+
+
+def instrument(service) -> None:
+    """Record the latency of every public method of a service instance."""
+    for name in dir(type(service)):
+        if name.startswith('_') or name in vars(service):
+            continue
+        method = getattr(service, name)
+        if callable(method):
+            setattr(service, name, _timed(name, method))
+
+
+def snapshot() -> dict:
+    return {
+        'counters': {name: dict(series) for name, series in _counters.items()},
+        'histograms': {name: {label: {'buckets': list(h['buckets']), 'sum': h['sum'], 'count': h['count']}
+                              for label, h in series.items()}
+                       for name, series in _histograms.items()},
+    }
+
+
+def merge(into: dict, other: dict) -> dict:
+    """Add the metrics of other to into and return into."""
+    for name, series in other.get('counters', {}).items():
+        target = into.setdefault('counters', {}).setdefault(name, {})
+        for label, value in series.items():
+            target[label] = target.get(label, 0) + value
+    for name, series in other.get('histograms', {}).items():
+        target = into.setdefault('histograms', {}).setdefault(name, {})
+        for label, h in series.items():
+            current = target.setdefault(label, {'buckets': [0] * (len(BUCKETS) + 1), 'sum': 0.0, 'count': 0})
+            current['buckets'] = [a + b for a, b in zip(current['buckets'], h['buckets'])]
+            current['sum'] += h['sum']
+            current['count'] += h['count']
+    return into
+
+
+def reset() -> None:
+    _counters.clear()
+    _histograms.clear()
+
+
+@contextmanager
+def _metrics_file(path: str):
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    with os.fdopen(fd, 'r+', encoding='utf-8') as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        yield f
+
+
+def _read(f) -> dict:
+    text = f.read()
+    return json.loads(text) if text.strip() else {}
+
+
+def load(path: str | None = None) -> dict:
+    """Metrics stored in the metrics file, merged with those of this process."""
+    path = path or metrics_path()
+    stored = {}
+    if os.path.exists(path):
+        with _metrics_file(path) as f:
+            stored = _read(f)
+    return merge(stored, snapshot())
+
+
+def flush(path: str | None = None) -> None:
+    """Merge this process's metrics into the metrics file and start afresh."""
+    if not _counters and not _histograms:
+        return
+    with _metrics_file(path or metrics_path()) as f:
+        stored = merge(_read(f), snapshot())
+        f.seek(0)
+        f.truncate()
+        json.dump(stored, f)
+    reset()
+
+
+def clear(path: str | None = None) -> None:
+    """Forget every recorded metric, in this process and in the metrics file."""
+    reset()
+    path = path or metrics_path()
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def _quantile(h: dict, q: float) -> float:
+    """Upper bound of the bucket holding the q-quantile."""
+    rank = q * h['count']
+    seen = 0
+    for bound, n in zip(BUCKETS + (float('inf'),), h['buckets']):
+        seen += n
+        if n and seen >= rank:
+            return bound
+    return float('inf')
+
+
+def _series_name(name: str, label: str) -> str:
+    return f"{name}[{label}]" if label else name
+
+
+def render_table(data: dict) -> str:
+    lines = []
+    counters = data.get('counters', {})
+    if counters:
+        lines.append(f"{'counter':<36} {'value':>12}")
+        for name in sorted(counters):
+            for label, value in sorted(counters[name].items()):
+                lines.append(f"{_series_name(name, label):<36} {value:>12g}")
+        lookups = counters.get('lookups', {})
+        for label, rows in sorted(counters.get('rows_scanned', {}).items()):
+            if lookups.get(label):
+                lines.append(f"{_series_name('rows_per_lookup', label):<36} {rows / lookups[label]:>12.1f}")
+    for name, series in sorted(data.get('histograms', {}).items()):
+        if lines:
+            lines.append('')
+        lines.append(f"{name + ' (ms)':<28} {'count':>7} {'mean':>9} {'p50<=':>9} {'p95<=':>9} {'p99<=':>9}")
+        for label, h in sorted(series.items()):
+            mean = h['sum'] / h['count'] * 1000 if h['count'] else 0.0
+            quantiles = ' '.join(f"{_quantile(h, q) * 1000:>9g}" for q in (0.5, 0.95, 0.99))
+            lines.append(f"{label:<28} {h['count']:>7} {mean:>9.3f} {quantiles}")
+    return '\n'.join(lines) + '\n' if lines else 'No metrics recorded\n'
+
+
+def _labels(name: str, label: str, extra: str = '') -> str:
+    parts = [f'{LABELS[name]}="{label}"'] if label and name in LABELS else []
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def render_prometheus(data: dict) -> str:
+    """Metrics in the Prometheus text exposition format."""
+    lines = []
+    for name, series in sorted(data.get('counters', {}).items()):
+        metric = f"hotel_{name}_total"
+        lines.append(f"# TYPE {metric} counter")
+        for label, value in sorted(series.items()):
+            lines.append(f"{metric}{_labels(name, label)} {value:g}")
+    for name, series in sorted(data.get('histograms', {}).items()):
+        metric = f"hotel_{name}"
+        lines.append(f"# TYPE {metric} histogram")
+        for label, h in sorted(series.items()):
+            cumulative = 0
+            for bound, n in zip(BUCKETS + (float('inf'),), h['buckets']):
+                cumulative += n
+                le = '+Inf' if bound == float('inf') else f"{bound:g}"
+                bucket = _labels(name, label, f'le="{le}"')
+                lines.append(f"{metric}_bucket{bucket} {cumulative}")
+            lines.append(f"{metric}_sum{_labels(name, label)} {h['sum']:g}")
+            lines.append(f"{metric}_count{_labels(name, label)} {h['count']}")
+    return '\n'.join(lines) + '\n'
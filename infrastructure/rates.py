@@ -0,0 +1,96 @@
+"""Exchange rates read from a local CSV or JSON file.
+
+A CSV file has ``date,currency,rate`` rows and a JSON file maps each date
+to ``{currency: rate}``; a rate is the value of one unit in EUR, as in
+``RATES_TO_EUR``. Parsed tables are shared through ``RATE_TABLES``: a
+file is only stat'ed again once its entry is older than the cache's TTL,
+and only parsed again if it changed, so the daily rates file is read once
+however many conversions a job performs.
+"""
+import csv
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from domain.rates import RateProvider, RateTable
+
+TTL = 60.0
+MAX_TABLES = 8
+
+
+def _signature(path: str) -> tuple:
+    st = os.stat(path)
+    return st.st_ino, st.st_size, st.st_mtime_ns
+
+
+def load_rate_table(path: str) -> RateTable:
+    """Parse a rates file; raises ValueError if it is malformed."""
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        if path.lower().endswith('.csv'):
+            rates: dict[str, dict[str, float]] = {}
+            for row in csv.DictReader(f):
+                try:
+                    rates.setdefault(row['date'], {})[row['currency'].upper()] = float(row['rate'])
+                except (KeyError, TypeError, ValueError, AttributeError):
+                    raise ValueError(f"invalid rates row {row}") from None
+        else:
+            rates = json.load(f)
+            if not isinstance(rates, dict) or not all(isinstance(r, dict) for r in rates.values()):
+                raise ValueError('rates file must map dates to {currency: rate} objects')
+    return RateTable(rates)
+
+
+class RateTableCache:
+    """Parsed rate tables by file, least recently used first out."""
+
+    def __init__(self, ttl: float = TTL, max_tables: int = MAX_TABLES):
+        self.ttl = ttl
+        self.max_tables = max_tables
+        self._tables: OrderedDict[str, tuple] = OrderedDict()  # path -> (signature, checked, table)
+        self._lock = threading.Lock()
+
+    def get(self, path: str) -> RateTable:
+        key = os.path.abspath(path)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._tables.get(key)
+            if entry is not None:
+                self._tables.move_to_end(key)
+                if now - entry[1] < self.ttl:
+                    return entry[2]
+        sig = _signature(path)
+        if entry is not None and entry[0] == sig:
+            table = entry[2]
+        else:
+            table = load_rate_table(path)
+        with self._lock:
+            self._tables[key] = (sig, now, table)
+            self._tables.move_to_end(key)
+            while len(self._tables) > self.max_tables:
+                self._tables.popitem(last=False)
+        return table
+
+    def invalidate(self, path: str | None = None) -> None:
+        """Forget the table of path, or every table."""
+        with self._lock:
+            if path is None:
+                self._tables.clear()
+            else:
+                self._tables.pop(os.path.abspath(path), None)
+
+
+RATE_TABLES = RateTableCache()
+
+
+class FileRateProvider(RateProvider):
+    def __init__(self, path: str, cache: RateTableCache = RATE_TABLES):
+        self.path = path
+        self.cache = cache
+
+    def table(self) -> RateTable:
+        try:
+            return self.cache.get(self.path)
+        except OSError as e:
+            raise ValueError(f"cannot read exchange rates: {e}") from None
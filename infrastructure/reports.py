@@ -0,0 +1,39 @@
+import csv
+import json
+from typing import TextIO
+
+
+def _cell(key: str, value) -> str:
+    if isinstance(value, float):
+        return f"{value:.1%}" if key.endswith(('rate', 'share')) else f"{value:.2f}"
+    return str(value)
+
+
+def _table(report: dict, out: TextIO) -> None:
+    rows = report['rows']
+    if rows:
+        keys = list(rows[0])
+        cells = [[_cell(k, row[k]) for k in keys] for row in rows]
+        widths = [max(len(k), *(len(c[i]) for c in cells)) for i, k in enumerate(keys)]
+        out.write("  ".join(k.rjust(w) for k, w in zip(keys, widths)) + "\n")
+        for c in cells:
+            out.write("  ".join(v.rjust(w) for v, w in zip(c, widths)) + "\n")
+        out.write("\n")
+    for key, value in report['summary'].items():
+        out.write(f"{key}: {_cell(key, value)}\n")
+
+
+def render(report: dict, fmt: str, out: TextIO) -> None:
+    """Write a report as an aligned table, CSV rows or a JSON document."""
+    if fmt == 'json':
+        json.dump(report, out, indent=2)
+        out.write("\n")
+    elif fmt == 'csv':
+        if report['rows']:
+            writer = csv.DictWriter(out, fieldnames=list(report['rows'][0]), lineterminator="\n")
+            writer.writeheader()
+            writer.writerows(report['rows'])
+    elif fmt == 'table':
+        _table(report, out)
+    else:
+        raise ValueError(f"unknown report format '{fmt}'")
@@ -1,169 +1,840 @@
+from __future__ import annotations
+
 import json
 import os
+import tempfile
+import threading
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict
 
 from domain.entities import Client, Room, Reservation, Payment
 from domain.value_objects import Money, Currency
+from domain.availability import IntervalIndex, day_ordinal
+from domain.calendar import OccupancyCalendar
+from domain.ledger import payment_day, settle
+from domain.projections import RowView, select_columns
 from domain.repositories import (
     ClientRepository,
     RoomRepository,
     ReservationRepository,
     PaymentRepository,
+    UnitOfWork,
 )
+from . import ledger, metrics
+from .ids import IdAllocator, ids_path, read_counters, write_counters
+from .snapshot import SnapshotCache, snapshot_path, write_snapshot
 
 DB_PATH = os.path.join(os.path.dirname(__file__), '..', 'database.json')
+# Bytes of JSON (as stored on disk) the shared document cache may hold.
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+# Rows a streaming read fetches per transaction.
+CHUNK = 500
 
 
-def _load() -> dict:
-    with open(DB_PATH, 'r', encoding='utf-8') as f:
-        return json.load(f)
+FORMAT_VERSION = 3
+TABLES = ('clients', 'rooms', 'reservations', 'payments', 'checkpoints')
 
+# Secondary indexes persisted under data['indexes']: name -> (table, field, unique).
+INDEXES = {
+    'client_email': ('clients', 'email', True),
+    'room_reservations': ('reservations', 'room_id', False),
+    'client_payments': ('payments', 'client_id', False),
+    'client_checkpoints': ('checkpoints', 'client_id', False),
+}
+ENTITY_TABLES = {'client': 'clients', 'room': 'rooms', 'reservation': 'reservations', 'payment': 'payments'}
+# Stored column of every entity field a projection may request.
+COLUMNS = {
+    'clients': {'id': 'id', 'full_name': 'full_name', 'email': 'email', 'phone': 'phone', 'wallet': 'wallet'},
+    'rooms': {'id': 'id', 'room_type': 'room_type', 'price_per_night': 'price', 'description': 'description'},
+    'reservations': {'id': 'id', 'client_id': 'client_id', 'room_id': 'room_id', 'check_in': 'check_in',
+                     'nights': 'nights', 'total_amount': 'total', 'confirmed': 'confirmed'},
+    'payments': {'id': 'id', 'client_id': 'client_id', 'reservation_id': 'reservation_id', 'amount': 'amount',
+                 'currency': 'currency', 'kind': 'type', 'created_at': 'created_at', 'eur_minor': 'eur_minor'},
+}
+_TABLE_INDEXES = {table: [(name, field, unique) for name, (t, field, unique) in INDEXES.items() if t == table]
+                  for table in TABLES}
 
-def _save(data: dict) -> None:
-    with open(DB_PATH, 'w', encoding='utf-8') as f:
-        json.dump(data, f)
 
+def highest_id(data, entity: str) -> int:
+    """Highest id of entity used in a document, including the legacy auto_id counter."""
+    ids = [r['id'] for r in data[ENTITY_TABLES[entity]].values()]
+    return max([data['auto_id'].get(entity, 0), *ids])
 
-def init_schema() -> None:
-    if os.path.exists(DB_PATH):
-        return
-    data = {
-        'clients': [],
-        'rooms': [
-            {'id': 1, 'room_type': 'standard', 'price': 50, 'description': 'Single bed, Wifi, TV'},
-            {'id': 2, 'room_type': 'superior', 'price': 100, 'description': 'Double bed, Wifi, flat screen TV, minibar, air conditioner'},
-            {'id': 3, 'room_type': 'suite', 'price': 200, 'description': 'Double bed, Wifi, flat screen TV, minibar, air conditioner, bathtub, terrace'},
-        ],
-        'reservations': [],
-        'payments': [],
+
+def id_counters(data: dict, path: str) -> dict[str, int]:
+    """Highest id allocated per entity for the document stored at path."""
+    counters = read_counters(ids_path(path))
+    return {entity: max(highest_id(data, entity), counters.get(entity, 0)) for entity in ENTITY_TABLES}
+
+
+def _load(path: str = DB_PATH) -> dict:
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+        if metrics.ENABLED:
+            metrics.count('loads')
+            metrics.count('bytes_read', os.fstat(f.fileno()).st_size)
+    return data
+
+
+def _index_record(data: dict, table: str, record: dict) -> None:
+    for name, field, unique in _TABLE_INDEXES[table]:
+        index = data['indexes'][name]
+        if unique:
+            index[record[field]] = record['id']
+        else:
+            ids = index.setdefault(str(record[field]), [])
+            if not ids or ids[-1] < record['id']:
+                ids.append(record['id'])
+            else:
+                insort(ids, record['id'])
+
+
+def _unindex_record(data: dict, table: str, record: dict) -> None:
+    for name, field, unique in _TABLE_INDEXES[table]:
+        index = data['indexes'][name]
+        if unique:
+            if index.get(record[field]) == record['id']:
+                del index[record[field]]
+        else:
+            key = str(record[field])
+            ids = index.get(key, [])
+            if record['id'] in ids:
+                ids.remove(record['id'])
+            if not ids:
+                index.pop(key, None)
+
+
+def _put(data: dict, table: str, record: dict) -> dict | None:
+    """Store record under its id, keeping the secondary indexes up to date."""
+    rows = data[table]
+    key = str(record['id'])
+    old = rows.get(key)
+    if old is not None:
+        _unindex_record(data, table, old)
+    rows[key] = record
+    _index_record(data, table, record)
+    return old
+
+
+def _drop(data: dict, table: str, record_id: int) -> dict | None:
+    old = data[table].pop(str(record_id), None)
+    if old is not None:
+        _unindex_record(data, table, old)
+    return old
+
+
+def upgrade_document(data: dict) -> bool:
+    """Bring an older document up to the current format in place.
+
+    Version 1 stored collections as lists; version 2 had no ledger
+    checkpoints. Returns False if the document was already current.
+    """
+    version = data.get('version', 1)
+    if version == FORMAT_VERSION:
+        return False
+    if version < 2:
+        for table in ('clients', 'rooms', 'reservations', 'payments'):
+            data[table] = {str(r['id']): r for r in data.get(table, [])}
+    ledger.build_checkpoints(data)
+    rebuild_indexes(data)
+    data['version'] = FORMAT_VERSION
+    return True
+
+
+def rebuild_indexes(data: dict) -> None:
+    data['indexes'] = {name: {} for name in INDEXES}
+    for table in TABLES:
+        for record in data[table].values():
+            _index_record(data, table, record)
+
+
+def _load_document(path: str = DB_PATH) -> dict:
+    """Load the database, upgrading and rewriting an older format on first open."""
+    data = _load(path)
+    if upgrade_document(data):
+        _save(data, path)
+    return data
+
+
+def _save(data: dict, path: str = DB_PATH) -> tuple:
+    """Replace the database file atomically so readers never see half a file.
+
+    Returns the signature of the new file (see ``_signature``).
+    """
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)),
+                               prefix='.database-', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+            st = os.fstat(f.fileno())
+            if metrics.ENABLED:
+                metrics.count('saves')
+                metrics.count('bytes_written', st.st_size)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return st.st_ino, st.st_size, st.st_mtime_ns
+
+
+def _signature(path: str) -> tuple | None:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_ino, st.st_size, st.st_mtime_ns
+
+
+class DocumentCache:
+    """Parsed JSON databases shared by the units of work of a process.
+
+    An entry holds a document, its derived structures and the signature
+    the file had when it was parsed or written, and is only handed out
+    while the file still has that signature: a write by another process
+    or another unit of work invalidates it. A unit of work takes the entry
+    for the length of a transaction and puts it back when it ends, so two
+    transactions never share a document. Least recently used entries are
+    evicted once their files total more than ``max_bytes``.
+    """
+
+    def __init__(self, max_bytes: int = CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, tuple] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def take(self, path: str, sig: tuple | None) -> tuple[dict, dict] | None:
+        """Remove and return the (document, derived) of path, if sig is still current."""
+        with self._lock:
+            entry = self._entries.pop(os.path.abspath(path), None)
+            if entry is not None:
+                self._size -= entry[0][1]
+        hit = entry is not None and sig is not None and entry[0] == sig
+        if metrics.ENABLED:
+            metrics.count('cache_hits' if hit else 'cache_misses')
+        return (entry[1], entry[2]) if hit else None
+
+    def put(self, path: str, sig: tuple | None, data: dict, derived: dict) -> None:
+        if sig is None or sig[1] > self.max_bytes:
+            return
+        key = os.path.abspath(path)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= old[0][1]
+            self._entries[key] = (sig, data, derived)
+            self._size += sig[1]
+            while self._size > self.max_bytes:
+                _, (old_sig, _, _) = self._entries.popitem(last=False)
+                self._size -= old_sig[1]
+
+    def invalidate(self, path: str | None = None) -> None:
+        """Forget the document of path, or every document."""
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+                self._size = 0
+                return
+            entry = self._entries.pop(os.path.abspath(path), None)
+            if entry is not None:
+                self._size -= entry[0][1]
+
+
+DOCUMENT_CACHE = DocumentCache()
+
+
+def empty_document() -> dict:
+    """A new database holding only the preloaded rooms."""
+    return {
+        'version': FORMAT_VERSION,
+        'clients': {},
+        'rooms': {
+            '1': {'id': 1, 'room_type': 'standard', 'price': 50, 'description': 'Single bed, Wifi, TV'},
+            '2': {'id': 2, 'room_type': 'superior', 'price': 100, 'description': 'Double bed, Wifi, flat screen TV, minibar, air conditioner'},
+            '3': {'id': 3, 'room_type': 'suite', 'price': 200, 'description': 'Double bed, Wifi, flat screen TV, minibar, air conditioner, bathtub, terrace'},
+        },
+        'reservations': {},
+        'payments': {},
+        'checkpoints': {},
+        'indexes': {name: {} for name in INDEXES},
         'auto_id': {'client': 0, 'room': 3, 'reservation': 0, 'payment': 0}
     }
-    with open(DB_PATH, 'w', encoding='utf-8') as f:
+
+
+def init_schema(path: str = DB_PATH) -> None:
+    if os.path.exists(path):
+        return
+    data = empty_document()
+    with open(path, 'w', encoding='utf-8') as f:
         json.dump(data, f)
+    write_counters(ids_path(path), data['auto_id'])
+    DOCUMENT_CACHE.invalidate(path)
+
+
+class JsonUnitOfWork(UnitOfWork):
+    """Session shared by the JSON repositories.
+
+    The database file is parsed once when the outermost transaction begins
+    and written back once, atomically, when it commits, and only if a
+    collection was modified. Every change is recorded in an undo log so a
+    rollback, or the rollback of a nested savepoint, restores the previous
+    state without re-reading the file.
+
+    Otherwise the document, with its derived structures, is handed to the
+    process-wide ``cache`` when the transaction ends, and the next
+    transaction of any unit of work on the same file takes it back for the
+    cost of a ``stat()`` if the file has not changed since.
+
+    With ``keep_loaded`` the document survives between transactions and is
+    only re-read when the file's inode, size or mtime changed, which suits
+    a long-running process that is the only writer.
+
+    Repositories may attach derived structures (such as lookup indexes) to
+    the loaded document with ``derived``; they live as long as the document
+    and are dropped on rollback, so they are rebuilt from the restored data.
+
+    The document is only parsed when a transaction first needs it. Every
+    commit also writes a binary snapshot (see ``snapshot``), and until the
+    document is parsed ``find`` and ``records`` read from that snapshot
+    when it matches the JSON file, so read-only calls skip the parse.
+
+    New ids come from blocks reserved in ``database.json.ids`` (see
+    ``ids``), not from the document; the document's ``auto_id`` counters
+    only seed that file.
+    """
+
+    def __init__(self, path: str | None = None, keep_loaded: bool = False, snapshot: bool = True,
+                 cache: DocumentCache | None = DOCUMENT_CACHE):
+        self.path = path or DB_PATH
+        self.keep_loaded = keep_loaded
+        self.cache = None if keep_loaded else cache
+        self._read_sig: tuple | None = None
+        self.snapshot = snapshot and not keep_loaded
+        self._snapshots = SnapshotCache(self.path) if self.snapshot else None
+        self._snapshot_checked = False
+        self._current_snapshot = None
+        self._loaded: tuple[tuple, dict] | None = None
+        self._data: dict | None = None
+        self._undo: list = []
+        self._savepoints: list[int] = []
+        self._dirty: dict[str, set] = {}
+        self._derived: dict = {}
+        self.ids = IdAllocator(ids_path(self.path))
+
+    def begin(self) -> None:
+        self._savepoints.append(len(self._undo))
+
+    def commit(self) -> None:
+        self._savepoints.pop()
+        if self._savepoints:
+            return
+        try:
+            if self._dirty:
+                self._write(self._data)
+        finally:
+            self._reset()
+
+    def rollback(self) -> None:
+        mark = self._savepoints.pop()
+        while len(self._undo) > mark:
+            self._undo.pop()()
+        self._derived.clear()
+        if not self._savepoints:
+            self._reset()
+
+    def _read(self) -> dict:
+        # The signature is taken before parsing: a write racing the parse
+        # then only makes the document look stale, never fresh.
+        sig = _signature(self.path)
+        if not self.keep_loaded:
+            data = self._checkout(sig)
+            if data is None:
+                data = _load_document(self.path)
+                self._read_sig = sig
+            return data
+        if self._loaded is None or self._loaded[0] != sig:
+            self._loaded = (sig, _load_document(self.path))
+            self._derived.clear()
+        return self._loaded[1]
+
+    def _checkout(self, sig: tuple | None) -> dict | None:
+        """Take the document from the shared cache if the file still has signature sig."""
+        if self.cache is None:
+            return None
+        entry = self.cache.take(self.path, sig)
+        if entry is None:
+            return None
+        self._data, self._derived = entry
+        self._read_sig = sig
+        return self._data
+
+    def _write(self, data: dict) -> None:
+        data['generation'] = data.get('generation', 0) + 1
+        try:
+            sig = _save(data, self.path)
+        except BaseException:
+            self._loaded = None
+            self._read_sig = None
+            raise
+        self._read_sig = sig
+        if self.keep_loaded:
+            self._loaded = (sig, data)
+        if self.snapshot:
+            try:
+                write_snapshot(data, snapshot_path(self.path), sig)
+            except OSError:
+                pass  # readers see the old snapshot as stale and parse the JSON
+
+    def _reset(self) -> None:
+        if self.cache is not None and self._data is not None and self._read_sig is not None:
+            self.cache.put(self.path, self._read_sig, self._data, self._derived)
+            self._derived = {}
+        self._read_sig = None
+        self._data = None
+        self._snapshot_checked = False
+        self._current_snapshot = None
+        self._undo.clear()
+        self._dirty.clear()
+        if not self.keep_loaded:
+            self._derived.clear()
+
+    @property
+    def data(self) -> dict:
+        if self._data is None:
+            if not self._savepoints:
+                raise RuntimeError('no active transaction')
+            self._data = self._read()
+        return self._data
+
+    def _fresh_snapshot(self):
+        """The binary snapshot, if the document is not parsed yet and the snapshot is current."""
+        if self._data is not None or not self.snapshot or not self._savepoints:
+            return None
+        if not self._snapshot_checked:
+            self._snapshot_checked = True
+            sig = _signature(self.path)
+            if self._checkout(sig) is None:
+                self._current_snapshot = self._snapshots.fresh(sig)
+        return self._current_snapshot
+
+    def derived(self, key: str, build=None):
+        """Return the structure cached under key, building it on first use.
 
+        Without build, return None if it was not built yet.
+        """
+        if key not in self._derived:
+            if build is None:
+                return None
+            self._derived[key] = build(self.data)
+        return self._derived[key]
 
-class JsonClientRepository(ClientRepository):
+    def _touch(self, name: str, record_id: int) -> None:
+        self._dirty.setdefault(name, set()).add(record_id)
+
+    def records(self, name: str):
+        """Iterate over the records of a collection."""
+        snapshot = self._fresh_snapshot()
+        rows = snapshot.records(name) if snapshot is not None else self.data[name].values()
+        if metrics.ENABLED:
+            metrics.count('lookups', 1, name)
+            metrics.count('rows_scanned', len(rows), name)
+        return rows
+
+    def rows(self, name: str, fields: list[str]) -> list[tuple] | None:
+        """The fields of every record as tuples, if served by the snapshot.
+
+        None means the document is parsed; ``records`` then returns the
+        stored records themselves, which costs nothing to build.
+        """
+        snapshot = self._fresh_snapshot()
+        if snapshot is None:
+            return None
+        rows = snapshot.rows(name, fields)
+        if metrics.ENABLED:
+            metrics.count('lookups', 1, name)
+            metrics.count('rows_scanned', len(rows), name)
+        return rows
+
+    def find(self, name: str, record_id: int) -> dict | None:
+        if metrics.ENABLED:
+            metrics.count('lookups', 1, name)
+            metrics.count('rows_scanned', 1, name)
+        snapshot = self._fresh_snapshot()
+        if snapshot is not None:
+            return snapshot.find(name, int(record_id))
+        return self.data[name].get(str(record_id))
+
+    def lookup(self, index: str, key) -> int | list[int] | None:
+        """Return the id (unique index) or ids stored under key in a secondary index."""
+        table, _, unique = INDEXES[index]
+        found = self.data['indexes'][index].get(key if unique else str(key))
+        if metrics.ENABLED:
+            metrics.count('lookups', 1, table)
+            metrics.count('rows_scanned', 1 if unique else len(found or ()), table)
+        return found if unique else list(found or [])
+
+    def ids_after(self, name: str, after_id: int, count: int) -> list[int]:
+        """The first count ids of a collection above after_id, in id order.
+
+        The snapshot's id column is sorted already; a parsed document keeps
+        its sorted ids as a derived structure, updated by inserts and deletes.
+        """
+        snapshot = self._fresh_snapshot()
+        if snapshot is not None:
+            return snapshot.ids_after(name, after_id, count)
+        ids = self.derived(f'{name}_ids', lambda data: sorted(int(r['id']) for r in data[name].values()))
+        start = bisect_right(ids, after_id)
+        return ids[start:start + count]
+
+    def next_id(self, entity: str) -> int:
+        return self.ids.next_id(entity, lambda: highest_id(self.data, entity))
+
+    def insert(self, name: str, record: dict) -> None:
+        data = self.data
+        _put(data, name, record)
+        self._undo.append(lambda: _drop(data, name, record['id']))
+        self._touch(name, record['id'])
+        ids = self.derived(f'{name}_ids')
+        if ids is not None:
+            i = bisect_left(ids, record['id'])
+            if i == len(ids) or ids[i] != record['id']:
+                ids.insert(i, record['id'])
+
+    def update(self, name: str, record_id: int, **changes) -> bool:
+        data = self.data
+        old = self.find(name, record_id)
+        if old is None:
+            return False
+        _put(data, name, {**old, **changes})
+        self._undo.append(lambda: _put(data, name, old))
+        self._touch(name, record_id)
+        return True
+
+    def delete(self, name: str, record_id: int) -> bool:
+        data = self.data
+        old = _drop(data, name, record_id)
+        if old is None:
+            return False
+        self._undo.append(lambda: _put(data, name, old))
+        self._touch(name, record_id)
+        ids = self.derived(f'{name}_ids')
+        if ids is not None:
+            ids.remove(old['id'])
+        return True
+
+
+def _client(d: dict) -> Client:
+    return Client(d['full_name'], d['email'], d['phone'], wallet=d.get('wallet', 0.0), id=d['id'])
+
+
+def _room(d: dict) -> Room:
+    return Room(d['room_type'], Money(d['price']), d['description'], id=d['id'])
+
+
+def _reservation(d: dict) -> Reservation:
+    return Reservation(d['client_id'], d['room_id'], d['check_in'], d['nights'],
+                       Money(d['total']), confirmed=d['confirmed'], id=d['id'])
+
+
+def _payment(d: dict) -> Payment:
+    return Payment(d['client_id'], Money(d['amount'], Currency(d['currency'])), d['type'],
+                   d.get('reservation_id'), created_at=d.get('created_at'), id=d['id'],
+                   eur_minor=d.get('eur_minor'))
+
+
+class _JsonRepository:
+    def __init__(self, uow: JsonUnitOfWork | None = None):
+        self.uow = uow or JsonUnitOfWork()
+
+    def _project(self, table: str, fields: tuple, hydrate):
+        columns = select_columns(COLUMNS[table], fields)
+        return self._views(table, columns, hydrate)
+
+    def _views(self, table: str, columns: dict, hydrate):
+        # The rows are taken in a transaction that ends before the first
+        # yield: a caller writing between views, or dropping the generator
+        # half-way, must not find the outermost transaction still open.
+        names = list(dict.fromkeys(columns.values()))
+        with self.uow:
+            rows = self.uow.rows(table, names)
+            records = list(self.uow.records(table)) if rows is None else None
+        if records is not None:
+            for record in records:
+                yield RowView(record, columns, hydrate)
+            return
+        # Snapshot rows are tuples of the projected columns, id first.
+        positions = {field: names.index(column) for field, column in columns.items()}
+        for row in rows:
+            yield RowView(row, positions, self._get_row)
+
+    def _page(self, table: str, index: str | None, key, keep, after_id: int, limit: int | None):
+        """Records of table kept by keep, keyset paginated in id order.
+
+        The candidates are the ids stored under key in a secondary index, or
+        the whole collection when index is None. They are read ``CHUNK`` at
+        a time, every chunk in a transaction of its own that ends before its
+        records are yielded, so the caller may write between records or stop
+        early without holding the outermost transaction open.
+        """
+        found = 0
+        while found != limit:
+            with self.uow:
+                if index is None:
+                    ids = self.uow.ids_after(table, after_id, CHUNK)
+                else:
+                    ids = self.uow.lookup(index, key)
+                    start = bisect_right(ids, after_id)
+                    ids = ids[start:start + CHUNK]
+                kept = []
+                for record_id in ids:
+                    record = self.uow.find(table, record_id)
+                    if keep(record):
+                        kept.append(record)
+                        if found + len(kept) == limit:
+                            break
+            yield from kept
+            found += len(kept)
+            if len(ids) < CHUNK:
+                return
+            after_id = ids[-1]
+
+    def _get_row(self, row: tuple):
+        return self.get(row[0])
+
+
+class JsonClientRepository(_JsonRepository, ClientRepository):
     def add(self, client: Client) -> None:
-        data = _load()
-        data['auto_id']['client'] += 1
-        client.id = data['auto_id']['client']
-        data['clients'].append({'id': client.id, 'full_name': client.full_name,
-                                'email': client.email, 'phone': client.phone,
-                                'wallet': client.wallet})
-        _save(data)
+        with self.uow:
+            client.id = self.uow.next_id('client')
+            self.uow.insert('clients', {'id': client.id, 'full_name': client.full_name,
+                                        'email': client.email, 'phone': client.phone,
+                                        'wallet': client.wallet})
 
     def get(self, client_id: int) -> Client | None:
-        data = _load()
-        d = next((c for c in data['clients'] if c['id'] == client_id), None)
-        if not d:
-            return None
-        return Client(d['full_name'], d['email'], d['phone'], wallet=d.get('wallet', 0.0), id=d['id'])
+        with self.uow:
+            d = self.uow.find('clients', client_id)
+        return _client(d) if d else None
 
     def find_by_email(self, email: str) -> Client | None:
-        data = _load()
-        d = next((c for c in data['clients'] if c['email'] == email), None)
-        if not d:
-            return None
-        return Client(d['full_name'], d['email'], d['phone'], wallet=d.get('wallet', 0.0), id=d['id'])
+        with self.uow:
+            client_id = self.uow.lookup('client_email', email)
+            d = self.uow.find('clients', client_id) if client_id is not None else None
+        return _client(d) if d else None
 
     def save(self, client: Client) -> None:
-        data = _load()
-        for c in data['clients']:
-            if c['id'] == client.id:
-                c['full_name'] = client.full_name
-                c['email'] = client.email
-                c['phone'] = client.phone
-                c['wallet'] = client.wallet
-                break
-        _save(data)
-
-
-class JsonRoomRepository(RoomRepository):
+        with self.uow:
+            self.uow.update('clients', client.id, full_name=client.full_name,
+                            email=client.email, phone=client.phone, wallet=client.wallet)
+
+    def project(self, *fields: str):
+        return self._project('clients', fields, _client)
+
+
+class JsonRoomRepository(_JsonRepository, RoomRepository):
     def add(self, room: Room) -> None:
-        data = _load()
-        data['auto_id']['room'] += 1
-        room.id = data['auto_id']['room']
-        data['rooms'].append({'id': room.id, 'room_type': room.room_type,
-                              'price': room.price_per_night.amount,
-                              'description': room.description})
-        _save(data)
+        with self.uow:
+            room.id = self.uow.next_id('room')
+            self.uow.insert('rooms', {'id': room.id, 'room_type': room.room_type,
+                                      'price': room.price_per_night.amount,
+                                      'description': room.description})
 
     def get(self, room_id: int) -> Room | None:
-        data = _load()
-        d = next((r for r in data['rooms'] if r['id'] == room_id), None)
-        if not d:
-            return None
-        return Room(d['room_type'], Money(d['price']), d['description'], id=d['id'])
+        with self.uow:
+            d = self.uow.find('rooms', room_id)
+        return _room(d) if d else None
 
     def list(self) -> list[Room]:
-        data = _load()
-        return [Room(r['room_type'], Money(r['price']), r['description'], id=r['id']) for r in data['rooms']]
+        with self.uow:
+            return [_room(r) for r in self.uow.records('rooms')]
+
+    def project(self, *fields: str):
+        return self._project('rooms', fields, _room)
+
+
+def _build_interval_index(data: dict) -> IntervalIndex:
+    index = IntervalIndex()
+    for r in data['reservations'].values():
+        start = day_ordinal(r['check_in'])
+        index.add(r['room_id'], start, start + r['nights'], r['id'])
+    return index
+
 
+def _build_calendar(data: dict) -> OccupancyCalendar:
+    calendar = OccupancyCalendar()
+    for r in data['reservations'].values():
+        start = day_ordinal(r['check_in'])
+        calendar.add(r['room_id'], start, start + r['nights'])
+    return calendar
+
+
+class JsonReservationRepository(_JsonRepository, ReservationRepository):
+    def _index(self, room_id: int) -> IntervalIndex:
+        """Interval index holding (at least) the reservations of room_id."""
+        return self.uow.derived('room_intervals', _build_interval_index)
+
+    def _calendar(self, room_id: int, build: bool = True) -> OccupancyCalendar | None:
+        return self.uow.derived('room_calendar', _build_calendar if build else None)
+
+    def calendar(self, room_id: int) -> OccupancyCalendar:
+        with self.uow:
+            return self._calendar(room_id)
 
-class JsonReservationRepository(ReservationRepository):
     def add(self, reservation: Reservation) -> None:
-        data = _load()
-        data['auto_id']['reservation'] += 1
-        reservation.id = data['auto_id']['reservation']
-        data['reservations'].append({
-            'id': reservation.id,
-            'client_id': reservation.client_id,
-            'room_id': reservation.room_id,
-            'check_in': reservation.check_in,
-            'nights': reservation.nights,
-            'total': reservation.total_amount.amount,
-            'confirmed': reservation.confirmed,
-        })
-        _save(data)
+        with self.uow:
+            index = self._index(reservation.room_id)
+            reservation.id = self.uow.next_id('reservation')
+            self.uow.insert('reservations', {
+                'id': reservation.id,
+                'client_id': reservation.client_id,
+                'room_id': reservation.room_id,
+                'check_in': reservation.check_in,
+                'nights': reservation.nights,
+                'total': reservation.total_amount.amount,
+                'confirmed': reservation.confirmed,
+            })
+            start = day_ordinal(reservation.check_in)
+            index.add(reservation.room_id, start, start + reservation.nights, reservation.id)
+            calendar = self._calendar(reservation.room_id, build=False)
+            if calendar is not None:
+                calendar.add(reservation.room_id, start, start + reservation.nights)
 
     def get(self, reservation_id: int) -> Reservation | None:
-        data = _load()
-        d = next((r for r in data['reservations'] if r['id'] == reservation_id), None)
-        if not d:
-            return None
-        return Reservation(d['client_id'], d['room_id'], d['check_in'], d['nights'],
-                           Money(d['total']), confirmed=d['confirmed'], id=d['id'])
+        with self.uow:
+            d = self.uow.find('reservations', reservation_id)
+        return _reservation(d) if d else None
 
     def list(self) -> list[Reservation]:
-        data = _load()
-        return [Reservation(r['client_id'], r['room_id'], r['check_in'], r['nights'],
-                            Money(r['total']), confirmed=r['confirmed'], id=r['id'])
-                for r in data['reservations']]
+        with self.uow:
+            return [_reservation(r) for r in self.uow.records('reservations')]
+
+    def project(self, *fields: str):
+        return self._project('reservations', fields, _reservation)
+
+    def query(self, client_id: int | None = None, room_id: int | None = None, start: str | None = None,
+              end: str | None = None, confirmed: bool | None = None, after_id: int = 0,
+              limit: int | None = None):
+        lo = None if start is None else day_ordinal(start)
+        hi = None if end is None else day_ordinal(end)
+
+        def keep(d: dict) -> bool:
+            return (client_id is None or d['client_id'] == client_id) and \
+                (confirmed is None or bool(d['confirmed']) == confirmed) and \
+                (lo is None or day_ordinal(d['check_in']) >= lo) and \
+                (hi is None or day_ordinal(d['check_in']) <= hi)
+
+        index = None if room_id is None else 'room_reservations'
+        for record in self._page('reservations', index, room_id, keep, after_id, limit):
+            yield _reservation(record)
+
+    def scan(self):
+        with self.uow:
+            rows = self.uow.rows('reservations', ['room_id', 'check_in', 'nights', 'confirmed'])
+            if rows is None:
+                rows = [(r['room_id'], r['check_in'], r['nights'], r['confirmed']) for r in self.uow.records('reservations')]
+        return iter(rows)
 
     def remove(self, reservation_id: int) -> None:
-        data = _load()
-        before = len(data['reservations'])
-        data['reservations'] = [r for r in data['reservations'] if r['id'] != reservation_id]
-        if len(data['reservations']) == before:
-            raise ValueError('reservation not found')
-        _save(data)
+        with self.uow:
+            d = self.uow.find('reservations', reservation_id)
+            if d is None:
+                raise ValueError('reservation not found')
+            index = self._index(d['room_id'])
+            self.uow.delete('reservations', reservation_id)
+            start = day_ordinal(d['check_in'])
+            index.remove(d['room_id'], start, reservation_id)
+            calendar = self._calendar(d['room_id'], build=False)
+            if calendar is not None:
+                calendar.remove(d['room_id'], start, start + d['nights'])
+
+    def find_overlapping(self, room_id: int, check_in: str, nights: int) -> list[Reservation]:
+        start = day_ordinal(check_in)
+        with self.uow:
+            ids = self._index(room_id).overlapping(room_id, start, start + nights)
+            return [_reservation(self.uow.find('reservations', i)) for i in ids]
+
+    def booked_rooms(self, room_ids, check_in: str, nights: int) -> set[int]:
+        start = day_ordinal(check_in)
+        with self.uow:
+            return {room_id for room_id in room_ids
+                    if self._index(room_id).overlapping(room_id, start, start + nights)}
 
     def save(self, reservation: Reservation) -> None:
-        data = _load()
-        for r in data['reservations']:
-            if r['id'] == reservation.id:
-                r['confirmed'] = reservation.confirmed
-                break
-        _save(data)
+        with self.uow:
+            self.uow.update('reservations', reservation.id, confirmed=reservation.confirmed)
 
 
-class JsonPaymentRepository(PaymentRepository):
+def _payment_record(payment: Payment) -> dict:
+    return {
+        'id': payment.id,
+        'client_id': payment.client_id,
+        'reservation_id': payment.reservation_id,
+        'amount': payment.amount.amount,
+        'currency': payment.amount.currency.value,
+        'type': payment.kind,
+        'created_at': payment.created_at,
+        'eur_minor': settle(payment),
+    }
+
+
+class JsonPaymentRepository(_JsonRepository, PaymentRepository):
     def add(self, payment: Payment) -> None:
-        data = _load()
-        data['auto_id']['payment'] += 1
-        payment.id = data['auto_id']['payment']
-        data.setdefault('payments', [])
-        data['payments'].append({
-            'id': payment.id,
-            'client_id': payment.client_id,
-            'reservation_id': payment.reservation_id,
-            'amount': payment.amount.amount,
-            'currency': payment.amount.currency.value,
-            'type': payment.kind,
-        })
-        _save(data)
+        with self.uow:
+            payment.id = self.uow.next_id('payment')
+            self.uow.insert('payments', _payment_record(payment))
+            ledger.record_payment(self.uow, self.uow.find('payments', payment.id))
+
+    def replace(self, payments: list[Payment], payment: Payment) -> None:
+        with self.uow:
+            for old in payments:
+                self.uow.delete('payments', old.id)
+            self.uow.insert('payments', _payment_record(payment))
+            ledger.drop_checkpoints(self.uow, payment.client_id, payment.id)
+
+    def get(self, payment_id: int) -> Payment | None:
+        with self.uow:
+            d = self.uow.find('payments', payment_id)
+        return _payment(d) if d else None
+
+    def list(self) -> list[Payment]:
+        with self.uow:
+            return [_payment(r) for r in self.uow.records('payments')]
+
+    def project(self, *fields: str):
+        return self._project('payments', fields, _payment)
+
+    def query(self, client_id: int | None = None, kind: str | None = None, start: str | None = None,
+              end: str | None = None, after_id: int = 0, limit: int | None = None):
+        def keep(d: dict) -> bool:
+            day = payment_day(d.get('created_at'))
+            return (kind is None or d['type'] == kind) and \
+                (start is None or day >= start) and (end is None or day <= end)
+
+        index = None if client_id is None else 'client_payments'
+        for record in self._page('payments', index, client_id, keep, after_id, limit):
+            yield _payment(record)
+
+    def scan(self):
+        with self.uow:
+            rows = self.uow.rows('payments', ['created_at', 'amount', 'currency', 'type'])
+            if rows is None:
+                rows = [(r.get('created_at'), r['amount'], r['currency'], r['type']) for r in self.uow.records('payments')]
+        return iter(rows)
 
     def list_for_client(self, client_id: int) -> list[Payment]:
-        data = _load()
-        return [Payment(p['client_id'], Money(p['amount'], Currency(p['currency'])), p['type'], p.get('reservation_id'), id=p['id'])
-                for p in data.get('payments', []) if p['client_id'] == client_id]
+        with self.uow:
+            return [_payment(self.uow.find('payments', i))
+                    for i in self.uow.lookup('client_payments', client_id)]
+
+    def history(self, client_id: int, since: str | None = None):
+        # Read before yielding, so the transaction is not held between payments.
+        with self.uow:
+            records = list(ledger.history(self.uow, client_id, since))
+        for record in records:
+            yield _payment(record)
 
+    def balance(self, client_id: int, as_of: str | None = None) -> Money:
+        with self.uow:
+            return Money.from_minor(ledger.balance_minor(self.uow, client_id, as_of))
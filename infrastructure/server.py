@@ -0,0 +1,159 @@
+import asyncio
+import contextlib
+import io
+import json
+import os
+import signal
+import socket
+
+from . import db, metrics
+from .cli import run
+from .config import archive_days
+from .daemon_client import LOCAL_COMMANDS, socket_path
+
+MAX_BATCH = 256
+# Commands that manage the storage itself: they run after the group's commit.
+UNGROUPED_COMMANDS = {'compact'}
+# Seconds between two runs of the HOTEL_ARCHIVE_DAYS policy.
+ARCHIVE_EVERY = 24 * 3600
+
+
+def _execute(argv: list[str]) -> dict:
+    """Run one CLI invocation in-process and capture what it prints."""
+    if argv and argv[0] in LOCAL_COMMANDS:
+        return {'status': 2, 'stdout': '', 'stderr': f"{argv[0]} cannot run on the daemon\n"}
+    stdout, stderr = io.StringIO(), io.StringIO()
+    status = 0
+    with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+        try:
+            run(argv)
+        except SystemExit as e:
+            status = e.code if isinstance(e.code, int) else 1
+        except Exception as e:
+            print(f"error: {e}", file=stderr)
+            status = 1
+    return {'status': status, 'stdout': stdout.getvalue(), 'stderr': stderr.getvalue()}
+
+
+class Daemon:
+    """Serves CLI invocations from a warm ReservationService over a Unix socket.
+
+    Clients send one JSON line ``{"argv": [...]}`` per command and receive
+    ``{"status", "stdout", "stderr"}``. Every request goes through a single
+    queue; the worker drains whatever accumulated while the previous group
+    was being written and runs it inside one outer unit of work, so each
+    command is a savepoint and the whole group is persisted by one commit.
+    Replies are only sent once that commit succeeded. ``UNGROUPED_COMMANDS``
+    run on their own once it is done.
+
+    With ``HOTEL_ARCHIVE_DAYS`` set, the daemon also queues an ``archive``
+    command when it starts and then every ``ARCHIVE_EVERY`` seconds.
+    """
+
+    def __init__(self, path: str | None = None, max_batch: int = MAX_BATCH):
+        self.path = path or socket_path()
+        self.max_batch = max_batch
+        self.service = db.warm_up()
+        self._queue: asyncio.Queue | None = None
+        self._server = None
+        self._archive_task: asyncio.Task | None = None
+
+    def _run_batch(self, batch: list[list[str]]) -> list[dict]:
+        grouped = [i for i, argv in enumerate(batch) if not argv or argv[0] not in UNGROUPED_COMMANDS]
+        results: list[dict | None] = [None] * len(batch)
+        try:
+            with self.service.uow:
+                for i in grouped:
+                    results[i] = _execute(batch[i])
+        except Exception as e:
+            error = {'status': 1, 'stdout': '', 'stderr': f"commit failed: {e}\n"}
+            for i in grouped:
+                results[i] = error
+        for i, argv in enumerate(batch):
+            if results[i] is None:
+                results[i] = _execute(argv)
+        return results
+
+    async def _worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            results = await loop.run_in_executor(None, self._run_batch, [argv for argv, _ in batch])
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    async def _archive_periodically(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            future = loop.create_future()
+            await self._queue.put((['archive'], future))
+            await future
+            await asyncio.sleep(ARCHIVE_EVERY)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            while line := await reader.readline():
+                try:
+                    argv = json.loads(line)['argv']
+                except (ValueError, KeyError, TypeError):
+                    result = {'status': 2, 'stdout': '', 'stderr': 'malformed request\n'}
+                else:
+                    future = loop.create_future()
+                    await self._queue.put((argv, future))
+                    result = await future
+                writer.write((json.dumps(result) + '\n').encode('utf-8'))
+                await writer.drain()
+        finally:
+            writer.close()
+
+    def _remove_stale_socket(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            try:
+                sock.connect(self.path)
+            except OSError:
+                os.remove(self.path)
+                return
+        raise RuntimeError(f"a daemon is already listening on {self.path}")
+
+    async def start(self) -> None:
+        self._remove_stale_socket()
+        self._queue = asyncio.Queue()
+        self._server = await asyncio.start_unix_server(self._handle, path=self.path)
+        self._worker_task = asyncio.create_task(self._worker())
+        if archive_days() is not None:
+            self._archive_task = asyncio.create_task(self._archive_periodically())
+
+    async def close(self) -> None:
+        self._server.close()
+        await self._server.wait_closed()
+        for task in (self._archive_task, self._worker_task):
+            if task is not None:
+                task.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await task
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        if metrics.ENABLED:
+            metrics.flush()
+
+    async def serve_forever(self) -> None:
+        await self.start()
+        task = asyncio.current_task()
+        with contextlib.suppress(NotImplementedError):
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, task.cancel)
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.close()
+
+
+def serve(path: str | None = None) -> None:
+    daemon = Daemon(path)
+    with contextlib.suppress(KeyboardInterrupt, asyncio.CancelledError):
+        asyncio.run(daemon.serve_forever())
@@ -0,0 +1,412 @@
+"""Document store split into one file per collection, or per bucket of one.
+
+``database.d/`` holds a set of shard files and a ``MANIFEST.json`` naming
+the current file of every shard::
+
+    clients      every client, with the client_email index
+    rooms        every room
+    reservations.NN, payments.NN, checkpoints.NN
+                 the reservations of the rooms, and the payments and ledger
+                 checkpoints of the clients, whose id modulo the bucket
+                 count is NN, with their room/client index
+    locators.TABLE.NN
+                 the room or client owning each reservation, payment and
+                 checkpoint whose id modulo the bucket count is NN
+
+A transaction parses the manifest and then only the shards it touches,
+and a commit writes only the shards it modified, each to a new file named
+after the next generation. Swapping in the new manifest with a rename is
+the commit point: a crash before it leaves the previous manifest, which
+still names the previous files, so a write spanning several shards (a
+wallet debit and its reservation) is applied entirely or not at all.
+
+Ids are allocated in blocks from the ``COUNTERS`` file (see ``ids``), so
+an insert does not rewrite any shard but those of its record.
+"""
+import heapq
+import json
+import os
+from bisect import bisect_right
+from contextlib import contextmanager
+from itertools import islice
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+from . import metrics
+from .ids import IdAllocator, write_counters
+from .repositories import (
+    FORMAT_VERSION,
+    INDEXES,
+    TABLES,
+    _TABLE_INDEXES,
+    JsonReservationRepository,
+    JsonUnitOfWork,
+    _build_calendar,
+    _build_interval_index,
+    _drop,
+    _load,
+    _put,
+    _save,
+    empty_document,
+    id_counters,
+    upgrade_document,
+)
+
+SHARDED_PATH = os.path.join(os.path.dirname(__file__), '..', 'database.d')
+MANIFEST = 'MANIFEST.json'
+LOCK = 'LOCK'
+COUNTERS = 'COUNTERS'
+BUCKETS = 64
+CONFLICT = 'the database was changed by another process; retry'
+
+# Bucketed tables and the field choosing the bucket of a record; it is also
+# the field of the table's non-unique index, so an index lookup reads one bucket.
+SHARD_FIELDS = {
+    'reservations': 'room_id',
+    'payments': 'client_id',
+    'checkpoints': 'client_id',
+}
+
+
+def _shard_name(table: str, record: dict, buckets: int) -> str:
+    if table in SHARD_FIELDS:
+        return f"{table}.{record[SHARD_FIELDS[table]] % buckets:02d}"
+    return table
+
+
+def _locator_name(table: str, record_id: int, buckets: int) -> str:
+    return f"locators.{table}.{record_id % buckets:02d}"
+
+
+def _empty_shard(name: str) -> dict:
+    if name == 'auto_id':
+        return {'auto_id': {}}
+    if name.startswith('locators.'):
+        return {'ids': {}}
+    table = name.split('.')[0]
+    return {table: {}, 'indexes': {index: {} for index, _, _ in _TABLE_INDEXES[table]}}
+
+
+def _split(data: dict, buckets: int) -> dict[str, dict]:
+    """The shards of a single-file document."""
+    shards = {}
+    for table in TABLES:
+        if table not in SHARD_FIELDS:
+            shards[table] = _empty_shard(table)
+        for record in sorted(data[table].values(), key=lambda r: r['id']):
+            name = _shard_name(table, record, buckets)
+            _put(shards.setdefault(name, _empty_shard(name)), table, record)
+            if table in SHARD_FIELDS:
+                locator = _locator_name(table, record['id'], buckets)
+                locator = shards.setdefault(locator, _empty_shard(locator))
+                locator['ids'][str(record['id'])] = record[SHARD_FIELDS[table]]
+    return shards
+
+
+def _fsync_directory(directory: str) -> None:
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+@contextmanager
+def _locked(directory: str):
+    """Hold the lock serialising commits to a sharded database."""
+    fd = os.open(os.path.join(directory, LOCK), os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)
+
+
+def _publish(directory: str, shards: dict[str, dict], manifest: dict) -> dict:
+    """Write shards under the manifest's next generation, then the new manifest."""
+    generation = manifest['generation'] + 1
+    files = dict(manifest['shards'])
+    for name, shard in shards.items():
+        files[name] = f"{name}.{generation}.json"
+        _save(shard, os.path.join(directory, files[name]))
+    _fsync_directory(directory)
+    new = {**manifest, 'generation': generation, 'shards': files}
+    _save(new, os.path.join(directory, MANIFEST))
+    _fsync_directory(directory)
+    return new
+
+
+def _collect_garbage(directory: str, *manifests: dict) -> None:
+    """Delete the shard files named by none of the given manifests.
+
+    The files of the previous manifest are kept for the readers that
+    opened it before the swap. A transaction still on an older manifest
+    finds its remaining shards gone and fails as a write conflict would.
+    """
+    live = {MANIFEST, LOCK, COUNTERS}
+    for manifest in manifests:
+        live.update(manifest['shards'].values())
+    for entry in os.listdir(directory):
+        if entry not in live and entry.endswith('.json'):
+            try:
+                os.remove(os.path.join(directory, entry))
+            except FileNotFoundError:
+                pass
+
+
+def _create(directory: str, data: dict, counters: dict[str, int], buckets: int = BUCKETS) -> None:
+    os.makedirs(directory, exist_ok=True)
+    with _locked(directory):
+        if os.path.exists(os.path.join(directory, MANIFEST)):
+            raise ValueError(f"{directory} already exists")
+        write_counters(os.path.join(directory, COUNTERS), counters)
+        empty = {'version': FORMAT_VERSION, 'generation': 0, 'buckets': buckets, 'shards': {}}
+        _publish(directory, _split(data, buckets), empty)
+
+
+def init_schema(directory: str = SHARDED_PATH) -> None:
+    if os.path.exists(os.path.join(directory, MANIFEST)):
+        return
+    data = empty_document()
+    _create(directory, data, data['auto_id'])
+
+
+def convert_from_json(json_path: str, directory: str = SHARDED_PATH) -> dict:
+    """Split an existing database.json into a new sharded database.
+
+    Ids and id counters are preserved. Returns the number of converted
+    records per table.
+    """
+    if os.path.exists(os.path.join(directory, MANIFEST)):
+        raise ValueError(f"{directory} already exists")
+    data = _load(json_path)
+    upgrade_document(data)
+    _create(directory, data, id_counters(data, json_path))
+    return {table: len(data[table]) for table in TABLES}
+
+
+class _ShardedDocument:
+    """Read-only view of the whole database, for ``derived`` builders."""
+
+    def __init__(self, uow: 'ShardedUnitOfWork'):
+        self._uow = uow
+
+    def __getitem__(self, table: str) -> dict:
+        if table == 'auto_id':  # written by older versions, seeds the counters
+            return self._uow._shard('auto_id')['auto_id']
+        return {str(r['id']): r for r in self._uow.records(table)}
+
+
+class ShardedUnitOfWork(JsonUnitOfWork):
+    """Unit of work over a sharded database directory.
+
+    Shards are parsed when a transaction first needs them and only the
+    modified ones are written back, followed by the manifest. Commits are
+    serialised by a lock file, and one whose transaction started from an
+    older manifest than the current one is refused rather than silently
+    overwriting the other writer's changes.
+
+    Parsed shards are kept between transactions; since a shard file is
+    never rewritten under the same name, a shard whose file the manifest
+    still names is up to date. Without ``keep_loaded`` they are only kept
+    while the manifest's generation does not change, which is enough for
+    the chunks of one streaming read to share them.
+    """
+
+    def __init__(self, path: str | None = None, keep_loaded: bool = False):
+        super().__init__(path or SHARDED_PATH, keep_loaded=keep_loaded, snapshot=False)
+        self.ids = IdAllocator(os.path.join(self.path, COUNTERS))
+        self._manifest: dict | None = None
+        self._shards: dict[str, dict] = {}
+        self._cache: dict[str, dict] = {}
+        self._cache_generation: int | None = None
+        # Sorted ids of the collection held by a cached shard, per file.
+        self._sorted_ids: dict[str, list[int]] = {}
+
+    def _reset(self) -> None:
+        super()._reset()
+        self._manifest = None
+        self._shards = {}
+        self._derived.clear()
+
+    def manifest(self) -> dict:
+        if self._manifest is None:
+            if not self._savepoints:
+                raise RuntimeError('no active transaction')
+            self._manifest = _load(os.path.join(self.path, MANIFEST))
+            if self.keep_loaded or self._manifest['generation'] == self._cache_generation:
+                live = set(self._manifest['shards'].values())
+            else:
+                live = set()
+            self._cache = {f: shard for f, shard in self._cache.items() if f in live}
+            self._sorted_ids = {f: ids for f, ids in self._sorted_ids.items() if f in live}
+            self._cache_generation = self._manifest['generation']
+        return self._manifest
+
+    def _shard(self, name: str) -> dict:
+        shard = self._shards.get(name)
+        if shard is None:
+            filename = self.manifest()['shards'].get(name)
+            if filename is None:
+                shard = _empty_shard(name)
+            elif filename in self._cache:
+                shard = self._cache[filename]
+            else:
+                try:
+                    shard = _load(os.path.join(self.path, filename))
+                except FileNotFoundError:
+                    # Collected after two newer commits (see _collect_garbage).
+                    raise ValueError(CONFLICT) from None
+                self._cache[filename] = shard
+            self._shards[name] = shard
+        return shard
+
+    def _buckets(self, table: str) -> list[str]:
+        prefix = table + '.'
+        names = set(self.manifest()['shards']) | set(self._shards)
+        return sorted(n for n in names if n.startswith(prefix))
+
+    @property
+    def data(self) -> _ShardedDocument:
+        self.manifest()
+        return _ShardedDocument(self)
+
+    def derived_for(self, table: str, owner: int, key: str, build=None):
+        """Like ``derived``, for a structure built from the bucket of owner only."""
+        name = _shard_name(table, {SHARD_FIELDS[table]: owner}, self.manifest()['buckets'])
+        key = f"{key}.{name}"
+        if key not in self._derived:
+            if build is None:
+                return None
+            self._derived[key] = build(self._shard(name))
+        return self._derived[key]
+
+    def records(self, name: str):
+        if name in SHARD_FIELDS:
+            rows = [r for bucket in self._buckets(name) for r in self._shard(bucket)[name].values()]
+        else:
+            rows = list(self._shard(name)[name].values())
+        if metrics.ENABLED:
+            metrics.count('lookups', 1, name)
+            metrics.count('rows_scanned', len(rows), name)
+        return rows
+
+    def find(self, name: str, record_id: int) -> dict | None:
+        if metrics.ENABLED:
+            metrics.count('lookups', 1, name)
+            metrics.count('rows_scanned', 1, name)
+        key = str(record_id)
+        if name not in SHARD_FIELDS:
+            return self._shard(name)[name].get(key)
+        prefix = name + '.'
+        for bucket, shard in self._shards.items():
+            if bucket.startswith(prefix) and key in shard[name]:
+                return shard[name][key]
+        owner = self._shard(_locator_name(name, int(record_id), self.manifest()['buckets']))['ids'].get(key)
+        if owner is None:
+            return None
+        return self._shard(_shard_name(name, {SHARD_FIELDS[name]: owner}, self.manifest()['buckets']))[name].get(key)
+
+    def lookup(self, index: str, key) -> int | list[int] | None:
+        table, _, unique = INDEXES[index]
+        if table in SHARD_FIELDS:
+            shard = self._shard(_shard_name(table, {SHARD_FIELDS[table]: int(key)}, self.manifest()['buckets']))
+        else:
+            shard = self._shard(table)
+        found = shard['indexes'][index].get(key if unique else str(key))
+        if metrics.ENABLED:
+            metrics.count('lookups', 1, table)
+            metrics.count('rows_scanned', 1 if unique else len(found or ()), table)
+        return found if unique else list(found or [])
+
+    def ids_after(self, name: str, after_id: int, count: int) -> list[int]:
+        runs = []
+        for bucket in self._buckets(name) if name in SHARD_FIELDS else [name]:
+            ids = self._ids_of(bucket, name)
+            start = bisect_right(ids, after_id)
+            runs.append(ids[start:start + count])
+        return list(islice(heapq.merge(*runs), count))
+
+    def _ids_of(self, bucket: str, table: str) -> list[int]:
+        """Sorted ids of table in a shard, kept with the shard's file unless it is being modified."""
+        filename = self.manifest()['shards'].get(bucket)
+        if filename is None or bucket in self._dirty:
+            return sorted(map(int, self._shard(bucket)[table]))
+        ids = self._sorted_ids.get(filename)
+        if ids is None:
+            ids = self._sorted_ids[filename] = sorted(map(int, self._shard(bucket)[table]))
+        return ids
+
+    def _locate(self, table: str, record_id: int, owner: int | None) -> None:
+        name = _locator_name(table, record_id, self.manifest()['buckets'])
+        ids = self._shard(name)['ids']
+        key = str(record_id)
+        previous = ids.get(key)
+        if owner is None:
+            ids.pop(key, None)
+        else:
+            ids[key] = owner
+        self._undo.append(lambda: ids.__setitem__(key, previous) if previous is not None else ids.pop(key, None))
+        self._touch(name, record_id)
+
+    def insert(self, name: str, record: dict) -> None:
+        shard_name = _shard_name(name, record, self.manifest()['buckets'])
+        shard = self._shard(shard_name)
+        _put(shard, name, record)
+        self._undo.append(lambda: _drop(shard, name, record['id']))
+        self._touch(shard_name, record['id'])
+        if name in SHARD_FIELDS:
+            self._locate(name, record['id'], record[SHARD_FIELDS[name]])
+
+    def update(self, name: str, record_id: int, **changes) -> bool:
+        old = self.find(name, record_id)
+        if old is None:
+            return False
+        self.delete(name, record_id)
+        self.insert(name, {**old, **changes})
+        return True
+
+    def delete(self, name: str, record_id: int) -> bool:
+        old = self.find(name, record_id)
+        if old is None:
+            return False
+        shard_name = _shard_name(name, old, self.manifest()['buckets'])
+        shard = self._shard(shard_name)
+        _drop(shard, name, record_id)
+        self._undo.append(lambda: _put(shard, name, old))
+        self._touch(shard_name, record_id)
+        if name in SHARD_FIELDS:
+            self._locate(name, record_id, None)
+        return True
+
+    def _write(self, data) -> None:
+        started = self._manifest
+        try:
+            with _locked(self.path):
+                current = _load(os.path.join(self.path, MANIFEST))
+                if current['generation'] != started['generation']:
+                    raise ValueError(CONFLICT)
+                new = _publish(self.path, {name: self._shards[name] for name in self._dirty}, current)
+                _collect_garbage(self.path, current, new)
+        except BaseException:
+            self._cache.clear()
+            self._sorted_ids.clear()
+            raise
+        if self.keep_loaded:
+            for name in self._dirty:
+                self._cache[new['shards'][name]] = self._shards[name]
+
+
+class ShardedReservationRepository(JsonReservationRepository):
+    """Reservation repository whose interval index and calendar cover one bucket at a time."""
+
+    def _index(self, room_id: int):
+        return self.uow.derived_for('reservations', room_id, 'room_intervals', _build_interval_index)
+
+    def _calendar(self, room_id: int, build: bool = True):
+        return self.uow.derived_for('reservations', room_id, 'room_calendar',
+                                    _build_calendar if build else None)
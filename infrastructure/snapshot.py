@@ -0,0 +1,248 @@
+"""Binary, memory-mapped copy of the JSON document for parse-free reads.
+
+``database.json.snap`` holds every collection as fixed-width columns of
+8-byte values, sorted by id, plus one string table::
+
+    header     magic, format, generation, JSON (inode, size, mtime_ns),
+               collection count, string table offset
+    directory  per collection: name, record count, offset of its columns
+    columns    per collection, one array of ``count`` int64/float64 per
+               field; a string field is two int64 arrays (offset, length)
+               into the string table, length -1 meaning None
+    strings    UTF-8 bytes
+
+Finding a record by id is a bisect over the id column and decoding one
+row; iterating a collection decodes only that collection. The header
+records the document's generation counter and the JSON file signature it
+was written from, so a snapshot left behind by another writer is detected
+as stale and readers fall back to the JSON file.
+"""
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+
+SNAPSHOT_SUFFIX = '.snap'
+MAGIC = b'HSNP'
+FORMAT = 2
+
+_HEADER = struct.Struct('<4sIQQQqIQ')
+_ENTRY = struct.Struct('<16sQQ')
+_NONE = -2 ** 63
+
+# Field kinds: 'q' int, 'n' int or None, 'b' bool, 'd' float, 's' string or None.
+SCHEMAS = {
+    'clients': (('id', 'q'), ('full_name', 's'), ('email', 's'), ('phone', 's'), ('wallet', 'd')),
+    'rooms': (('id', 'q'), ('room_type', 's'), ('price', 'd'), ('description', 's')),
+    'reservations': (('id', 'q'), ('client_id', 'q'), ('room_id', 'q'), ('check_in', 's'),
+                     ('nights', 'q'), ('total', 'd'), ('confirmed', 'b')),
+    'payments': (('id', 'q'), ('client_id', 'q'), ('reservation_id', 'n'), ('amount', 'd'),
+                 ('currency', 's'), ('type', 's'), ('created_at', 's'), ('eur_minor', 'n')),
+    'checkpoints': (('id', 'q'), ('client_id', 'q'), ('created_at', 's'), ('balance', 'q')),
+}
+
+
+def snapshot_path(path: str) -> str:
+    return path + SNAPSHOT_SUFFIX
+
+
+class _Strings:
+    def __init__(self):
+        self.chunks: list[bytes] = []
+        self.size = 0
+
+    def add(self, values: list) -> tuple[array, array]:
+        encoded = [v.encode('utf-8') if v is not None else None for v in values]
+        lengths = array('q', [len(b) if b is not None else -1 for b in encoded])
+        ends = list(accumulate((len(b) if b else 0 for b in encoded), initial=self.size))
+        self.size = ends.pop()
+        self.chunks.extend(b for b in encoded if b)
+        return array('q', ends), lengths
+
+
+def _encode_columns(records: list, schema: tuple, strings: _Strings) -> list[bytes]:
+    columns = []
+    for field, kind in schema:
+        values = [r.get(field) for r in records]
+        if kind == 's':
+            columns.extend(a.tobytes() for a in strings.add(values))
+        elif kind == 'd':
+            columns.append(array('d', values).tobytes())
+        elif kind == 'n':
+            columns.append(array('q', [_NONE if v is None else v for v in values]).tobytes())
+        else:
+            columns.append(array('q', [int(v) for v in values]).tobytes())
+    return columns
+
+
+def write_snapshot(data: dict, path: str, signature: tuple) -> None:
+    """Write the snapshot of data, taken from the JSON file with the given signature."""
+    strings = _Strings()
+    blocks = []
+    for name, schema in SCHEMAS.items():
+        records = sorted(data.get(name, {}).values(), key=lambda r: r['id'])
+        blocks.append((name, len(records), _encode_columns(records, schema, strings)))
+    offset = _HEADER.size + _ENTRY.size * len(blocks)
+    directory = []
+    for name, count, columns in blocks:
+        directory.append(_ENTRY.pack(name.encode('ascii'), count, offset))
+        offset += sum(len(c) for c in columns)
+    ino, size, mtime_ns = signature
+    header = _HEADER.pack(MAGIC, FORMAT, data.get('generation', 0), ino, size, mtime_ns,
+                          len(blocks), offset)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)),
+                               prefix='.snapshot-', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(header)
+            f.writelines(directory)
+            for _, _, columns in blocks:
+                f.writelines(columns)
+            f.writelines(strings.chunks)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+class Snapshot:
+    """Read-only view over a snapshot file."""
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._open()
+        except (ValueError, struct.error, TypeError):
+            self.close()
+            raise ValueError(f"invalid snapshot {path}")
+
+    def _open(self) -> None:
+        if sys.byteorder != 'little':
+            raise ValueError('snapshots are little-endian')
+        view = memoryview(self._map)
+        magic, fmt, self.generation, ino, size, mtime_ns, n, strings = _HEADER.unpack_from(view)
+        if magic != MAGIC or fmt != FORMAT or strings > len(view):
+            raise ValueError('bad header')
+        self.signature = (ino, size, mtime_ns)
+        self._strings = view[strings:]
+        self._tables = {}
+        for i in range(n):
+            raw, count, offset = _ENTRY.unpack_from(view, _HEADER.size + i * _ENTRY.size)
+            name = raw.rstrip(b'\0').decode('ascii')
+            columns = []
+            for field, kind in SCHEMAS[name]:
+                width = count * 8
+                if kind == 's':
+                    columns.append((field, kind, view[offset:offset + width].cast('q'),
+                                    view[offset + width:offset + 2 * width].cast('q')))
+                    offset += 2 * width
+                else:
+                    typecode = 'd' if kind == 'd' else 'q'
+                    columns.append((field, kind, view[offset:offset + width].cast(typecode), None))
+                    offset += width
+            if offset > strings:
+                raise ValueError('truncated collection')
+            self._tables[name] = (count, columns)
+
+    def close(self) -> None:
+        self._tables = {}
+        self._strings = None
+        try:
+            self._map.close()
+        except BufferError:  # a caller still holds a view; the mapping goes with it
+            pass
+
+    def _row(self, columns: list, i: int) -> dict:
+        record = {}
+        for field, kind, values, lengths in columns:
+            if kind == 's':
+                n = lengths[i]
+                if n < 0:
+                    record[field] = None
+                else:
+                    start = values[i]
+                    record[field] = bytes(self._strings[start:start + n]).decode('utf-8')
+            elif kind == 'n':
+                record[field] = None if values[i] == _NONE else values[i]
+            elif kind == 'b':
+                record[field] = bool(values[i])
+            else:
+                record[field] = values[i]
+        return record
+
+    def find(self, name: str, record_id: int) -> dict | None:
+        count, columns = self._tables[name]
+        ids = columns[0][2]
+        i = bisect_left(ids, record_id)
+        if i < count and ids[i] == record_id:
+            return self._row(columns, i)
+        return None
+
+    def ids_after(self, name: str, after_id: int, count: int) -> list[int]:
+        ids = self._tables[name][1][0][2]
+        start = bisect_right(ids, after_id)
+        return ids[start:start + count].tolist()
+
+    def records(self, name: str):
+        count, columns = self._tables[name]
+        return [self._row(columns, i) for i in range(count)]
+
+    def rows(self, name: str, fields: list[str]) -> list[tuple]:
+        """The fields of every record as tuples, decoded a column at a time."""
+        count, columns = self._tables[name]
+        by_name = {c[0]: c for c in columns}
+        return list(zip(*(self._column(by_name[f]) for f in fields)))
+
+    def _column(self, column: tuple) -> list:
+        field, kind, values, lengths = column
+        if kind == 's':
+            strings = self._strings
+            return [None if n < 0 else str(strings[start:start + n], 'utf-8')
+                    for start, n in zip(values, lengths)]
+        if kind == 'n':
+            return [None if v == _NONE else v for v in values.tolist()]
+        if kind == 'b':
+            return list(map(bool, values))
+        return values.tolist()
+
+
+class SnapshotCache:
+    """Keeps the latest snapshot of a JSON file mapped between transactions."""
+
+    def __init__(self, json_path: str):
+        self.json_path = json_path
+        self.path = snapshot_path(json_path)
+        self._snapshot: Snapshot | None = None
+        self._sig: tuple | None = None
+
+    def fresh(self, json_signature: tuple | None) -> Snapshot | None:
+        """The snapshot if it was written from the JSON file as it is now, else None."""
+        if json_signature is None:
+            return None
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        sig = (st.st_ino, st.st_size, st.st_mtime_ns)
+        if sig != self._sig:
+            self.close()
+            try:
+                self._snapshot = Snapshot(self.path)
+            except (OSError, ValueError):
+                return None
+            self._sig = sig
+        if self._snapshot.signature != json_signature:
+            return None
+        return self._snapshot
+
+    def close(self) -> None:
+        if self._snapshot is not None:
+            self._snapshot.close()
+        self._snapshot = None
+        self._sig = None
@@ -0,0 +1,471 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+
+from domain.entities import Client, Room, Reservation, Payment
+from domain.value_objects import Money, Currency
+from domain.availability import day_ordinal
+from domain.calendar import OccupancyCalendar
+from domain.projections import RowView, select_columns
+from domain.ledger import CREDIT_KINDS, settle, wallet_effect_minor
+from domain.repositories import (
+    ClientRepository,
+    RoomRepository,
+    ReservationRepository,
+    PaymentRepository,
+    UnitOfWork,
+)
+from . import metrics
+from .repositories import CHUNK, COLUMNS, _load, id_counters, upgrade_document
+
+SQLITE_PATH = os.path.join(os.path.dirname(__file__), '..', 'database.sqlite3')
+
+# Milliseconds a transaction waits for another one's write lock.
+BUSY_TIMEOUT = 5000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS clients (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    full_name TEXT NOT NULL,
+    email TEXT NOT NULL,
+    phone TEXT NOT NULL,
+    wallet REAL NOT NULL DEFAULT 0
+);
+CREATE UNIQUE INDEX IF NOT EXISTS clients_email ON clients (email);
+
+CREATE TABLE IF NOT EXISTS rooms (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    room_type TEXT NOT NULL,
+    price REAL NOT NULL,
+    description TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS reservations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    client_id INTEGER NOT NULL,
+    room_id INTEGER NOT NULL,
+    check_in TEXT NOT NULL,
+    nights INTEGER NOT NULL,
+    start_day INTEGER NOT NULL,
+    end_day INTEGER NOT NULL,
+    total REAL NOT NULL,
+    confirmed INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS reservations_room_check_in ON reservations (room_id, start_day);
+CREATE INDEX IF NOT EXISTS reservations_client ON reservations (client_id);
+
+CREATE TABLE IF NOT EXISTS payments (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    client_id INTEGER NOT NULL,
+    reservation_id INTEGER,
+    amount REAL NOT NULL,
+    currency TEXT NOT NULL,
+    type TEXT NOT NULL,
+    created_at TEXT,
+    eur_minor INTEGER
+);
+CREATE INDEX IF NOT EXISTS payments_client ON payments (client_id, created_at);
+"""
+
+DEFAULT_ROOMS = [
+    (1, 'standard', 50, 'Single bed, Wifi, TV'),
+    (2, 'superior', 100, 'Double bed, Wifi, flat screen TV, minibar, air conditioner'),
+    (3, 'suite', 200, 'Double bed, Wifi, flat screen TV, minibar, air conditioner, bathtub, terrace'),
+]
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, isolation_level=None, cached_statements=256)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute(f'PRAGMA busy_timeout={BUSY_TIMEOUT}')
+    columns = {row['name'] for row in conn.execute('PRAGMA table_info(payments)')}
+    if columns and 'created_at' not in columns:
+        conn.execute('ALTER TABLE payments ADD COLUMN created_at TEXT')
+    if columns and 'eur_minor' not in columns:
+        conn.execute('ALTER TABLE payments ADD COLUMN eur_minor INTEGER')
+    if columns:
+        conn.execute('CREATE INDEX IF NOT EXISTS reservations_client ON reservations (client_id)')
+    return conn
+
+
+def init_schema(path: str = SQLITE_PATH) -> None:
+    if os.path.exists(path):
+        return
+    conn = _connect(path)
+    try:
+        conn.executescript(SCHEMA)
+        conn.executemany('INSERT INTO rooms (id, room_type, price, description) VALUES (?, ?, ?, ?)',
+                         DEFAULT_ROOMS)
+    finally:
+        conn.close()
+
+
+def migrate_from_json(json_path: str, path: str = SQLITE_PATH) -> dict:
+    """Import an existing database.json into a new SQLite database.
+
+    Ids are preserved and the AUTOINCREMENT sequences are set from the
+    JSON store's id counters so new ids continue where it stopped.
+    Returns the number of imported rows per table.
+    """
+    if os.path.exists(path):
+        raise ValueError(f"{path} already exists")
+    data = _load(json_path)
+    upgrade_document(data)
+    conn = _connect(path)
+    try:
+        conn.executescript(SCHEMA)
+        with conn:
+            conn.execute('BEGIN')
+            conn.executemany(
+                'INSERT INTO clients (id, full_name, email, phone, wallet) VALUES (?, ?, ?, ?, ?)',
+                [(c['id'], c['full_name'], c['email'], c['phone'], c.get('wallet', 0.0))
+                 for c in data['clients'].values()])
+            conn.executemany(
+                'INSERT INTO rooms (id, room_type, price, description) VALUES (?, ?, ?, ?)',
+                [(r['id'], r['room_type'], r['price'], r['description']) for r in data['rooms'].values()])
+            conn.executemany(
+                'INSERT INTO reservations (id, client_id, room_id, check_in, nights, start_day,'
+                ' end_day, total, confirmed) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                [(r['id'], r['client_id'], r['room_id'], r['check_in'], r['nights'],
+                  day_ordinal(r['check_in']), day_ordinal(r['check_in']) + r['nights'],
+                  r['total'], r['confirmed']) for r in data['reservations'].values()])
+            conn.executemany(
+                'INSERT INTO payments (id, client_id, reservation_id, amount, currency, type, created_at,'
+                ' eur_minor) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                [(p['id'], p['client_id'], p.get('reservation_id'), p['amount'], p['currency'],
+                  p['type'], p.get('created_at'), p.get('eur_minor')) for p in data['payments'].values()])
+            conn.execute('DELETE FROM sqlite_sequence')
+            conn.executemany('INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)',
+                             [(entity + 's', seq) for entity, seq in id_counters(data, json_path).items()])
+    except BaseException:
+        conn.close()
+        os.remove(path)
+        raise
+    conn.close()
+    return {name: len(data[name]) for name in ('clients', 'rooms', 'reservations', 'payments')}
+
+
+class SqliteUnitOfWork(UnitOfWork):
+    """Unit of work mapping to one SQLite transaction.
+
+    The outermost block opens a deferred transaction, nested blocks become
+    savepoints, so a whole service call is committed with a single fsync.
+    With immediate, the outermost block takes the write lock up front:
+    concurrent writers then wait for each other (busy_timeout) instead of
+    failing with "database is locked" when a read lock cannot be upgraded.
+    A lock still held by another process after ``BUSY_TIMEOUT`` is reported
+    as a ``ValueError``, like the other storage engines' write conflicts.
+    """
+
+    def __init__(self, path: str | None = None, immediate: bool = False):
+        self.path = path or SQLITE_PATH
+        self.immediate = immediate
+        self._begin = 'BEGIN IMMEDIATE' if immediate else 'BEGIN'
+        self._conn: sqlite3.Connection | None = None
+        self._depth = 0
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = _connect(self.path)
+        return self._conn
+
+    def _run(self, sql: str, params: tuple = ()) -> sqlite3.Cursor:
+        try:
+            return self.conn.execute(sql, params)
+        except sqlite3.OperationalError as e:
+            if 'locked' in str(e) or 'busy' in str(e):
+                raise ValueError('the database is locked by another process; retry') from e
+            raise
+
+    def begin(self) -> None:
+        if self._depth == 0:
+            self._run(self._begin)
+        else:
+            self._run(f'SAVEPOINT sp{self._depth}')
+        self._depth += 1
+
+    def commit(self) -> None:
+        self._depth -= 1
+        if self._depth > 0:
+            self._run(f'RELEASE sp{self._depth}')
+            return
+        try:
+            self._run('COMMIT')
+        except BaseException:
+            if self.conn.in_transaction:
+                self.conn.execute('ROLLBACK')
+            raise
+
+    def rollback(self) -> None:
+        self._depth -= 1
+        if self._depth == 0:
+            self.conn.execute('ROLLBACK')
+        else:
+            self.conn.execute(f'ROLLBACK TO sp{self._depth}')
+            self.conn.execute(f'RELEASE sp{self._depth}')
+
+    def execute(self, sql: str, params: tuple = ()) -> sqlite3.Cursor:
+        if metrics.ENABLED:
+            metrics.count('queries')
+        return self._run(sql, params)
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def _client(row) -> Client:
+    return Client(row['full_name'], row['email'], row['phone'], wallet=row['wallet'], id=row['id'])
+
+
+def _room(row) -> Room:
+    return Room(row['room_type'], Money(row['price']), row['description'], id=row['id'])
+
+
+def _reservation(row) -> Reservation:
+    return Reservation(row['client_id'], row['room_id'], row['check_in'], row['nights'],
+                       Money(row['total']), confirmed=bool(row['confirmed']), id=row['id'])
+
+
+def _payment(row) -> Payment:
+    return Payment(row['client_id'], Money(row['amount'], Currency(row['currency'])), row['type'],
+                   row['reservation_id'], created_at=row['created_at'], id=row['id'],
+                   eur_minor=row['eur_minor'])
+
+
+class _SqliteRepository:
+    def __init__(self, uow: SqliteUnitOfWork | None = None):
+        self.uow = uow or SqliteUnitOfWork()
+
+    def _one(self, sql: str, params: tuple):
+        with self.uow:
+            return self.uow.execute(sql, params).fetchone()
+
+    def _all(self, sql: str, params: tuple = ()) -> list:
+        with self.uow:
+            return self.uow.execute(sql, params).fetchall()
+
+    def _project(self, table: str, fields: tuple):
+        """Views over the requested columns only; hydrating one reads its whole row."""
+        columns = select_columns(COLUMNS[table], fields)
+        rows = self._rows(table, columns=', '.join(dict.fromkeys(columns.values())))
+        return (RowView(row, columns, self._get_row) for row in rows)
+
+    def _get_row(self, row):
+        return self.get(row['id'])
+
+    def _rows(self, table: str, filters: list[tuple[str, object]] | tuple = (), after_id: int = 0,
+              limit: int | None = None, columns: str = '*'):
+        """Rows of table matching every (condition, param) filter, keyset paginated in id order.
+
+        Rows are read ``CHUNK`` at a time, every chunk in a transaction of
+        its own that ends before its rows are yielded, so the caller may
+        write between rows or stop early without holding the outermost
+        transaction open.
+        """
+        conditions = ' AND '.join([condition for condition, _ in filters] + ['id > ?'])
+        sql = f"SELECT {columns} FROM {table} WHERE {conditions} ORDER BY id LIMIT ?"
+        params = tuple(param for _, param in filters)
+        while limit != 0:
+            count = CHUNK if limit is None else min(CHUNK, limit)
+            with self.uow:
+                rows = self.uow.execute(sql, params + (after_id, count)).fetchall()
+            yield from rows
+            if len(rows) < count:
+                return
+            if limit is not None:
+                limit -= len(rows)
+            after_id = rows[-1]['id']
+
+
+class SqliteClientRepository(_SqliteRepository, ClientRepository):
+    def add(self, client: Client) -> None:
+        with self.uow:
+            cur = self.uow.execute('INSERT INTO clients (full_name, email, phone, wallet) VALUES (?, ?, ?, ?)',
+                                   (client.full_name, client.email, client.phone, client.wallet))
+            client.id = cur.lastrowid
+
+    def get(self, client_id: int) -> Client | None:
+        row = self._one('SELECT * FROM clients WHERE id = ?', (client_id,))
+        return _client(row) if row else None
+
+    def find_by_email(self, email: str) -> Client | None:
+        row = self._one('SELECT * FROM clients WHERE email = ?', (email,))
+        return _client(row) if row else None
+
+    def save(self, client: Client) -> None:
+        with self.uow:
+            self.uow.execute('UPDATE clients SET full_name = ?, email = ?, phone = ?, wallet = ? WHERE id = ?',
+                             (client.full_name, client.email, client.phone, client.wallet, client.id))
+
+    def project(self, *fields: str):
+        return self._project('clients', fields)
+
+
+class SqliteRoomRepository(_SqliteRepository, RoomRepository):
+    def add(self, room: Room) -> None:
+        with self.uow:
+            cur = self.uow.execute('INSERT INTO rooms (room_type, price, description) VALUES (?, ?, ?)',
+                                   (room.room_type, room.price_per_night.amount, room.description))
+            room.id = cur.lastrowid
+
+    def get(self, room_id: int) -> Room | None:
+        row = self._one('SELECT * FROM rooms WHERE id = ?', (room_id,))
+        return _room(row) if row else None
+
+    def list(self) -> list[Room]:
+        return [_room(r) for r in self._all('SELECT * FROM rooms ORDER BY id')]
+
+    def project(self, *fields: str):
+        return self._project('rooms', fields)
+
+
+class SqliteReservationRepository(_SqliteRepository, ReservationRepository):
+    def add(self, reservation: Reservation) -> None:
+        start = day_ordinal(reservation.check_in)
+        with self.uow:
+            cur = self.uow.execute(
+                'INSERT INTO reservations (client_id, room_id, check_in, nights, start_day, end_day,'
+                ' total, confirmed) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (reservation.client_id, reservation.room_id, reservation.check_in, reservation.nights,
+                 start, start + reservation.nights, reservation.total_amount.amount,
+                 reservation.confirmed))
+            reservation.id = cur.lastrowid
+
+    def get(self, reservation_id: int) -> Reservation | None:
+        row = self._one('SELECT * FROM reservations WHERE id = ?', (reservation_id,))
+        return _reservation(row) if row else None
+
+    def list(self) -> list[Reservation]:
+        return [_reservation(r) for r in self._all('SELECT * FROM reservations ORDER BY id')]
+
+    def project(self, *fields: str):
+        return self._project('reservations', fields)
+
+    def query(self, client_id: int | None = None, room_id: int | None = None, start: str | None = None,
+              end: str | None = None, confirmed: bool | None = None, after_id: int = 0,
+              limit: int | None = None):
+        filters = [(condition, param) for condition, param in (
+            ('client_id = ?', client_id),
+            ('room_id = ?', room_id),
+            ('start_day >= ?', None if start is None else day_ordinal(start)),
+            ('start_day <= ?', None if end is None else day_ordinal(end)),
+            ('confirmed = ?', confirmed),
+        ) if param is not None]
+        for row in self._rows('reservations', filters, after_id, limit):
+            yield _reservation(row)
+
+    def scan(self):
+        return (tuple(row)[1:] for row in self._rows('reservations', columns='id, room_id, check_in, nights, confirmed'))
+
+    def calendar(self, room_id: int) -> OccupancyCalendar:
+        calendar = OccupancyCalendar()
+        for row in self._all('SELECT start_day, end_day FROM reservations WHERE room_id = ?', (room_id,)):
+            calendar.add(room_id, row['start_day'], row['end_day'])
+        return calendar
+
+    def remove(self, reservation_id: int) -> None:
+        with self.uow:
+            cur = self.uow.execute('DELETE FROM reservations WHERE id = ?', (reservation_id,))
+            if cur.rowcount == 0:
+                raise ValueError('reservation not found')
+
+    def save(self, reservation: Reservation) -> None:
+        with self.uow:
+            self.uow.execute('UPDATE reservations SET confirmed = ? WHERE id = ?',
+                             (reservation.confirmed, reservation.id))
+
+    def find_overlapping(self, room_id: int, check_in: str, nights: int) -> list[Reservation]:
+        start = day_ordinal(check_in)
+        rows = self._all('SELECT * FROM reservations WHERE room_id = ? AND start_day < ? AND end_day > ?',
+                         (room_id, start + nights, start))
+        return [_reservation(r) for r in rows]
+
+    def booked_rooms(self, room_ids, check_in: str, nights: int) -> set[int]:
+        room_ids = list(room_ids)
+        if not room_ids:
+            return set()
+        start = day_ordinal(check_in)
+        marks = ', '.join('?' * len(room_ids))
+        rows = self._all(f'SELECT DISTINCT room_id FROM reservations WHERE room_id IN ({marks})'
+                         ' AND start_day < ? AND end_day > ?', (*room_ids, start + nights, start))
+        return {r['room_id'] for r in rows}
+
+
+class SqlitePaymentRepository(_SqliteRepository, PaymentRepository):
+    def add(self, payment: Payment) -> None:
+        with self.uow:
+            cur = self.uow.execute(
+                'INSERT INTO payments (client_id, reservation_id, amount, currency, type, created_at, eur_minor)'
+                ' VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (payment.client_id, payment.reservation_id, payment.amount.amount,
+                 payment.amount.currency.value, payment.kind, payment.created_at, settle(payment)))
+            payment.id = cur.lastrowid
+
+    def replace(self, payments: list[Payment], payment: Payment) -> None:
+        with self.uow:
+            for old in payments:
+                self.uow.execute('DELETE FROM payments WHERE id = ?', (old.id,))
+            self.uow.execute(
+                'INSERT INTO payments (id, client_id, reservation_id, amount, currency, type, created_at,'
+                ' eur_minor) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (payment.id, payment.client_id, payment.reservation_id, payment.amount.amount,
+                 payment.amount.currency.value, payment.kind, payment.created_at, settle(payment)))
+
+    def get(self, payment_id: int) -> Payment | None:
+        row = self._one('SELECT * FROM payments WHERE id = ?', (payment_id,))
+        return _payment(row) if row else None
+
+    def list(self) -> list[Payment]:
+        return [_payment(r) for r in self._all('SELECT * FROM payments ORDER BY id')]
+
+    def project(self, *fields: str):
+        return self._project('payments', fields)
+
+    def query(self, client_id: int | None = None, kind: str | None = None, start: str | None = None,
+              end: str | None = None, after_id: int = 0, limit: int | None = None):
+        filters = [(condition, param) for condition, param in (
+            ('client_id = ?', client_id),
+            ('type = ?', kind),
+            ('created_at >= ?', start),
+            ("substr(coalesce(created_at, ''), 1, 10) <= ?", end),
+        ) if param is not None]
+        for row in self._rows('payments', filters, after_id, limit):
+            yield _payment(row)
+
+    def scan(self):
+        return (tuple(row)[1:] for row in self._rows('payments', columns='id, created_at, amount, currency, type'))
+
+    def list_for_client(self, client_id: int) -> list[Payment]:
+        rows = self._all('SELECT * FROM payments WHERE client_id = ? ORDER BY id', (client_id,))
+        return [_payment(r) for r in rows]
+
+    def history(self, client_id: int, since: str | None = None):
+        # Read before yielding, so the transaction is not held between payments.
+        if since is None:
+            rows = self._all('SELECT * FROM payments WHERE client_id = ? ORDER BY id', (client_id,))
+        else:
+            rows = self._all('SELECT * FROM payments WHERE client_id = ? AND created_at >= ? ORDER BY id',
+                             (client_id, since))
+        for row in rows:
+            yield _payment(row)
+
+    def balance(self, client_id: int, as_of: str | None = None) -> Money:
+        as_of = as_of or '9999-12-31'
+        day = "substr(coalesce(created_at, ''), 1, 10)"
+        credits = ', '.join('?' * len(CREDIT_KINDS))
+        total = self._one(f"SELECT SUM(CASE WHEN type IN ({credits}) THEN eur_minor ELSE -eur_minor END) AS total"
+                          f" FROM payments WHERE client_id = ? AND eur_minor IS NOT NULL AND {day} <= ?",
+                          (*sorted(CREDIT_KINDS), client_id, as_of))['total'] or 0
+        # Payments stored without their euro value are converted and rounded
+        # one by one; those sharing an amount, currency and day share it.
+        rows = self._all(f"SELECT type, currency, {day} AS day, amount, COUNT(*) AS n FROM payments"
+                         f" WHERE client_id = ? AND eur_minor IS NULL AND {day} <= ?"
+                         ' GROUP BY type, currency, day, amount', (client_id, as_of))
+        total += sum(r['n'] * wallet_effect_minor(r['amount'], r['currency'], r['type'], r['day']) for r in rows)
+        return Money.from_minor(total)
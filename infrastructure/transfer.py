@@ -0,0 +1,245 @@
+"""Bulk import and export of the collections as CSV or JSONL.
+
+Both directions stream: export writes each record as it is read from a
+projection, and import reads one row at a time and loads it through the
+repositories inside a single unit of work, so the database is written
+once (or every ``commit_every`` rows) instead of once per row. Rows are
+validated against the repositories' in-memory indexes: a duplicate email,
+an unknown client, room or reservation, or an overlapping stay rejects
+the row, which leaves no trace, and the import goes on with the next one.
+
+Ids in the input are not kept: every record gets a new id, and a row
+referring to a client, room or reservation imported in the same run with
+an ``id`` column is pointed at the new record. References to collections
+not imported in the run are database ids.
+
+A client's payments are kept in the order they were recorded, which the
+ledger relies on: a payment recorded before the client's latest one is
+rejected, so payments are imported oldest first. A payment of a client
+already in the database changes its wallet as the payment did; clients
+imported in the same run bring their wallet with them.
+"""
+import csv
+import json
+from datetime import datetime
+from typing import Iterable, Iterator, TextIO
+
+from domain.entities import Client, Room, Reservation, Payment
+from domain.ledger import payment_day, wallet_effect
+from domain.services import ReservationService
+from domain.value_objects import Money, Currency
+
+COLLECTIONS = ('clients', 'rooms', 'reservations', 'payments')
+FORMATS = ('csv', 'jsonl')
+
+
+def _bool(value) -> bool:
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in ('1', 'true', 'yes'):
+        return True
+    if text in ('0', 'false', 'no'):
+        return False
+    raise ValueError(f"invalid boolean '{value}'")
+
+
+def _timestamp(value) -> str:
+    try:
+        return datetime.fromisoformat(str(value)).isoformat(timespec='seconds')
+    except ValueError:
+        raise ValueError(f"invalid timestamp '{value}'") from None
+
+
+# Fields of every collection, in export order: name -> (parser, required on import).
+FIELDS = {
+    'clients': {'id': (int, False), 'full_name': (str, True), 'email': (str, True),
+                'phone': (str, True), 'wallet': (float, False)},
+    'rooms': {'id': (int, False), 'room_type': (str, True), 'price_per_night': (float, True),
+              'description': (str, True)},
+    'reservations': {'id': (int, False), 'client_id': (int, True), 'room_id': (int, True),
+                     'check_in': (str, True), 'nights': (int, True), 'total_amount': (float, False),
+                     'confirmed': (_bool, False)},
+    'payments': {'id': (int, False), 'client_id': (int, True), 'reservation_id': (int, False),
+                 'amount': (float, True), 'currency': (str, False), 'kind': (str, True),
+                 'created_at': (_timestamp, False), 'eur_minor': (int, False)},
+}
+
+
+def file_format(path: str, fmt: str | None = None) -> str:
+    """fmt if given, else the format named by path's extension (JSONL by default)."""
+    if fmt:
+        return fmt
+    return 'csv' if path.lower().endswith('.csv') else 'jsonl'
+
+
+def read_rows(source: TextIO, fmt: str) -> Iterator[tuple[int, dict | str]]:
+    """(line number, row) of every record of a stream.
+
+    CSV rows are dicts; JSONL rows are the lines themselves, decoded by the
+    importer so that a malformed line only rejects that row.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(source)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_no, line in enumerate(source, start=1):
+        if line.strip():
+            yield line_no, line
+
+
+def _parse(collection: str, row: dict | str) -> dict:
+    if isinstance(row, str):
+        row = json.loads(row)
+        if not isinstance(row, dict):
+            raise ValueError('row must be a JSON object')
+    parsed = {}
+    for name, (parse, required) in FIELDS[collection].items():
+        value = row.get(name)
+        if value is None or value == '':
+            if required:
+                raise ValueError(f"missing field '{name}'")
+            continue
+        parsed[name] = parse(value)
+    return parsed
+
+
+class Importer:
+    """Loads rows into the service's repositories in large transactions.
+
+    ``commit_every`` and ``stop_on_error`` behave as for ``run_batch``.
+    The only state kept per row is the old to new id mapping of rows that
+    carry an id, and the ids of the clients created, whose wallet already
+    holds the effect of their imported payments.
+    """
+
+    def __init__(self, service: ReservationService, commit_every: int = 0, stop_on_error: bool = False):
+        self.service = service
+        self.commit_every = commit_every
+        self.stop_on_error = stop_on_error
+        self.ids: dict[str, dict[int, int]] = {}
+        self.new_clients: set[int] = set()
+        self.counts = {collection: 0 for collection in COLLECTIONS}
+        self.failures = 0
+        self.stopped = False
+
+    def load(self, collection: str, rows: Iterable[tuple[int, dict | str]], errors: TextIO) -> int:
+        """Import rows into collection, reporting rejected rows to errors."""
+        loader = _LOADERS[collection]
+        rows = iter(rows)
+        imported = pending = 0
+        done = False
+        while not done:
+            with self.service.uow:
+                for line_no, row in rows:
+                    try:
+                        with self.service.uow:
+                            fields = _parse(collection, row)
+                            new_id = loader(self, fields)
+                    except (ValueError, TypeError) as e:
+                        self.failures += 1
+                        errors.write(f"{collection} line {line_no}: {e}\n")
+                        if self.stop_on_error:
+                            self.stopped = done = True
+                            break
+                        continue
+                    if 'id' in fields:
+                        self.ids.setdefault(collection, {})[fields['id']] = new_id
+                    if collection == 'clients':
+                        self.new_clients.add(new_id)
+                    imported += 1
+                    pending += 1
+                    if self.commit_every and pending >= self.commit_every:
+                        pending = 0
+                        break
+                else:
+                    done = True
+        self.counts[collection] += imported
+        return imported
+
+    def _resolve(self, collection: str, entity: str, old_id: int):
+        """The record a reference points at, or ValueError if there is none."""
+        ids = self.ids.get(collection)
+        new_id = old_id if ids is None else ids.get(old_id)
+        record = None if new_id is None else getattr(self.service, collection).get(new_id)
+        if record is None:
+            raise ValueError(f"unknown {entity} id {old_id}")
+        return record
+
+    def _client(self, fields: dict) -> int:
+        if self.service.clients.find_by_email(fields['email']) is not None:
+            raise ValueError(f"client '{fields['email']}' already exists")
+        client = Client(fields['full_name'], fields['email'], fields['phone'], fields.get('wallet', 0.0))
+        self.service.clients.add(client)
+        return client.id
+
+    def _room(self, fields: dict) -> int:
+        room = Room(fields['room_type'], Money(fields['price_per_night']), fields['description'])
+        self.service.rooms.add(room)
+        return room.id
+
+    def _reservation(self, fields: dict) -> int:
+        client = self._resolve('clients', 'client', fields['client_id'])
+        room = self._resolve('rooms', 'room', fields['room_id'])
+        nights = fields['nights']
+        if nights < 1:
+            raise ValueError("nights must be positive")
+        if self.service.reservations.booked_rooms([room.id], fields['check_in'], nights):
+            raise ValueError(f"room {fields['room_id']} is already booked for those dates")
+        total = fields.get('total_amount')
+        reservation = Reservation(client_id=client.id, room_id=room.id, check_in=fields['check_in'],
+                                  nights=nights,
+                                  total_amount=room.price_per_night * nights if total is None else Money(total),
+                                  confirmed=fields.get('confirmed', False))
+        self.service.reservations.add(reservation)
+        return reservation.id
+
+    def _payment(self, fields: dict) -> int:
+        client = self._resolve('clients', 'client', fields['client_id'])
+        reservation_id = fields.get('reservation_id')
+        if reservation_id is not None:
+            reservation_id = self._resolve('reservations', 'reservation', reservation_id).id
+        currency = fields.get('currency', 'EUR').upper()
+        if currency not in Currency.__members__:
+            raise ValueError('unsupported currency')
+        payment = Payment(client_id=client.id, amount=Money(fields['amount'], Currency(currency)),
+                          kind=fields['kind'], reservation_id=reservation_id,
+                          created_at=fields.get('created_at'), eur_minor=fields.get('eur_minor'))
+        for later in self.service.payments.history(client.id, payment_day(payment.created_at)):
+            if (later.created_at or '') > payment.created_at:
+                raise ValueError(f"payment recorded before payment {later.id} of the client;"
+                                 " import payments oldest first")
+        if client.id not in self.new_clients:
+            client.wallet = (Money(client.wallet) + wallet_effect(payment)).amount
+            self.service.clients.save(client)
+        self.service.payments.add(payment)
+        return payment.id
+
+
+_LOADERS = {
+    'clients': Importer._client,
+    'rooms': Importer._room,
+    'reservations': Importer._reservation,
+    'payments': Importer._payment,
+}
+
+
+def export_collection(service: ReservationService, collection: str, out: TextIO, fmt: str) -> int:
+    """Stream every record of collection to out; returns the number written."""
+    fields = FIELDS[collection]
+    writer = None
+    if fmt == 'csv':
+        writer = csv.writer(out)
+        writer.writerow(fields)
+    count = 0
+    with service.uow:
+        for view in getattr(service, collection).project(*fields):
+            values = [getattr(view, name) for name in fields]
+            values = [v if v is None else parse(v) for v, (parse, _) in zip(values, fields.values())]
+            if writer is None:
+                out.write(json.dumps(dict(zip(fields, values))) + '\n')
+            else:
+                writer.writerow(values)
+            count += 1
+    return count
@@ -1,5 +1,13 @@
-from infrastructure.cli import main
+import sys
+
+from infrastructure.daemon_client import forward
 
 
 if __name__ == "__main__":
-    main()
+    # Forward to a running daemon before importing the application at all.
+    status = forward(sys.argv[1:])
+    if status is None:
+        from infrastructure.cli import main
+        main()
+    else:
+        sys.exit(status)
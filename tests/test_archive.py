@@ -0,0 +1,141 @@
+import gzip
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from domain.entities import Payment
+from domain.ledger import BALANCE_FORWARD
+from domain.value_objects import Money
+from infrastructure import db, ledger
+from infrastructure.archive import FileArchiveRepository
+
+
+class ArchiveTestCase(unittest.TestCase):
+    engine = 'json'
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'database')
+        self.service = db.create_service(self.engine, self.path)
+        self.client = self.service.add_client('Bob', 'b@example.com', '555')
+        self.service.deposit(self.client.id, 1000)
+        self.past = self.service.add_reservation(self.client.id, 1, '2025-01-01', 2)
+        self.service.confirm_reservation(self.past.id)
+        self.future = self.service.add_reservation(self.client.id, 2, '2099-06-01', 3)
+
+    def tearDown(self):
+        close = getattr(self.service.uow, 'close', None)
+        if close is not None:
+            close()
+        self.tmp.cleanup()
+
+    def reports(self):
+        return (self.service.occupancy_report('2025-01-01', '2099-12-31'),
+                self.service.revenue_report('2025-01-01', '2099-12-31'))
+
+    def test_archive_keeps_balances_and_reports(self):
+        reports = self.reports()
+        wallet = self.service.clients.get(self.client.id).wallet
+        counts = self.service.archive_before('2099-01-01')
+        self.assertEqual(counts, {'reservations': 1, 'payments': 3})
+        self.assertEqual([r.id for r in self.service.reservations.list()], [self.future.id])
+        hot = self.service.payments.list_for_client(self.client.id)
+        self.assertEqual([(p.id, p.kind) for p in hot], [(3, BALANCE_FORWARD), (4, 'reservation_deposit')])
+        self.assertEqual(self.service.wallet_balance(self.client.id), Money(wallet))
+        self.assertTrue(self.service.verify_wallet(self.client.id))
+        self.assertEqual(self.reports(), reports)
+        self.assertEqual([r.id for r in self.service.archived_reservations()], [self.past.id])
+        self.assertEqual([p.id for p in self.service.archived_payments(self.client.id)], [1, 2, 3])
+        self.assertEqual(list(self.service.archived_reservations(start='2025-02-01')), [])
+
+        self.assertEqual(self.service.archive_before('2099-01-01'), {'reservations': 0, 'payments': 0})
+        self.service.confirm_reservation(self.future.id)
+        reports = self.reports()
+        self.assertEqual(self.service.archive_before('2100-01-01'), {'reservations': 1, 'payments': 2})
+        hot = self.service.payments.list_for_client(self.client.id)
+        self.assertEqual([(p.id, p.kind) for p in hot], [(5, BALANCE_FORWARD)])
+        self.assertEqual(hot[0].amount, Money(wallet) - self.future.total_amount / 2)
+        self.assertTrue(self.service.verify_wallet(self.client.id))
+        self.assertEqual(self.reports(), reports)
+        self.assertEqual([p.id for p in self.service.archived_payments(self.client.id)], [1, 2, 3, 4, 5])
+
+    def test_failed_run_is_not_counted_twice(self):
+        reports = self.reports()
+        with mock.patch.object(self.service.payments, 'replace', side_effect=ValueError('commit failed')):
+            with self.assertRaises(ValueError):
+                self.service.archive_before('2099-01-01')
+        self.assertEqual([p.id for p in self.service.archived_payments(self.client.id)], [1, 2, 3])
+        self.assertEqual(self.reports(), reports)
+        self.assertEqual(self.service.archive_before('2099-01-01'), {'reservations': 1, 'payments': 3})
+        self.assertEqual(self.reports(), reports)
+
+
+class SqliteArchiveTestCase(ArchiveTestCase):
+    engine = 'sqlite'
+
+
+class ShardedArchiveTestCase(ArchiveTestCase):
+    engine = 'sharded'
+
+
+class LedgerCheckpointTestCase(unittest.TestCase):
+    def test_checkpoints_folded_into_the_forward_are_dropped(self):
+        with tempfile.TemporaryDirectory() as directory, mock.patch.object(ledger, 'CHECKPOINT_EVERY', 2):
+            service = db.create_service('json', os.path.join(directory, 'database.json'))
+            client = service.add_client('Bob', 'b@example.com', '555')
+            for _ in range(5):
+                service.deposit(client.id, 10)
+            service.archive_before('2100-01-01')
+            for _ in range(3):
+                service.deposit(client.id, 10)
+            self.assertEqual(service.wallet_balance(client.id), Money(80))
+            self.assertTrue(service.verify_wallet(client.id))
+
+
+class FileArchiveTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.archive = FileArchiveRepository(os.path.join(self.tmp.name, 'database.json.archive'))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_segments_are_appended_and_read_once_per_id(self):
+        june = Payment(1, Money(10), 'deposit', created_at='2025-06-03T10:00:00', id=1)
+        july = Payment(1, Money(20), 'deposit', created_at='2025-07-01T10:00:00', id=2)
+        self.archive.add_payments([june, july])
+        self.archive.add_payments([june, Payment(2, Money(5), 'deposit', created_at='2025-06-04T09:00:00', id=3)])
+        self.assertEqual(sorted(os.listdir(self.archive.directory)),
+                         ['payments-2025-06.jsonl.gz', 'payments-2025-07.jsonl.gz'])
+        with gzip.open(os.path.join(self.archive.directory, 'payments-2025-06.jsonl.gz'), 'rt') as f:
+            self.assertEqual(len(f.readlines()), 3)
+        self.assertEqual([p.id for p in self.archive.payments()], [1, 3, 2])
+        self.assertEqual([p.id for p in self.archive.payments(client_id=1)], [1, 2])
+        self.assertEqual([p.id for p in self.archive.payments(start='2025-06-04', end='2025-06-30')], [3])
+        self.assertEqual(list(FileArchiveRepository(self.tmp.name + '/missing').reservations()), [])
+
+
+class ArchiveCommandTestCase(unittest.TestCase):
+    def test_policy_and_memory_engine(self):
+        with tempfile.TemporaryDirectory() as directory:
+            db.configure('json', os.path.join(directory, 'database.json'))
+            try:
+                client_id = db.add_client('Bob', 'b@example.com', '555')
+                db.deposit(client_id, 100)
+                with mock.patch.dict(os.environ, {'HOTEL_ARCHIVE_DAYS': '0'}):
+                    # Nothing was recorded before today.
+                    self.assertEqual(db.archive(), {'reservations': 0, 'payments': 0})
+                self.assertEqual(db.archive('2100-01-01'), {'reservations': 0, 'payments': 1})
+                self.assertEqual([p['amount'] for p in db.archived_payments(client_id)], [100])
+                self.assertEqual(db.wallet_balance(client_id), 100)
+                with mock.patch.dict(os.environ, {'HOTEL_ARCHIVE_DAYS': 'soon'}):
+                    with self.assertRaisesRegex(ValueError, 'invalid HOTEL_ARCHIVE_DAYS'):
+                        db.archive()
+                with mock.patch.dict(os.environ, {'HOTEL_ARCHIVE_DAYS': ''}):
+                    with self.assertRaisesRegex(ValueError, 'give --before'):
+                        db.archive()
+            finally:
+                db.configure()
+        with self.assertRaisesRegex(ValueError, 'no archive'):
+            db.create_service('memory').archive_before('2025-01-01')
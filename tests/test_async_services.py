@@ -0,0 +1,103 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from domain.async_repositories import ServiceExecutor
+from domain.async_services import AsyncReservationService
+from infrastructure import db
+
+
+class FakeExecutor(ServiceExecutor):
+    """Records calls; reads only complete once released."""
+
+    def __init__(self):
+        self.calls = []
+        self.release = asyncio.Event()
+
+    async def call(self, target, method, *args, write=False):
+        self.calls.append((method, args, write))
+        number = len(self.calls)
+        if not write:
+            await self.release.wait()
+        return number
+
+
+class CoalescingTestCase(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.executor = FakeExecutor()
+        self.service = AsyncReservationService(self.executor, None, None, None, None)
+
+    async def test_simultaneous_reads_share_one_call(self):
+        reads = asyncio.gather(*(self.service.list_rooms() for _ in range(5)),
+                               self.service.wallet_balance(1), self.service.wallet_balance(2))
+        await asyncio.sleep(0)
+        self.executor.release.set()
+        self.assertEqual(await reads, [1, 1, 1, 1, 1, 2, 3])
+
+    async def test_read_after_write_is_not_coalesced_with_older_read(self):
+        before = asyncio.ensure_future(self.service.list_rooms())
+        await asyncio.sleep(0)
+        await self.service.add_room('loft', 80, 'Top floor')
+        after = asyncio.ensure_future(self.service.list_rooms())
+        await asyncio.sleep(0)
+        self.executor.release.set()
+        self.assertNotEqual(await before, await after)
+        self.assertEqual([call[0] for call in self.executor.calls].count('list_rooms'), 2)
+
+    async def test_cancelled_caller_does_not_cancel_shared_read(self):
+        first = asyncio.ensure_future(self.service.list_rooms())
+        second = asyncio.ensure_future(self.service.list_rooms())
+        await asyncio.sleep(0)
+        first.cancel()
+        self.executor.release.set()
+        self.assertEqual(await second, 1)
+
+
+class AsyncServiceTestCase(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def make_service(self, engine, name, writers=1):
+        service = db.create_async_service(engine, os.path.join(self.tmp.name, name), writers=writers)
+        self.addCleanup(service.close)
+        return service
+
+    async def test_reservation_flow(self):
+        service = self.make_service('json', 'database.json')
+        client = await service.add_client('Bob', 'b@example.com', '555')
+        self.assertEqual(await service.deposit(client.id, 200), 200)
+        reservation = await service.add_reservation(client.id, 1, '2025-01-01', 2)
+        await service.confirm_reservation(reservation.id)
+        self.assertTrue((await service.reservations.get(reservation.id)).confirmed)
+        self.assertEqual([p.kind for p in await service.payment_history(client.id)],
+                         ['deposit', 'reservation_deposit', 'reservation_balance'])
+        self.assertTrue(await service.verify_wallet(client.id))
+        with self.assertRaises(ValueError):
+            await service.cancel_reservation(99)
+
+    async def test_simultaneous_list_rooms_load_once(self):
+        service = self.make_service('json', 'database.json')
+        await service.list_rooms()
+        with mock.patch('infrastructure.repositories._load_document') as load:
+            executor = service.executor
+            with mock.patch.object(executor, '_run', wraps=executor._run) as run:
+                rooms = await asyncio.gather(*(service.list_rooms() for _ in range(20)))
+        self.assertEqual(run.call_count, 1)
+        self.assertLessEqual(load.call_count, 1)
+        self.assertEqual([len(r) for r in rooms], [3] * 20)
+
+    async def test_concurrent_bookings_of_a_room(self):
+        service = self.make_service('sqlite', 'database.sqlite3', writers=4)
+        clients = [await service.add_client(f'C{i}', f'c{i}@example.com', '1') for i in range(8)]
+        await asyncio.gather(*(service.deposit(c.id, 500) for c in clients),
+                             *(service.deposit(clients[0].id, 10) for _ in range(10)))
+        results = await asyncio.gather(*(service.add_reservation(c.id, 2, '2025-06-01', 2) for c in clients),
+                                       return_exceptions=True)
+        booked = [r for r in results if not isinstance(r, Exception)]
+        self.assertEqual(len(booked), 1)
+        self.assertTrue(all(isinstance(r, ValueError) for r in results if r not in booked))
+        self.assertEqual((await service.clients.get(clients[0].id)).wallet,
+                         600 - (100 if booked[0].client_id == clients[0].id else 0))
@@ -0,0 +1,50 @@
+import os
+import tempfile
+import unittest
+
+from domain.availability import IntervalIndex, day_ordinal
+from infrastructure.repositories import init_schema
+from tests.test_repositories import make_service
+
+
+class IntervalIndexTestCase(unittest.TestCase):
+    def test_overlapping(self):
+        index = IntervalIndex()
+        start = day_ordinal('2025-06-01')
+        index.add(1, start, start + 2, 10)
+        index.add(1, start + 5, start + 7, 11)
+        index.add(2, start, start + 30, 12)
+        self.assertEqual(index.overlapping(1, start + 1, start + 3), [10])
+        self.assertEqual(index.overlapping(1, start + 2, start + 5), [])
+        self.assertEqual(index.overlapping(1, start - 3, start + 10), [10, 11])
+        index.remove(1, start, 10)
+        self.assertEqual(index.overlapping(1, start, start + 1), [])
+
+
+class AvailableRoomsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'database.json')
+        init_schema(self.path)
+        self.service = make_service(self.path)
+        client = self.service.add_client('Bob', 'b@example.com', '555')
+        self.service.deposit(client.id, 1000)
+        self.reservation = self.service.add_reservation(client.id, 2, '2025-06-01', 3)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_find_available_rooms(self):
+        rooms = self.service.find_available_rooms('2025-06-02', 2)
+        self.assertEqual([r.id for r in rooms], [1, 3])
+        rooms = self.service.find_available_rooms('2025-06-04', 2)
+        self.assertEqual([r.id for r in rooms], [1, 2, 3])
+
+    def test_cancel_frees_room(self):
+        self.service.cancel_reservation(self.reservation.id)
+        rooms = self.service.find_available_rooms('2025-06-02', 2)
+        self.assertEqual([r.id for r in rooms], [1, 2, 3])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import os
+import io
+import json
+import tempfile
+import unittest
+
+from infrastructure.batch import run_batch
+from infrastructure.repositories import init_schema
+from tests.test_repositories import CountingUnitOfWork, make_service
+
+OPERATIONS = [
+    {'op': 'add-client', 'name': 'Bob', 'email': 'b@example.com', 'phone': '555'},
+    {'op': 'deposit', 'client': 1, 'amount': 100},
+    {'op': 'reserve', 'client': 1, 'room': 3, 'check_in': '2025-06-01', 'nights': 2},
+    {'op': 'reserve', 'client': 1, 'room': 1, 'check-in': '2025-06-01', 'nights': 2},
+    {'op': 'confirm', 'reservation': 1},
+]
+
+
+class BatchTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'database.json')
+        init_schema(self.path)
+        self.uow = CountingUnitOfWork(self.path)
+        self.service = make_service(self.path, self.uow)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def run_ops(self, ops, **kwargs):
+        out = io.StringIO()
+        lines = [json.dumps(op) + '\n' for op in ops]
+        failures = run_batch(self.service, lines, out, **kwargs)
+        return failures, [json.loads(l) for l in out.getvalue().splitlines()]
+
+    def read_db(self):
+        with open(self.path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def test_continue_on_error(self):
+        failures, results = self.run_ops(OPERATIONS + ['oops'])
+        self.assertEqual(failures, 2)
+        self.assertEqual([r['ok'] for r in results], [True, True, False, True, True, False])
+        self.assertEqual(results[2]['error'], 'insufficient funds')
+        self.assertEqual(results[3]['result'], {'id': 1})
+        self.assertEqual((self.uow.reads, self.uow.writes), (1, 1))
+        data = self.read_db()
+        self.assertEqual(data['clients']['1']['wallet'], 0)
+        self.assertEqual(len(data['payments']), 3)
+
+    def test_malformed_fields_fail_their_line_only(self):
+        failures, results = self.run_ops([OPERATIONS[0], {'op': 'deposit', 'client': 1, 'amount': 10, 'currency': 5}])
+        self.assertEqual(failures, 1)
+        self.assertEqual(results[1]['error'], "field 'currency' must be a string")
+        self.assertEqual(len(self.read_db()['clients']), 1)
+
+    def test_stop_on_error(self):
+        failures, results = self.run_ops(OPERATIONS, stop_on_error=True)
+        self.assertEqual(failures, 1)
+        self.assertEqual(len(results), 3)
+        data = self.read_db()
+        self.assertEqual(data['clients']['1']['wallet'], 100)
+        self.assertEqual(data['reservations'], {})
+
+    def test_commit_every(self):
+        self.run_ops(OPERATIONS, commit_every=2)
+        self.assertEqual(self.uow.writes, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
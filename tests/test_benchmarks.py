@@ -0,0 +1,50 @@
+import os
+import tempfile
+import unittest
+
+from benchmarks.generator import counts_for, generate
+from benchmarks.suite import bench_size, compare
+from infrastructure import db
+
+
+class GeneratorTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def snapshot(self, seed):
+        path = os.path.join(self.tmp.name, f'database-{seed}-{len(os.listdir(self.tmp.name))}.json')
+        service = db.create_service('json', path)
+        generate(service, 5, 4, 20, seed)
+        with service.uow:
+            return ([(r.room_id, r.check_in, r.nights, r.confirmed) for r in service.reservations.list()],
+                    [c.wallet for c in (service.clients.get(i) for i in range(1, 6))])
+
+    def test_generation_is_deterministic(self):
+        first = self.snapshot(seed=1)
+        self.assertEqual(len(first[0]), 20)
+        self.assertEqual(self.snapshot(seed=1), first)
+        self.assertNotEqual(self.snapshot(seed=2), first)
+
+    def test_counts_scale_with_size(self):
+        counts = counts_for(10 ** 4)
+        self.assertEqual((counts['clients'], counts['rooms'], counts['reservations']), (1000, 200, 2500))
+
+
+class SuiteTestCase(unittest.TestCase):
+    def test_bench_and_compare(self):
+        results = {'sizes': {'100': bench_size('json', 100, repeat=2)}}
+        operations = results['sizes']['100']['operations']
+        self.assertIn('service.cancel_reservation', operations)
+        self.assertIn('cli.list-rooms', operations)
+        self.assertFalse(any(r['regression'] for r in compare(results, results)))
+        faster = {'sizes': {'100': {'operations': {
+            name: dict(timing, median_us=timing['median_us'] / 2) for name, timing in operations.items()
+        }}}}
+        self.assertTrue(all(r['regression'] for r in compare(results, faster)))
+
+
+if __name__ == '__main__':
+    unittest.main()
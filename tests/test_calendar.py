@@ -0,0 +1,94 @@
+import os
+import tempfile
+import unittest
+
+from domain.availability import day_ordinal
+from domain.calendar import OccupancyCalendar
+from infrastructure.repositories import init_schema, JsonUnitOfWork
+from tests.test_repositories import CountingUnitOfWork, make_service
+
+
+class OccupancyCalendarTestCase(unittest.TestCase):
+    def setUp(self):
+        self.calendar = OccupancyCalendar()
+        self.day = day_ordinal('2025-07-01')
+        self.calendar.add(4, self.day + 2, self.day + 5)
+        self.calendar.add(4, self.day - 3, self.day - 1)
+
+    def test_is_free(self):
+        self.assertTrue(self.calendar.is_free(4, self.day, 2))
+        self.assertFalse(self.calendar.is_free(4, self.day, 3))
+        self.assertFalse(self.calendar.is_free(4, self.day - 2, 1))
+        self.assertTrue(self.calendar.is_free(4, self.day - 10, 7))
+        self.assertTrue(self.calendar.is_free(5, self.day, 30))
+
+    def test_free_days_and_booked(self):
+        free = self.calendar.free_days(4, self.day - 4, self.day + 7)
+        self.assertEqual([d - self.day for d in free], [-4, -1, 0, 1, 5, 6])
+        self.assertEqual(self.calendar.booked(4, self.day, self.day + 7), 0b11100)
+
+    def test_first_free(self):
+        self.assertEqual(self.calendar.first_free(4, 2, self.day) - self.day, 0)
+        self.assertEqual(self.calendar.first_free(4, 3, self.day) - self.day, 5)
+        self.assertEqual(self.calendar.first_free(4, 3, self.day - 3) - self.day, -1)
+        self.assertEqual(self.calendar.first_free(4, 4, self.day - 3) - self.day, 5)
+        self.assertEqual(self.calendar.first_free(4, 2, self.day - 5) - self.day, -5)
+        self.assertEqual(self.calendar.first_free(9, 10, self.day), self.day)
+
+    def test_remove(self):
+        self.calendar.remove(4, self.day + 2, self.day + 5)
+        self.assertTrue(self.calendar.is_free(4, self.day, 30))
+        self.assertFalse(self.calendar.is_free(4, self.day - 3, 1))
+
+
+class CalendarServiceTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'database.json')
+        init_schema(self.path)
+        self.service = make_service(self.path)
+        self.client = self.service.add_client('Bob', 'b@example.com', '555')
+        self.service.deposit(self.client.id, 1000)
+        self.service.add_reservation(self.client.id, 3, '2025-07-03', 4)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_queries(self):
+        self.assertFalse(self.service.is_room_free(3, '2025-07-06', 1))
+        self.assertTrue(self.service.is_room_free(3, '2025-07-07', 5))
+        self.assertEqual(self.service.free_days(3, '2025-07-01', '2025-07-08'),
+                         ['2025-07-01', '2025-07-02', '2025-07-07', '2025-07-08'])
+        with self.assertRaisesRegex(ValueError, 'room not found'):
+            self.service.is_room_free(99, '2025-07-07', 1)
+        with self.assertRaisesRegex(ValueError, 'room not found'):
+            self.service.free_days(99, '2025-07-01', '2025-07-08')
+        (room, booked), = self.service.occupancy_calendar('2025-07-01', '2025-07-08', room_type='suite')
+        self.assertEqual((room.id, booked), (3, 0b111100))
+        room, check_in = self.service.first_free_window(3, '2025-07-02', room_type='suite')
+        self.assertEqual((room.id, check_in), (3, '2025-07-07'))
+        room, check_in = self.service.first_free_window(3, '2025-07-02')
+        self.assertEqual((room.id, check_in), (1, '2025-07-02'))
+        with self.assertRaises(ValueError):
+            self.service.occupancy_calendar('2025-07-01', '2025-07-08', room_id=42)
+
+    def test_calendar_follows_reservations_without_rebuilding(self):
+        uow = JsonUnitOfWork(self.path, keep_loaded=True)
+        service = make_service(self.path, uow)
+        self.assertFalse(service.is_room_free(3, '2025-07-03', 1))
+        calendar = service.reservations.calendar(3)
+        reservation = service.add_reservation(self.client.id, 3, '2025-07-10', 2)
+        self.assertFalse(service.is_room_free(3, '2025-07-11', 1))
+        service.cancel_reservation(reservation.id)
+        self.assertTrue(service.is_room_free(3, '2025-07-10', 2))
+        self.assertIs(service.reservations.calendar(3), calendar)
+
+    def test_calendar_is_rebuilt_after_rollback(self):
+        uow = CountingUnitOfWork(self.path)
+        service = make_service(self.path, uow)
+        with self.assertRaises(ValueError):
+            with uow:
+                service.add_reservation(self.client.id, 3, '2025-07-10', 2)
+                self.assertFalse(service.is_room_free(3, '2025-07-10', 1))
+                raise ValueError('abort')
+        self.assertTrue(service.is_room_free(3, '2025-07-10', 2))
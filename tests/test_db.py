@@ -1,50 +1,77 @@
+import contextlib
+import io
 import os
 import json
 import sys
 import subprocess
+import tempfile
 import unittest
 
-from infrastructure import db
+from infrastructure import cli, db
+from infrastructure.config import DB_ENV
+from infrastructure.daemon_client import NO_DAEMON_ENV
 
 
 class DBTestCase(unittest.TestCase):
     def setUp(self):
-        if os.path.exists(db.DB_PATH):
-            os.remove(db.DB_PATH)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'database.json')
+        db.configure(path=self.path)
+
+    def tearDown(self):
+        db.configure()
+        self.tmp.cleanup()
 
     def test_init_schema(self):
         db.init_schema()
-        self.assertTrue(os.path.exists(db.DB_PATH))
-        with open(db.DB_PATH, 'r', encoding='utf-8') as f:
+        self.assertTrue(os.path.exists(self.path))
+        with open(self.path, 'r', encoding='utf-8') as f:
             data = json.load(f)
-        self.assertEqual(data['clients'], [])
+        self.assertEqual(data['clients'], {})
         self.assertEqual(len(data['rooms']), 3)
-        self.assertEqual(data['reservations'], [])
-        self.assertEqual(data['payments'], [])
+        self.assertEqual(data['reservations'], {})
+        self.assertEqual(data['payments'], {})
         self.assertEqual(data['auto_id']['client'], 0)
         self.assertEqual(data['auto_id']['room'], 3)
         self.assertEqual(data['auto_id']['payment'], 0)
+        self.assertEqual(data['version'], 3)
+        self.assertEqual(data['indexes']['client_email'], {})
 
 
 class CLITestCase(unittest.TestCase):
+    """Runs each command in-process, on a service built for it as in a new process."""
+
     def setUp(self):
-        if os.path.exists(db.DB_PATH):
-            os.remove(db.DB_PATH)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'database.json')
+
+    def tearDown(self):
+        db.configure()
+        self.tmp.cleanup()
 
-    def run_cli(self, args):
+    def run_cli(self, args, engine=None):
+        db.configure(engine, self.path)
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            cli.run(args)
+        return out.getvalue().strip()
+
+    def test_main_script(self):
         result = subprocess.run(
-            [sys.executable, 'main.py'] + args,
+            [sys.executable, 'main.py', 'init-db'],
             capture_output=True,
             text=True,
             check=True,
+            env={**os.environ, DB_ENV: self.path, NO_DAEMON_ENV: '1'},
         )
-        return result.stdout.strip()
+        self.assertIn('Database initialized', result.stdout)
+        self.assertTrue(os.path.exists(self.path))
 
     def test_cli_init(self):
         output = self.run_cli(['init-db'])
         self.assertIn('Database initialized', output)
-        self.assertTrue(os.path.exists(db.DB_PATH))
-        with open(db.DB_PATH, 'r', encoding='utf-8') as f:
+        self.assertTrue(os.path.exists(self.path))
+        with open(self.path, 'r', encoding='utf-8') as f:
             data = json.load(f)
         self.assertEqual(len(data['rooms']), 3)
 
@@ -52,7 +79,7 @@ class CLITestCase(unittest.TestCase):
         self.run_cli(['init-db'])
         output = self.run_cli(['add-client', '--name', 'Alice', '--email', 'a@example.com', '--phone', '123'])
         self.assertIn('Client added with id 1', output)
-        with open(db.DB_PATH, 'r', encoding='utf-8') as f:
+        with open(self.path, 'r', encoding='utf-8') as f:
             data = json.load(f)
         self.assertEqual(len(data['clients']), 1)
 
@@ -66,7 +93,7 @@ class CLITestCase(unittest.TestCase):
         self.run_cli(['init-db'])
         output = self.run_cli(['add-room', '--type', 'standard', '--price', '50', '--description', 'Nice room'])
         self.assertIn('Room added with id 4', output)
-        with open(db.DB_PATH, 'r', encoding='utf-8') as f:
+        with open(self.path, 'r', encoding='utf-8') as f:
             data = json.load(f)
         self.assertEqual(len(data['rooms']), 4)
 
@@ -79,10 +106,10 @@ class CLITestCase(unittest.TestCase):
             '--check-in', '2025-01-01', '--nights', '2'
         ])
         self.assertIn('Reservation created with id 1', output)
-        with open(db.DB_PATH, 'r', encoding='utf-8') as f:
+        with open(self.path, 'r', encoding='utf-8') as f:
             data = json.load(f)
         self.assertEqual(len(data['reservations']), 1)
-        self.assertAlmostEqual(data['clients'][0]['wallet'], 58)
+        self.assertAlmostEqual(data['clients']['1']['wallet'], 58)
 
     def test_cli_confirm_and_cancel(self):
         self.run_cli(['init-db'])
@@ -94,38 +121,38 @@ class CLITestCase(unittest.TestCase):
         ])
         output = self.run_cli(['confirm', '--reservation', '1'])
         self.assertIn('confirmed', output)
-        with open(db.DB_PATH, 'r', encoding='utf-8') as f:
+        with open(self.path, 'r', encoding='utf-8') as f:
             data = json.load(f)
-        self.assertTrue(data['reservations'][0]['confirmed'])
-        self.assertEqual(data['clients'][0]['wallet'], 100)
+        self.assertTrue(data['reservations']['1']['confirmed'])
+        self.assertEqual(data['clients']['1']['wallet'], 100)
         self.assertEqual(len(data['payments']), 3)
-        self.assertEqual(data['payments'][1]['type'], 'reservation_deposit')
-        self.assertEqual(data['payments'][2]['type'], 'reservation_balance')
+        self.assertEqual(data['payments']['2']['type'], 'reservation_deposit')
+        self.assertEqual(data['payments']['3']['type'], 'reservation_balance')
         output = self.run_cli(['cancel', '--reservation', '1'])
         self.assertIn('cancelled', output)
-        with open(db.DB_PATH, 'r', encoding='utf-8') as f:
+        with open(self.path, 'r', encoding='utf-8') as f:
             data = json.load(f)
         self.assertEqual(len(data['reservations']), 0)
-        self.assertEqual(data['clients'][0]['wallet'], 100)
+        self.assertEqual(data['clients']['1']['wallet'], 100)
 
     def test_cli_deposit_conversion(self):
         self.run_cli(['init-db'])
         self.run_cli(['add-client', '--name', 'Bob', '--email', 'b@example.com', '--phone', '555'])
         self.run_cli(['deposit', '--client', '1', '--amount', '100', '--currency', 'USD'])
-        with open(db.DB_PATH, 'r', encoding='utf-8') as f:
+        with open(self.path, 'r', encoding='utf-8') as f:
             data = json.load(f)
-        self.assertAlmostEqual(data['clients'][0]['wallet'], 90)
+        self.assertAlmostEqual(data['clients']['1']['wallet'], 90)
         self.assertEqual(len(data['payments']), 1)
-        self.assertEqual(data['payments'][0]['type'], 'deposit')
+        self.assertEqual(data['payments']['1']['type'], 'deposit')
 
     def test_cli_deposit_invalid_currency(self):
         self.run_cli(['init-db'])
         self.run_cli(['add-client', '--name', 'Bob', '--email', 'b@example.com', '--phone', '555'])
         output = self.run_cli(['deposit', '--client', '1', '--amount', '50', '--currency', 'XXX'])
         self.assertIn('unsupported currency', output)
-        with open(db.DB_PATH, 'r', encoding='utf-8') as f:
+        with open(self.path, 'r', encoding='utf-8') as f:
             data = json.load(f)
-        self.assertEqual(data['clients'][0]['wallet'], 0)
+        self.assertEqual(data['clients']['1']['wallet'], 0)
         self.assertEqual(len(data['payments']), 0)
 
     def test_cli_list_rooms(self):
@@ -146,3 +173,70 @@ class CLITestCase(unittest.TestCase):
             '--check-in', '2025-06-02', '--nights', '2'
         ])
         self.assertIn('room not available', output)
+
+    def test_cli_calendar(self):
+        self.run_cli(['init-db'])
+        self.run_cli(['add-client', '--name', 'Alice', '--email', 'a@example.com', '--phone', '123'])
+        self.run_cli(['deposit', '--client', '1', '--amount', '1000', '--currency', 'EUR'])
+        self.run_cli(['reserve', '--client', '1', '--room', '3', '--check-in', '2025-07-03', '--nights', '4'])
+        output = self.run_cli(['calendar', '--room', '3', '--month', '2025-07', '--nights', '3'])
+        self.assertIn('    1  2 -- -- -- --', output)
+        self.assertIn('Free nights: 27/31', output)
+        self.assertIn('2025-07-07 in room 3', output)
+        output = self.run_cli(['calendar', '--type', 'suite', '--month', '07-2025'])
+        self.assertIn('expected YYYY-MM', output)
+
+    def test_cli_archive(self):
+        self.run_cli(['add-client', '--name', 'Bob', '--email', 'b@example.com', '--phone', '555'])
+        self.run_cli(['deposit', '--client', '1', '--amount', '300', '--currency', 'EUR'])
+        self.run_cli(['reserve', '--client', '1', '--room', '1', '--check-in', '2025-01-01', '--nights', '2'])
+        output = self.run_cli(['archive', '--before', '2100-01-01'])
+        self.assertIn('Archived 1 reservations and 2 payments', output)
+        self.assertTrue(os.path.isdir(self.path + '.archive'))
+        output = self.run_cli(['ledger', '--client', '1', '--archived'])
+        self.assertIn('deposit 300.00 EUR', output)
+        self.assertIn('balance_forward 250.00 EUR', output)
+        self.assertIn('Wallet matches ledger', output)
+        output = self.run_cli(['archive', '--before', '01/01/2100'])
+        self.assertIn('Invalid isoformat', output)
+
+    def test_cli_list_reservations_and_payments(self):
+        self.run_cli(['add-client', '--name', 'Bob', '--email', 'b@example.com', '--phone', '555'])
+        self.run_cli(['deposit', '--client', '1', '--amount', '500', '--currency', 'EUR'])
+        for room in ('1', '2', '3'):
+            self.run_cli(['reserve', '--client', '1', '--room', room, '--check-in', '2025-01-01', '--nights', '1'])
+        self.run_cli(['confirm', '--reservation', '2'])
+        output = self.run_cli(['list-reservations', '--limit', '2'])
+        self.assertEqual(output.splitlines(), [
+            '1: room 1 client 1 2025-01-01 1 nights 50.00€ unconfirmed',
+            '2: room 2 client 1 2025-01-01 1 nights 100.00€ confirmed',
+            '-- next page: --after-id 2',
+        ])
+        output = self.run_cli(['list-reservations', '--unconfirmed', '--after-id', '1', '--format', 'jsonl'])
+        self.assertEqual([json.loads(line)['id'] for line in output.splitlines()], [3])
+        output = self.run_cli(['list-payments', '--client', '1', '--kind', 'deposit', '--format', 'jsonl'])
+        rows = [json.loads(line) for line in output.splitlines()]
+        self.assertEqual([(p['id'], p['amount'], p['client_id']) for p in rows], [(1, 500, 1)])
+        output = self.run_cli(['list-payments', '--from', 'soon'])
+        self.assertIn('Invalid isoformat', output)
+
+    def test_cli_log_engine_compact(self):
+        self.run_cli(['init-db'], engine='log')
+        self.run_cli(['add-client', '--name', 'Bob', '--email', 'b@example.com', '--phone', '555'], engine='log')
+        with open(self.path, 'r', encoding='utf-8') as f:
+            self.assertEqual(json.load(f)['clients'], {})
+        output = self.run_cli(['compact'], engine='log')
+        self.assertIn('Database compacted', output)
+        with open(self.path, 'r', encoding='utf-8') as f:
+            self.assertEqual(len(json.load(f)['clients']), 1)
+
+    def test_cli_db_and_storage_flags(self):
+        other = os.path.join(self.tmp.name, 'other.json')
+        self.run_cli(['--db', other, 'add-client', '--name', 'Bob', '--email', 'b@example.com', '--phone', '555'])
+        self.assertFalse(os.path.exists(self.path))
+        with open(other, 'r', encoding='utf-8') as f:
+            self.assertEqual(len(json.load(f)['clients']), 1)
+        output = self.run_cli(['--storage', 'memory', 'add-client', '--name', 'Al', '--email', 'a@example.com',
+                               '--phone', '1'])
+        self.assertIn('Client added with id 1', output)
+        self.assertFalse(os.path.exists(self.path))
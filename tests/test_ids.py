@@ -0,0 +1,58 @@
+import os
+import json
+import tempfile
+import unittest
+
+from infrastructure.ids import IdAllocator, ids_path, read_counters
+from infrastructure.repositories import init_schema
+from tests.test_repositories import make_service
+
+
+class IdAllocatorTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'database.json.ids')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_blocks_grow_up_to_block_size(self):
+        ids = IdAllocator(self.path, block_size=4)
+        self.assertEqual([ids.next_id('client', lambda: 10) for _ in range(9)], list(range(11, 20)))
+        # Blocks of 1, 2, 4 and 4 ids.
+        self.assertEqual(read_counters(self.path), {'client': 21})
+
+    def test_allocators_never_share_ids(self):
+        first, second = IdAllocator(self.path), IdAllocator(self.path)
+        taken = [ids.next_id('payment', lambda: 0) for _ in range(20) for ids in (first, second)]
+        self.assertEqual(len(set(taken)), len(taken))
+
+    def test_torn_file_is_seeded_again(self):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write('{"client": 4')
+        self.assertEqual(IdAllocator(self.path).next_id('client', lambda: 7), 8)
+
+
+class StoreIdsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'database.json')
+        init_schema(self.path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_ids_continue_across_processes(self):
+        make_service(self.path).add_client('Bob', 'b@example.com', '555')
+        service = make_service(self.path)
+        self.assertEqual(service.add_client('Al', 'a@example.com', '1').id, 2)
+        self.assertEqual(service.add_room('suite', 300, 'Sea view').id, 4)
+
+    def test_counters_are_seeded_from_an_older_database(self):
+        service = make_service(self.path)
+        service.add_client('Bob', 'b@example.com', '555')
+        os.remove(ids_path(self.path))
+        with open(self.path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        self.assertEqual(data['auto_id']['client'], 0)
+        self.assertEqual(make_service(self.path).add_client('Al', 'a@example.com', '1').id, 2)
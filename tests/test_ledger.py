@@ -0,0 +1,102 @@
+import os
+import json
+import tempfile
+import unittest
+from unittest import mock
+
+from domain.entities import Payment
+from domain.value_objects import Money, Currency
+from domain.repositories import PaymentRepository
+from infrastructure import ledger
+from infrastructure.repositories import init_schema
+from infrastructure.sqlite_repositories import init_schema as init_sqlite_schema
+from tests.test_repositories import make_service
+from tests.test_sqlite_repositories import make_service as make_sqlite_service
+
+DAYS = ['2025-01-%02d' % d for d in range(1, 11)]
+
+
+def record_payments(service):
+    client = service.add_client('Bob', 'b@example.com', '555')
+    for i, day in enumerate(DAYS):
+        kind = 'deposit' if i % 2 == 0 else 'reservation_deposit'
+        amount = Money(100, Currency.USD) if kind == 'deposit' else Money(10)
+        service.payments.add(Payment(client.id, amount, kind, created_at=day + 'T12:00:00'))
+    return client
+
+
+class LedgerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'database.json')
+        init_schema(self.path)
+        patcher = mock.patch.object(ledger, 'CHECKPOINT_EVERY', 3)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_balance_as_of(self):
+        service = make_service(self.path)
+        client = record_payments(service)
+        with open(self.path, 'r', encoding='utf-8') as f:
+            self.assertEqual(len(json.load(f)['checkpoints']), 3)
+        # 90 EUR per deposit, 10 EUR per debit.
+        self.assertEqual(service.wallet_balance(client.id, '2025-01-01'), Money(90))
+        self.assertEqual(service.wallet_balance(client.id, '2025-01-04'), Money(160))
+        self.assertEqual(service.wallet_balance(client.id, '2025-01-07'), Money(330))
+        self.assertEqual(service.wallet_balance(client.id), Money(400))
+        self.assertEqual(service.wallet_balance(client.id, '2024-12-31'), Money(0))
+        expected = PaymentRepository.balance(service.payments, client.id, '2025-01-08')
+        self.assertEqual(service.wallet_balance(client.id, '2025-01-08'), expected)
+
+    def test_history_since(self):
+        service = make_service(self.path)
+        client = record_payments(service)
+        days = [p.created_at[:10] for p in service.payment_history(client.id, '2025-01-08')]
+        self.assertEqual(days, DAYS[7:])
+
+    def test_unfinished_history_does_not_hold_the_transaction(self):
+        service = make_service(self.path)
+        client = record_payments(service)
+        history = service.payment_history(client.id)
+        next(history)
+        service.deposit(client.id, 10)
+        history.close()
+        self.assertEqual(len(make_service(self.path).payments.list_for_client(client.id)), len(DAYS) + 1)
+
+    def test_verify_wallet(self):
+        service = make_service(self.path)
+        client = service.add_client('Bob', 'b@example.com', '555')
+        service.deposit(client.id, 100)
+        service.add_reservation(client.id, 1, '2025-06-01', 1)
+        self.assertTrue(service.verify_wallet(client.id))
+        client = service.clients.get(client.id)
+        client.wallet += 1
+        service.clients.save(client)
+        self.assertFalse(service.verify_wallet(client.id))
+
+    def test_sqlite_backend(self):
+        path = os.path.join(self.tmp.name, 'database.sqlite3')
+        init_sqlite_schema(path)
+        service = make_sqlite_service(path)
+        client = record_payments(service)
+        self.assertEqual(service.wallet_balance(client.id, '2025-01-04'), Money(160))
+        self.assertEqual(len(list(service.payment_history(client.id, '2025-01-08'))), 3)
+        service.uow.close()
+
+    def test_payments_are_converted_one_by_one(self):
+        sqlite_path = os.path.join(self.tmp.name, 'database.sqlite3')
+        init_sqlite_schema(sqlite_path)
+        for service in (make_service(self.path), make_sqlite_service(sqlite_path)):
+            client = service.add_client('Bob', 'b@example.com', '555')
+            service.deposit(client.id, 0.05, 'USD')
+            service.deposit(client.id, 0.05, 'USD')
+            # 0.045 EUR rounds to 0.04 twice, not 0.09 once.
+            self.assertEqual(service.wallet_balance(client.id), Money(0.08))
+            self.assertTrue(service.verify_wallet(client.id))
+        service.uow.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import os
+import json
+import tempfile
+import unittest
+
+from infrastructure.repositories import init_schema
+from infrastructure.log_store import LogUnitOfWork
+from tests.test_repositories import make_service
+
+
+class LogStoreTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'database.json')
+        init_schema(self.path)
+        with open(self.path, 'rb') as f:
+            self.snapshot = f.read()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def book(self, uow):
+        service = make_service(self.path, uow)
+        client = service.add_client('Bob', 'b@example.com', '555')
+        service.deposit(client.id, 200)
+        service.add_reservation(client.id, 1, '2025-01-01', 2)
+        return service
+
+    def test_writes_append_to_log_only(self):
+        self.book(LogUnitOfWork(self.path))
+        with open(self.path, 'rb') as f:
+            self.assertEqual(f.read(), self.snapshot)
+        with open(self.path + '.log', 'r', encoding='utf-8') as f:
+            self.assertEqual(len(f.readlines()), 3)
+
+    def test_replay_and_compact(self):
+        self.book(LogUnitOfWork(self.path))
+        uow = LogUnitOfWork(self.path)
+        service = make_service(self.path, uow)
+        self.assertEqual(service.clients.get(1).wallet, 150)
+        self.assertEqual(len(service.reservations.list()), 1)
+        uow.compact()
+        self.assertEqual(os.path.getsize(self.path + '.log'), 0)
+        with open(self.path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        self.assertEqual(data['clients']['1']['wallet'], 150)
+        self.assertEqual(len(data['payments']), 2)
+
+    def test_torn_tail_is_ignored(self):
+        self.book(LogUnitOfWork(self.path))
+        with open(self.path + '.log', 'a', encoding='utf-8') as f:
+            f.write('{"ops": [["del", "clients"')
+        service = make_service(self.path, LogUnitOfWork(self.path))
+        self.assertIsNotNone(service.clients.get(1))
+        service.deposit(1, 10)
+        service = make_service(self.path, LogUnitOfWork(self.path))
+        self.assertEqual(service.clients.get(1).wallet, 160)
+
+    def test_automatic_compaction(self):
+        self.book(LogUnitOfWork(self.path, compact_every=2))
+        with open(self.path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        self.assertEqual(len(data['clients']), 1)
+        with open(self.path + '.log', 'r', encoding='utf-8') as f:
+            self.assertEqual(len(f.readlines()), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
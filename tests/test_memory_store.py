@@ -0,0 +1,75 @@
+import os
+import tempfile
+import unittest
+
+from domain.services import ReservationService
+from infrastructure import db
+from infrastructure.repositories import (
+    JsonClientRepository,
+    JsonRoomRepository,
+    JsonReservationRepository,
+)
+from tests.test_repositories import FailingPaymentRepository
+
+
+class MemoryStoreTestCase(unittest.TestCase):
+    def setUp(self):
+        self.service = db.create_service('memory')
+
+    def test_reservation_flow(self):
+        client = self.service.add_client('Bob', 'b@example.com', '555')
+        self.service.deposit(client.id, 200)
+        reservation = self.service.add_reservation(client.id, 1, '2025-01-01', 2)
+        self.service.confirm_reservation(reservation.id)
+        self.assertEqual(self.service.clients.get(client.id).wallet, 100)
+        self.assertTrue(self.service.verify_wallet(client.id))
+        self.assertFalse(self.service.is_room_free(1, '2025-01-02', 1))
+        self.assertEqual([r.id for r in self.service.reservations.project('nights')], [reservation.id])
+        self.service.cancel_reservation(reservation.id)
+        self.assertTrue(self.service.is_room_free(1, '2025-01-02', 1))
+        with self.assertRaisesRegex(ValueError, 'client already exists'):
+            self.service.add_client('Bob', 'b@example.com', '555')
+
+    def test_failed_reservation_is_rolled_back(self):
+        client = self.service.add_client('Bob', 'b@example.com', '555')
+        self.service.deposit(client.id, 200)
+        uow = self.service.uow
+        service = ReservationService(JsonClientRepository(uow), JsonRoomRepository(uow),
+                                     JsonReservationRepository(uow), FailingPaymentRepository(uow), uow)
+        with self.assertRaises(ValueError):
+            service.add_reservation(client.id, 1, '2025-01-01', 2)
+        self.assertEqual(self.service.clients.get(client.id).wallet, 200)
+        self.assertEqual(self.service.reservations.list(), [])
+        self.assertTrue(self.service.is_room_free(1, '2025-01-01', 2))
+        # The id taken by the rolled back reservation is not handed out again.
+        self.assertEqual(self.service.add_reservation(client.id, 1, '2025-01-01', 2).id, 2)
+
+    def test_services_do_not_share_data(self):
+        self.service.add_client('Bob', 'b@example.com', '555')
+        other = db.create_service('memory')
+        self.assertIsNone(other.clients.find_by_email('b@example.com'))
+        self.assertEqual(other.add_client('Al', 'a@example.com', '1').id, 1)
+        self.assertEqual(len(other.list_rooms()), 3)
+
+    def test_nothing_is_written(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cwd = os.getcwd()
+            os.chdir(directory)
+            try:
+                service = db.create_service('memory')
+                client = service.add_client('Bob', 'b@example.com', '555')
+                service.deposit(client.id, 100)
+                service.add_room('suite', 300, 'Sea view')
+            finally:
+                os.chdir(cwd)
+            self.assertEqual(os.listdir(directory), [])
+
+    def test_configured_module_service(self):
+        db.configure('memory')
+        try:
+            client_id = db.add_client('Bob', 'b@example.com', '555')
+            self.assertEqual(db.deposit(client_id, 50), 50)
+        finally:
+            db.configure()
+        with self.assertRaisesRegex(ValueError, 'worker threads'):
+            db.create_async_service('memory')
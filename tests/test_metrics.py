@@ -0,0 +1,64 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from infrastructure import db, metrics
+
+
+class MetricsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'database.json')
+        self.metrics_path = os.path.join(self.tmp.name, 'metrics.json')
+        metrics.reset()
+        self.addCleanup(metrics.reset)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def run_service(self):
+        service = db.create_service('json', self.path)
+        client = service.add_client('Bob', 'b@example.com', '555')
+        service.deposit(client.id, 100)
+        service.list_rooms()
+        return service
+
+    def test_disabled_by_default_records_nothing(self):
+        with mock.patch.object(metrics, 'ENABLED', False):
+            service = self.run_service()
+        self.assertNotIn('add_client', vars(service))
+        self.assertEqual(metrics.snapshot(), {'counters': {}, 'histograms': {}})
+
+    def test_counts_storage_and_latency(self):
+        with mock.patch.object(metrics, 'ENABLED', True):
+            self.run_service()
+        data = metrics.snapshot()
+        self.assertEqual(data['counters']['saves'][''], 2)
+        # deposit and list_rooms reuse the document parsed by add_client.
+        self.assertEqual(data['counters']['loads'][''], 1)
+        self.assertEqual(data['counters']['cache_hits'][''], 2)
+        self.assertGreater(data['counters']['bytes_written'][''], os.path.getsize(self.path))
+        self.assertEqual(data['counters']['rows_scanned']['rooms'], 3)
+        latency = data['histograms']['service_latency_seconds']
+        self.assertEqual(sorted(latency), ['add_client', 'deposit', 'list_rooms'])
+        self.assertEqual(latency['deposit']['count'], 1)
+
+    def test_flush_merges_across_processes(self):
+        with mock.patch.object(metrics, 'ENABLED', True):
+            self.run_service()
+            metrics.flush(self.metrics_path)
+            self.assertEqual(metrics.snapshot(), {'counters': {}, 'histograms': {}})
+            db.create_service('json', self.path).list_rooms()
+            metrics.flush(self.metrics_path)
+        data = metrics.load(self.metrics_path)
+        self.assertEqual(data['histograms']['service_latency_seconds']['list_rooms']['count'], 2)
+        text = metrics.render_prometheus(data)
+        self.assertIn('hotel_saves_total 2', text)
+        self.assertIn('hotel_service_latency_seconds_count{method="list_rooms"} 2', text)
+        self.assertIn('hotel_service_latency_seconds_bucket{method="list_rooms",le="+Inf"} 2', text)
+        self.assertIn('list_rooms', metrics.render_table(data))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from infrastructure import db
+
+
+class QueryTestCase(unittest.TestCase):
+    engine = 'json'
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.service = db.create_service(self.engine, os.path.join(self.tmp.name, 'database'))
+        self.bob = self.service.add_client('Bob', 'b@example.com', '555')
+        self.al = self.service.add_client('Al', 'a@example.com', '1')
+        self.service.deposit(self.bob.id, 1000)
+        self.service.deposit(self.al.id, 1000)
+        stays = [(self.bob, 1, '2025-01-01'), (self.al, 1, '2025-01-05'), (self.bob, 2, '2025-02-01'),
+                 (self.al, 3, '2025-03-01'), (self.bob, 1, '2025-03-10')]
+        self.reservations = [self.service.add_reservation(c.id, room, day, 2) for c, room, day in stays]
+        self.service.confirm_reservation(self.reservations[2].id)
+
+    def tearDown(self):
+        close = getattr(self.service.uow, 'close', None)
+        if close is not None:
+            close()
+        self.tmp.cleanup()
+
+    def reservation_ids(self, **filters):
+        return [r.id for r in self.service.query_reservations(**filters)]
+
+    def payment_ids(self, **filters):
+        return [p.id for p in self.service.query_payments(**filters)]
+
+    def test_reservation_filters(self):
+        ids = [r.id for r in self.reservations]
+        self.assertEqual(self.reservation_ids(), ids)
+        self.assertEqual(self.reservation_ids(client_id=self.bob.id), [ids[0], ids[2], ids[4]])
+        self.assertEqual(self.reservation_ids(room_id=1), [ids[0], ids[1], ids[4]])
+        self.assertEqual(self.reservation_ids(room_id=1, client_id=self.al.id), [ids[1]])
+        self.assertEqual(self.reservation_ids(start='2025-01-05', end='2025-03-01'), ids[1:4])
+        self.assertEqual(self.reservation_ids(confirmed=True), [ids[2]])
+        self.assertEqual(self.reservation_ids(confirmed=False, room_id=1, end='2025-01-31'), ids[:2])
+        self.assertEqual(self.reservation_ids(room_id=99), [])
+        self.assertEqual(next(self.service.query_reservations(confirmed=True)),
+                         self.service.reservations.get(ids[2]))
+
+    def test_keyset_pagination(self):
+        pages, after_id = [], 0
+        while True:
+            page = self.reservation_ids(room_id=1, after_id=after_id, limit=2)
+            if not page:
+                break
+            pages.append(page)
+            after_id = page[-1]
+        ids = [r.id for r in self.reservations]
+        self.assertEqual(pages, [[ids[0], ids[1]], [ids[4]]])
+        self.assertEqual(self.payment_ids(after_id=2, limit=2), [3, 4])
+        with self.assertRaisesRegex(ValueError, 'limit must be positive'):
+            self.service.query_payments(limit=0)
+
+    def test_payment_filters(self):
+        deposits = self.payment_ids(kind='deposit')
+        self.assertEqual(deposits, [1, 2])
+        bob = self.payment_ids(client_id=self.bob.id)
+        self.assertEqual(bob[0], 1)
+        self.assertEqual(len(bob), 5)
+        self.assertEqual(self.payment_ids(client_id=self.al.id, kind='deposit'), [2])
+        self.assertEqual(self.payment_ids(start='2000-01-01', end='2999-12-31'), self.payment_ids())
+        self.assertEqual(self.payment_ids(end='2000-01-01'), [])
+
+    def test_writes_between_results_are_kept(self):
+        for r in self.service.query_reservations(confirmed=False):
+            self.service.confirm_reservation(r.id)
+            break
+        ids = [r.id for r in self.reservations]
+        self.assertEqual(self.reservation_ids(confirmed=True), [ids[0], ids[2]])
+
+    def test_results_span_several_chunks(self):
+        ids = [r.id for r in self.reservations]
+        with mock.patch('infrastructure.repositories.CHUNK', 2), \
+                mock.patch('infrastructure.sqlite_repositories.CHUNK', 2):
+            self.assertEqual(self.reservation_ids(), ids)
+            self.assertEqual(self.reservation_ids(room_id=1, after_id=ids[0]), [ids[1], ids[4]])
+            self.assertEqual(self.reservation_ids(after_id=ids[0], limit=3), ids[1:4])
+            for r in self.service.query_reservations(confirmed=False):
+                self.service.confirm_reservation(r.id)
+        self.assertEqual(self.reservation_ids(confirmed=True), ids)
+
+    def test_archived_reservations_leave_the_queries(self):
+        if self.service.archive is None:
+            self.skipTest('no archive')
+        self.service.archive_before('2025-02-15')
+        self.assertEqual(self.reservation_ids(client_id=self.bob.id), [self.reservations[4].id])
+        self.assertEqual(self.reservation_ids(confirmed=True), [])
+
+
+class SqliteQueryTestCase(QueryTestCase):
+    engine = 'sqlite'
+
+
+class ShardedQueryTestCase(QueryTestCase):
+    engine = 'sharded'
+
+
+class MemoryQueryTestCase(QueryTestCase):
+    engine = 'memory'
@@ -0,0 +1,151 @@
+import json
+import os
+import tempfile
+import unittest
+from datetime import date
+from unittest import mock
+
+from domain.entities import Payment
+from domain.rates import RateProvider, RateTable, StaticRateProvider
+from domain.value_objects import Money, Currency, convert_many, set_rate_provider
+from infrastructure import db, rates
+from infrastructure.rates import FileRateProvider, RateTableCache
+from infrastructure.repositories import init_schema
+from infrastructure.sqlite_repositories import init_schema as init_sqlite_schema
+from tests.test_repositories import make_service
+from tests.test_sqlite_repositories import make_service as make_sqlite_service
+
+BASE = {'USD': 0.9, 'GBP': 1.15, 'JPY': 0.007, 'CHF': 1.0}
+
+
+class TableRateProvider(RateProvider):
+    def __init__(self, table):
+        self._table = table
+
+    def table(self):
+        return self._table
+
+
+class RateTableTestCase(unittest.TestCase):
+    def test_rates_apply_from_their_day(self):
+        table = RateTable({'2025-03-01': {'USD': 0.8}, '2025-01-01': BASE})
+        usd = list(Currency).index(Currency.USD)
+        self.assertAlmostEqual(table.minor_cross_rates('2024-06-01')[usd][0], 0.9)
+        self.assertAlmostEqual(table.minor_cross_rates('2025-02-28T23:59:00')[usd][0], 0.9)
+        self.assertAlmostEqual(table.minor_cross_rates('2025-03-01')[usd][0], 0.8)
+        self.assertAlmostEqual(table.minor_cross_rates()[usd][0], 0.8)
+        # GBP carries over from January.
+        gbp = list(Currency).index(Currency.GBP)
+        self.assertAlmostEqual(table.minor_cross_rates('2025-03-02')[gbp][0], 1.15)
+
+    def test_invalid_tables(self):
+        with self.assertRaisesRegex(ValueError, 'no GBP rate on 2025-01-01'):
+            RateTable({'2025-01-01': {'USD': 0.9, 'JPY': 0.007, 'CHF': 1.0}})
+        with self.assertRaises(ValueError):
+            RateTable({'01/01/2025': BASE})
+        with self.assertRaises(ValueError):
+            RateTable({'2025-01-01': {**BASE, 'USD': 0}})
+        with self.assertRaisesRegex(ValueError, 'invalid USD rate on 2025-01-01'):
+            RateTable({'2025-01-01': {**BASE, 'USD': 'x'}})
+        self.assertEqual(RateTable({'2025-01-01': {**BASE, 'USD': '0.9'}}).minor_cross_rates(),
+                         RateTable({'2025-01-01': BASE}).minor_cross_rates())
+
+
+class ConversionTestCase(unittest.TestCase):
+    def setUp(self):
+        set_rate_provider(StaticRateProvider())
+        self.addCleanup(set_rate_provider, None)
+
+    def test_static_provider_matches_builtin_rates(self):
+        self.assertEqual(Money(120, Currency.USD).convert_to(Currency.EUR, '2020-01-01'), Money(108))
+        self.assertEqual(Money(10000, Currency.JPY).convert_to(Currency.GBP), Money(60.87, Currency.GBP))
+
+    def test_convert_at_date(self):
+        set_rate_provider(TableRateProvider(RateTable({'2025-01-01': BASE, '2025-03-01': {'USD': 0.8}})))
+        self.assertEqual(Money(100, Currency.USD).convert_to(Currency.EUR, '2025-02-01'), Money(90))
+        self.assertEqual(Money(100, Currency.USD).convert_to(Currency.EUR, '2025-03-05'), Money(80))
+        self.assertEqual(list(convert_many([100, 100, 100], ['USD', 'USD', 'EUR'], Currency.EUR,
+                                           ['2025-02-01', '2025-03-05', '2025-03-05'])), [90, 80, 100])
+        self.assertEqual(list(convert_many([100], ['USD'], Currency.EUR, '2025-02-01')), [90])
+
+
+class FileRateProviderTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.addCleanup(set_rate_provider, None)
+        self.csv = os.path.join(self.tmp.name, 'rates.csv')
+        with open(self.csv, 'w', encoding='utf-8') as f:
+            f.write('date,currency,rate\n')
+            f.writelines(f'2025-01-01,{code},{rate}\n' for code, rate in BASE.items())
+            f.write('2025-03-01,usd,0.8\n2025-03-01,AUD,0.6\n')
+
+    def test_file_formats(self):
+        json_path = os.path.join(self.tmp.name, 'rates.json')
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump({'2025-01-01': BASE, '2025-03-01': {'USD': 0.8}}, f)
+        for path in (self.csv, json_path):
+            table = FileRateProvider(path, RateTableCache()).table()
+            self.assertEqual(table.days, ['2025-01-01', '2025-03-01'])
+        with self.assertRaisesRegex(ValueError, 'cannot read exchange rates'):
+            FileRateProvider(os.path.join(self.tmp.name, 'missing.csv')).table()
+
+    def test_tables_are_parsed_once(self):
+        cache = RateTableCache()
+        with mock.patch.object(rates, 'load_rate_table', wraps=rates.load_rate_table) as load:
+            set_rate_provider(FileRateProvider(self.csv, cache))
+            for _ in range(100):
+                Money(100, Currency.USD).convert_to(Currency.EUR, '2025-02-01')
+            set_rate_provider(FileRateProvider(self.csv, cache))
+            self.assertEqual(Money(100, Currency.USD).convert_to(Currency.EUR), Money(80))
+        load.assert_called_once()
+
+    def test_changed_file_is_reloaded_after_ttl(self):
+        cache = RateTableCache(ttl=0)
+        provider = FileRateProvider(self.csv, cache)
+        self.assertEqual(provider.table().days, ['2025-01-01', '2025-03-01'])
+        with open(self.csv, 'a', encoding='utf-8') as f:
+            f.write('2025-04-01,USD,0.85\n')
+        self.assertEqual(provider.table().days, ['2025-01-01', '2025-03-01', '2025-04-01'])
+        cache.invalidate()
+        self.assertEqual(len(cache._tables), 0)
+
+    def test_ledger_uses_the_rates_of_each_payment(self):
+        path = os.path.join(self.tmp.name, 'database.json')
+        init_schema(path)
+        set_rate_provider(FileRateProvider(self.csv, RateTableCache()))
+        service = make_service(path)
+        client = service.add_client('Bob', 'b@example.com', '555')
+        with mock.patch('domain.services.Payment',
+                        side_effect=lambda **kw: Payment(created_at='2025-02-10T09:00:00', **kw)):
+            self.assertEqual(service.deposit(client.id, 100, 'USD'), 90)
+        self.assertEqual(service.deposit(client.id, 100, 'USD'), 170)
+        self.assertEqual(service.wallet_balance(client.id, '2025-02-28'), Money(90))
+        self.assertTrue(service.verify_wallet(client.id))
+
+    def test_created_services_use_the_rates_file(self):
+        path = os.path.join(self.tmp.name, 'database.json')
+        with mock.patch.dict(os.environ, {'HOTEL_RATES': self.csv}):
+            service = db.create_service('json', path)
+        client = service.add_client('Bob', 'b@example.com', '555')
+        self.assertEqual(service.deposit(client.id, 100, 'USD'), 80)
+
+    def test_rates_published_later_do_not_change_recorded_payments(self):
+        json_path = os.path.join(self.tmp.name, 'database.json')
+        sqlite_path = os.path.join(self.tmp.name, 'database.sqlite3')
+        init_schema(json_path)
+        init_sqlite_schema(sqlite_path)
+        cache = RateTableCache(ttl=0)
+        set_rate_provider(FileRateProvider(self.csv, cache))
+        services = [make_service(json_path), make_sqlite_service(sqlite_path)]
+        for service in services:
+            client = service.add_client('Bob', 'b@example.com', '555')
+            # Credited at the latest rate published so far (0.8).
+            self.assertEqual(service.deposit(client.id, 100, 'USD'), 80)
+        with open(self.csv, 'a', encoding='utf-8') as f:
+            f.write(f'{date.today().isoformat()},USD,0.95\n')
+        self.assertEqual(Money(100, Currency.USD).convert_to(Currency.EUR), Money(95))
+        for service in services:
+            self.assertEqual(service.wallet_balance(client.id), Money(80))
+            self.assertTrue(service.verify_wallet(client.id))
+        services[1].uow.close()
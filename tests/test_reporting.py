@@ -0,0 +1,85 @@
+import io
+import os
+import json
+import tempfile
+import unittest
+from unittest import mock
+
+from domain import reporting
+from infrastructure.repositories import init_schema
+from infrastructure.reports import render
+from tests.test_repositories import make_service
+
+
+class ReportingTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'database.json')
+        init_schema(self.path)
+        self.service = make_service(self.path)
+        client = self.service.add_client('Bob', 'b@example.com', '555')
+        self.service.deposit(client.id, 2000)
+        first = self.service.add_reservation(client.id, 1, '2025-01-30', 4)
+        self.service.add_reservation(client.id, 3, '2025-02-02', 2)
+        self.service.add_reservation(client.id, 2, '2025-03-01', 1)
+        self.service.confirm_reservation(first.id)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def check_occupancy(self):
+        by_room = self.service.occupancy_report('2025-02-01', '2025-02-10')
+        self.assertEqual([r['booked'] for r in by_room['rows']], [2, 0, 2])
+        self.assertEqual(by_room['summary']['rate'], round(4 / 30, 4))
+        self.assertEqual(by_room['summary']['stays'], 1)
+        self.assertEqual(by_room['summary']['average_stay'], 2.0)
+        by_type = self.service.occupancy_report('2025-02-01', '2025-02-10', 'type')
+        self.assertEqual([(r['room_type'], r['booked'], r['available']) for r in by_type['rows']],
+                         [('standard', 2, 10), ('suite', 2, 10), ('superior', 0, 10)])
+        by_day = self.service.occupancy_report('2025-02-01', '2025-02-04', 'day')
+        self.assertEqual([r['booked'] for r in by_day['rows']], [1, 2, 1, 0])
+
+    def check_revenue(self):
+        report = self.service.revenue_report('2025-01-01', '2099-12-31')
+        self.assertEqual(len(report['rows']), 1)
+        row = report['rows'][0]
+        self.assertEqual((row['currency'], row['deposits'], row['balances']), ('EUR', 350.0, 100.0))
+        self.assertEqual(report['summary']['total_eur'], 450.0)
+        self.assertEqual(report['summary']['balance_collected_rate'], round(1 / 3, 4))
+        self.assertEqual(self.service.revenue_report('2000-01-01', '2000-12-31')['rows'], [])
+
+    def test_reports(self):
+        self.check_occupancy()
+        self.check_revenue()
+
+    def test_reports_without_numpy(self):
+        with mock.patch.object(reporting, 'np', None):
+            self.check_occupancy()
+            self.check_revenue()
+
+    def test_basic_format_check_in(self):
+        self.service.add_reservation(1, 1, '20250601', 3)
+        for np in (reporting.np, None):
+            with mock.patch.object(reporting, 'np', np):
+                report = self.service.occupancy_report('2025-06-01', '2025-06-30')
+                self.assertEqual([r['booked'] for r in report['rows']], [3, 0, 0])
+
+    def test_invalid_period(self):
+        with self.assertRaises(ValueError):
+            self.service.occupancy_report('2025-02-10', '2025-02-01')
+
+    def test_render(self):
+        report = self.service.occupancy_report('2025-02-01', '2025-02-10', 'type')
+        out = io.StringIO()
+        render(report, 'csv', out)
+        self.assertEqual(out.getvalue().splitlines()[0], 'room_type,rooms,booked,available,rate')
+        out = io.StringIO()
+        render(report, 'json', out)
+        self.assertEqual(json.loads(out.getvalue()), report)
+        out = io.StringIO()
+        render(report, 'table', out)
+        self.assertIn('rate: 13.3%', out.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
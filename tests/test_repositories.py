@@ -0,0 +1,274 @@
+import os
+import json
+import tempfile
+import unittest
+from unittest import mock
+
+from domain.services import ReservationService
+from domain.entities import Payment
+from infrastructure.ids import ids_path, read_counters
+from infrastructure import repositories
+from infrastructure.repositories import (
+    DocumentCache,
+    init_schema,
+    JsonClientRepository,
+    JsonRoomRepository,
+    JsonReservationRepository,
+    JsonPaymentRepository,
+    JsonUnitOfWork,
+)
+
+
+class CountingUnitOfWork(JsonUnitOfWork):
+    """Counts file parses and writes; like another process, it does not share parsed documents."""
+
+    def __init__(self, path):
+        super().__init__(path, cache=None)
+        self.reads = 0
+        self.writes = 0
+
+    def _read(self):
+        self.reads += 1
+        return super()._read()
+
+    def _write(self, data):
+        self.writes += 1
+        super()._write(data)
+
+
+class FailingPaymentRepository(JsonPaymentRepository):
+    def add(self, payment: Payment) -> None:
+        super().add(payment)
+        raise ValueError('payment gateway unavailable')
+
+
+def make_service(path, uow=None, payment_repo=JsonPaymentRepository):
+    uow = uow or JsonUnitOfWork(path)
+    return ReservationService(JsonClientRepository(uow), JsonRoomRepository(uow),
+                              JsonReservationRepository(uow), payment_repo(uow), uow)
+
+
+class UnitOfWorkTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'database.json')
+        init_schema(self.path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def read_db(self):
+        with open(self.path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def test_reservation_loads_and_saves_once(self):
+        service = make_service(self.path)
+        client = service.add_client('Bob', 'b@example.com', '555')
+        service.deposit(client.id, 200)
+        uow = CountingUnitOfWork(self.path)
+        service = make_service(self.path, uow)
+        service.add_reservation(client.id, 1, '2025-01-01', 2)
+        self.assertEqual(uow.reads, 1)
+        self.assertEqual(uow.writes, 1)
+
+    def test_read_only_call_does_not_write(self):
+        uow = CountingUnitOfWork(self.path)
+        make_service(self.path, uow).list_rooms()
+        self.assertEqual(uow.reads, 1)
+        self.assertEqual(uow.writes, 0)
+
+    def test_failed_reservation_is_rolled_back(self):
+        service = make_service(self.path)
+        client = service.add_client('Bob', 'b@example.com', '555')
+        service.deposit(client.id, 200)
+        before = self.read_db()
+        service = make_service(self.path, payment_repo=FailingPaymentRepository)
+        with self.assertRaises(ValueError):
+            service.add_reservation(client.id, 1, '2025-01-01', 2)
+        self.assertEqual(self.read_db(), before)
+
+    def test_group_reservation_is_atomic(self):
+        service = make_service(self.path)
+        client = service.add_client('Bob', 'b@example.com', '555')
+        service.deposit(client.id, 200)
+        uow = CountingUnitOfWork(self.path)
+        service = make_service(self.path, uow)
+        reservations = service.reserve_group(client.id, [1, 2], '2025-01-01', 2)
+        self.assertEqual([r.room_id for r in reservations], [1, 2])
+        self.assertEqual(uow.writes, 1)
+        self.assertEqual(service.clients.get(client.id).wallet, 50)
+        self.assertEqual([p.reservation_id for p in service.payments.list_for_client(client.id)],
+                         [None] + [r.id for r in reservations])
+        before = self.read_db()
+        with self.assertRaisesRegex(ValueError, 'not available for the selected dates: 2$'):
+            service.reserve_group(client.id, [3, 2], '2025-01-02', 1)
+        with self.assertRaisesRegex(ValueError, 'insufficient funds'):
+            service.reserve_group(client.id, [1, 3], '2025-02-01', 1)
+        with self.assertRaises(ValueError):
+            service.reserve_group(client.id, [3, 3], '2025-02-01', 1)
+        self.assertEqual(self.read_db(), before)
+
+    def test_nested_rollback_keeps_outer_changes(self):
+        uow = JsonUnitOfWork(self.path)
+        service = make_service(self.path, uow)
+        with uow:
+            service.add_client('Alice', 'a@example.com', '123')
+            with self.assertRaises(ValueError):
+                service.add_client('Alice', 'a@example.com', '123')
+            service.add_client('Bob', 'b@example.com', '555')
+        data = self.read_db()
+        self.assertEqual([c['id'] for c in data['clients'].values()], [1, 2])
+        # Two blocks were reserved: one id, then two.
+        self.assertEqual(read_counters(ids_path(self.path))['client'], 3)
+
+
+class DocumentCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'database.json')
+        init_schema(self.path)
+        self.cache = DocumentCache()
+        self.loads = mock.patch.object(repositories, '_load_document', wraps=repositories._load_document)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def service(self, payment_repo=JsonPaymentRepository):
+        return make_service(self.path, JsonUnitOfWork(self.path, snapshot=False, cache=self.cache), payment_repo)
+
+    def test_units_of_work_share_the_parsed_document(self):
+        client = self.service().add_client('Bob', 'b@example.com', '555')
+        with self.loads as load:
+            service = self.service()
+            self.assertEqual(service.clients.find_by_email('b@example.com').id, client.id)
+            self.assertEqual(len(service.list_rooms()), 3)
+            service.deposit(client.id, 10)
+            self.assertEqual(self.service().clients.get(client.id).wallet, 10)
+        load.assert_not_called()
+
+    def test_write_by_another_process_invalidates(self):
+        service = self.service()
+        client = service.add_client('Bob', 'b@example.com', '555')
+        make_service(self.path, JsonUnitOfWork(self.path, cache=None)).deposit(client.id, 25)
+        with self.loads as load:
+            self.assertEqual(service.clients.get(client.id).wallet, 25)
+        load.assert_called_once()
+
+    def test_rolled_back_changes_are_not_cached(self):
+        client = self.service().add_client('Bob', 'b@example.com', '555')
+        with self.assertRaises(ValueError):
+            self.service(FailingPaymentRepository).deposit(client.id, 50)
+        service = self.service()
+        self.assertEqual(service.clients.get(client.id).wallet, 0)
+        self.assertEqual(service.payments.list(), [])
+
+    def test_bounded_and_invalidated(self):
+        size = os.path.getsize(self.path)
+        other = os.path.join(self.tmp.name, 'other.json')
+        self.cache.max_bytes = size + 1
+        self.cache.put(self.path, ('a', size, 1), {'n': 1}, {})
+        self.cache.put(other, ('b', size, 1), {'n': 2}, {})
+        self.assertIsNone(self.cache.take(self.path, ('a', size, 1)))
+        self.assertEqual(self.cache.take(other, ('b', size, 1)), ({'n': 2}, {}))
+        self.cache.put(other, ('b', size, 1), {'n': 2}, {})
+        self.assertIsNone(self.cache.take(other, ('b', size, 2)))
+        self.cache.put(other, ('b', size, 1), {'n': 2}, {})
+        self.cache.invalidate(other)
+        self.assertIsNone(self.cache.take(other, ('b', size, 1)))
+
+
+class FormatTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'database.json')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_indexes_follow_writes(self):
+        init_schema(self.path)
+        service = make_service(self.path)
+        client = service.add_client('Bob', 'b@example.com', '555')
+        service.deposit(client.id, 300)
+        first = service.add_reservation(client.id, 1, '2025-01-01', 2)
+        service.add_reservation(client.id, 1, '2025-02-01', 2)
+        service.cancel_reservation(first.id)
+        with open(self.path, 'r', encoding='utf-8') as f:
+            indexes = json.load(f)['indexes']
+        self.assertEqual(indexes['client_email'], {'b@example.com': 1})
+        self.assertEqual(indexes['room_reservations'], {'1': [2]})
+        self.assertEqual(indexes['client_payments'], {'1': [1, 2, 3]})
+
+    def test_list_based_file_is_upgraded_on_open(self):
+        legacy = {
+            'clients': [{'id': 1, 'full_name': 'Bob', 'email': 'b@example.com', 'phone': '555', 'wallet': 10.0}],
+            'rooms': [{'id': 1, 'room_type': 'standard', 'price': 50, 'description': 'Single bed'}],
+            'reservations': [],
+            'payments': [{'id': 1, 'client_id': 1, 'reservation_id': None, 'amount': 10.0,
+                          'currency': 'EUR', 'type': 'deposit'}],
+            'auto_id': {'client': 1, 'room': 1, 'reservation': 0, 'payment': 1},
+        }
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(legacy, f)
+        service = make_service(self.path)
+        self.assertEqual(service.clients.find_by_email('b@example.com').wallet, 10.0)
+        self.assertEqual(len(service.payments.list_for_client(1)), 1)
+        with open(self.path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        self.assertEqual(data['version'], 3)
+        self.assertEqual(data['clients']['1']['full_name'], 'Bob')
+        self.assertEqual(data['indexes']['client_payments'], {'1': [1]})
+
+
+
+class ProjectionTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'database.json')
+        init_schema(self.path)
+        service = make_service(self.path)
+        client = service.add_client('Bob', 'b@example.com', '555')
+        service.deposit(client.id, 300)
+        self.reservation = service.add_reservation(client.id, 2, '2025-01-01', 2)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def check_views(self, service):
+        views = list(service.reservations.project('room_id', 'check_in'))
+        self.assertEqual([(v.id, v.room_id, v.check_in) for v in views], [(1, 2, '2025-01-01')])
+        with self.assertRaises(AttributeError):
+            views[0].nights
+        self.assertEqual(views[0].hydrate(), self.reservation)
+        prices = [(r.id, r.price_per_night) for r in service.rooms.project('price_per_night')]
+        self.assertEqual(prices, [(1, 50), (2, 100), (3, 200)])
+        payments = list(service.payments.project('kind'))
+        self.assertEqual([p.kind for p in payments], ['deposit', 'reservation_deposit'])
+        self.assertEqual(payments[1].hydrate(), service.payments.get(payments[1].id))
+        self.assertEqual(payments[1].hydrate().reservation_id, self.reservation.id)
+
+    def test_views_over_parsed_records(self):
+        uow = JsonUnitOfWork(self.path, keep_loaded=True)
+        self.check_views(make_service(self.path, uow))
+
+    def test_views_over_snapshot_rows(self):
+        self.check_views(make_service(self.path))
+
+    def test_unfinished_projection_does_not_hold_the_transaction(self):
+        service = make_service(self.path)
+        views = service.reservations.project('room_id')
+        next(views)
+        service.add_client('Al', 'a@example.com', '1')
+        views.close()
+        self.assertIsNotNone(make_service(self.path).clients.find_by_email('a@example.com'))
+
+    def test_unknown_field_is_rejected(self):
+        with self.assertRaises(ValueError):
+            make_service(self.path).rooms.project('price')
+
+    def test_entities_have_slots(self):
+        self.assertFalse(hasattr(self.reservation, '__dict__'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,151 @@
+import os
+import io
+import json
+import socket
+import asyncio
+import tempfile
+import threading
+import time
+import contextlib
+import unittest
+from unittest import mock
+from concurrent.futures import ThreadPoolExecutor
+
+from infrastructure import db
+from infrastructure.daemon_client import forward
+from infrastructure.log_store import LogUnitOfWork
+from infrastructure import repositories
+from infrastructure.repositories import init_schema
+from infrastructure.server import Daemon
+from tests.test_repositories import CountingUnitOfWork, make_service
+
+
+@unittest.skipUnless(hasattr(socket, 'AF_UNIX'), 'requires Unix sockets')
+class DaemonTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'database.json')
+        self.socket = os.path.join(self.tmp.name, 'hotel.sock')
+        init_schema(self.path)
+        self.uow = CountingUnitOfWork(self.path)
+        self.uow.keep_loaded = True
+        self.saved = db._service, db._uow
+        db._service, db._uow = make_service(self.path, self.uow), self.uow
+        self.loop = asyncio.new_event_loop()
+        self.daemon = Daemon(self.socket)
+        self.loop.run_until_complete(self.daemon.start())
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    def tearDown(self):
+        asyncio.run_coroutine_threadsafe(self.daemon.close(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+        db._service, db._uow = self.saved
+        self.tmp.cleanup()
+
+    def run_remote(self, argv):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            status = forward(argv, self.socket)
+        return status, out.getvalue()
+
+    def test_commands_run_on_daemon(self):
+        load = mock.patch.object(repositories, '_load', wraps=repositories._load)
+        self.addCleanup(load.stop)
+        parses = load.start()
+        status, output = self.run_remote(['add-client', '--name', 'Bob', '--email', 'b@example.com', '--phone', '5'])
+        self.assertEqual(status, 0)
+        self.assertIn('Client added with id 1', output)
+        _, output = self.run_remote(['add-client', '--name', 'Bob', '--email', 'b@example.com', '--phone', '5'])
+        self.assertIn('client already exists', output)
+        _, output = self.run_remote(['list-rooms'])
+        self.assertIn('Single bed', output)
+        with open(self.path, 'r', encoding='utf-8') as f:
+            self.assertEqual(len(json.load(f)['clients']), 1)
+        self.assertEqual(parses.call_count, 1)
+
+    def test_concurrent_clients_are_serialized(self):
+        def add(i):
+            return self.run_remote(['add-client', '--name', f'C{i}', '--email', f'c{i}@example.com',
+                                    '--phone', '0'])[0]
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            self.assertEqual(set(pool.map(add, range(40))), {0})
+        with open(self.path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        self.assertEqual(sorted(c['id'] for c in data['clients'].values()), list(range(1, 41)))
+
+    def test_queued_requests_are_committed_together(self):
+        release = threading.Event()
+        batches = []
+        run_batch = self.daemon._run_batch
+
+        def blocked(batch):
+            batches.append(len(batch))
+            release.wait(10)
+            return run_batch(batch)
+        self.daemon._run_batch = blocked
+
+        def add(i):
+            return self.run_remote(['add-client', '--name', f'C{i}', '--email', f'c{i}@example.com',
+                                    '--phone', '0'])[0]
+        with ThreadPoolExecutor(max_workers=40) as pool:
+            first = pool.submit(add, 0)
+            while not batches:
+                time.sleep(0.01)
+            # The worker is blocked on the first request: the others queue up behind it.
+            rest = [pool.submit(add, i) for i in range(1, 40)]
+            deadline = time.monotonic() + 10
+            while self.daemon._queue.qsize() < 39 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            release.set()
+            self.assertEqual({first.result(), *(f.result() for f in rest)}, {0})
+        self.assertEqual(batches, [1, 39])
+        self.assertEqual(self.uow.writes, 2)
+        with open(self.path, 'r', encoding='utf-8') as f:
+            self.assertEqual(len(json.load(f)['clients']), 40)
+
+    def test_compact_runs_after_the_group_commit(self):
+        path = os.path.join(self.tmp.name, 'log.json')
+        init_schema(path)
+        uow = LogUnitOfWork(path)
+        self.daemon.service = db._service = make_service(path, uow)
+        db._uow = uow
+        results = self.daemon._run_batch([['add-client', '--name', 'Bob', '--email', 'b@example.com', '--phone', '5'],
+                                          ['compact']])
+        self.assertEqual([r['status'] for r in results], [0, 0])
+        self.assertIn('Database compacted', results[1]['stdout'])
+        self.assertEqual(os.path.getsize(uow.log_path), 0)
+        with open(path, 'r', encoding='utf-8') as f:
+            self.assertEqual(len(json.load(f)['clients']), 1)
+
+    def test_archive_policy_runs_on_start(self):
+        other = os.path.join(self.tmp.name, 'other.sock')
+        with mock.patch.dict(os.environ, {'HOTEL_ARCHIVE_DAYS': '30'}), \
+                mock.patch.object(db, 'archive', return_value={'reservations': 2, 'payments': 5}) as archive:
+            daemon = Daemon(other)
+            asyncio.run_coroutine_threadsafe(daemon.start(), self.loop).result()
+            try:
+                # Requests are served in order: the archive run queued at start-up comes first.
+                with contextlib.redirect_stdout(io.StringIO()):
+                    self.assertEqual(forward(['list-rooms'], other), 0)
+            finally:
+                asyncio.run_coroutine_threadsafe(daemon.close(), self.loop).result()
+        archive.assert_called_once_with(None)
+
+    def test_no_daemon_falls_back(self):
+        self.assertIsNone(forward(['list-rooms'], os.path.join(self.tmp.name, 'missing.sock')))
+        self.assertIsNone(forward(['serve'], self.socket))
+        self.assertIsNone(forward(['--db', 'other.json', 'list-rooms'], self.socket))
+        self.assertIsNone(forward(['--storage=sqlite', 'list-rooms'], self.socket))
+        # The daemon serves its own database: one named by the environment is not it.
+        for name, value in (('HOTEL_DB', os.path.join(self.tmp.name, 'other.json')), ('HOTEL_STORAGE', 'sqlite')):
+            with mock.patch.dict(os.environ, {name: value}):
+                self.assertIsNone(forward(['list-rooms'], self.socket))
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(forward(['list-rooms'], self.socket), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
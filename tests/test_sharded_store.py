@@ -0,0 +1,172 @@
+import os
+import json
+import tempfile
+import unittest
+from unittest import mock
+
+from domain.services import ReservationService
+from infrastructure import sharded_store
+from infrastructure.repositories import (
+    init_schema as init_json_schema,
+    JsonClientRepository,
+    JsonRoomRepository,
+    JsonPaymentRepository,
+)
+from infrastructure.sharded_store import (
+    MANIFEST,
+    ShardedReservationRepository,
+    ShardedUnitOfWork,
+    convert_from_json,
+    init_schema,
+)
+from tests.test_repositories import make_service as make_json_service
+
+
+def make_service(path, uow=None):
+    uow = uow or ShardedUnitOfWork(path)
+    return ReservationService(JsonClientRepository(uow), JsonRoomRepository(uow),
+                              ShardedReservationRepository(uow), JsonPaymentRepository(uow), uow)
+
+
+class ShardedStoreTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'database.d')
+        init_schema(self.path)
+        self.service = make_service(self.path)
+        self.client = self.service.add_client('Bob', 'b@example.com', '555')
+        self.service.deposit(self.client.id, 300)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def manifest(self):
+        with open(os.path.join(self.path, MANIFEST), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def loaded(self, call):
+        """Names of the shards parsed while running call."""
+        names = []
+        load = sharded_store._load
+
+        def counting(path):
+            names.append(os.path.basename(path).rsplit('.', 2)[0])
+            return load(path)
+        with mock.patch.object(sharded_store, '_load', side_effect=counting):
+            call()
+        return [n for n in names if n != 'MANIFEST']
+
+    def test_reservation_flow(self):
+        reservation = self.service.add_reservation(self.client.id, 2, '2025-01-01', 2)
+        self.service.confirm_reservation(reservation.id)
+        service = make_service(self.path)
+        self.assertEqual(service.clients.get(self.client.id).wallet, 100)
+        self.assertTrue(service.reservations.get(reservation.id).confirmed)
+        self.assertEqual(service.wallet_balance(self.client.id).amount, 100)
+        self.assertEqual([r.id for r in service.find_available_rooms('2025-01-02', 1)], [1, 3])
+        with self.assertRaises(ValueError):
+            service.add_reservation(self.client.id, 2, '2025-01-02', 1)
+
+    def test_deposit_rewrites_only_its_shards(self):
+        self.service.add_reservation(self.client.id, 2, '2025-01-01', 2)
+        before = self.manifest()['shards']
+        self.service.deposit(self.client.id, 10)
+        after = self.manifest()['shards']
+        changed = sorted(n for n in after if after[n] != before.get(n))
+        self.assertEqual(changed, ['clients', 'locators.payments.03', 'payments.01'])
+
+    def test_list_rooms_reads_only_rooms(self):
+        self.service.add_reservation(self.client.id, 2, '2025-01-01', 2)
+        self.assertEqual(self.loaded(self.service.list_rooms), ['rooms'])
+
+    def test_old_files_are_collected(self):
+        for _ in range(3):
+            self.service.deposit(self.client.id, 1)
+        clients = sorted(f for f in os.listdir(self.path) if f.startswith('clients.'))
+        self.assertEqual(len(clients), 2)
+        self.assertIn(self.manifest()['shards']['clients'], clients)
+
+    def test_crash_before_manifest_swap_keeps_previous_state(self):
+        save = sharded_store._save
+
+        def crash(data, path):
+            if path.endswith(MANIFEST):
+                raise OSError('disk full')
+            save(data, path)
+        with mock.patch.object(sharded_store, '_save', side_effect=crash):
+            with self.assertRaises(OSError):
+                self.service.add_reservation(self.client.id, 2, '2025-01-01', 2)
+        service = make_service(self.path)
+        self.assertEqual(service.clients.get(self.client.id).wallet, 300)
+        self.assertEqual(service.reservations.list(), [])
+        service.add_reservation(self.client.id, 2, '2025-01-01', 2)
+        self.assertEqual(make_service(self.path).clients.get(self.client.id).wallet, 200)
+
+    def test_rollback_restores_shards(self):
+        uow = ShardedUnitOfWork(self.path, keep_loaded=True)
+        service = make_service(self.path, uow)
+        with self.assertRaises(RuntimeError):
+            with uow:
+                service.add_reservation(self.client.id, 2, '2025-01-01', 2)
+                raise RuntimeError('abort')
+        self.assertEqual(service.clients.get(self.client.id).wallet, 300)
+        self.assertEqual(service.reservations.list(), [])
+        self.assertEqual(len(list(service.payment_history(self.client.id))), 1)
+
+    def test_conflicting_commit_is_refused(self):
+        uow = ShardedUnitOfWork(self.path)
+        service = make_service(self.path, uow)
+        with self.assertRaises(ValueError):
+            with uow:
+                service.deposit(self.client.id, 5)
+                self.service.deposit(self.client.id, 7)
+        self.assertEqual(make_service(self.path).clients.get(self.client.id).wallet, 307)
+
+    def test_shard_collected_under_a_long_transaction(self):
+        uow = ShardedUnitOfWork(self.path)
+        service = make_service(self.path, uow)
+        with self.assertRaisesRegex(ValueError, 'changed by another process'):
+            with uow:
+                service.list_rooms()
+                self.service.deposit(self.client.id, 5)
+                self.service.deposit(self.client.id, 7)
+                service.clients.get(self.client.id)
+        self.assertEqual(service.clients.get(self.client.id).wallet, 312)
+
+    def test_streaming_read_parses_each_shard_once(self):
+        ids = [self.service.add_reservation(self.client.id, room, '2025-01-01', 1).id for room in (1, 2, 3)]
+        load = mock.patch.object(sharded_store, '_load', wraps=sharded_store._load)
+        with load as parses, mock.patch('infrastructure.repositories.CHUNK', 1):
+            found = [r.id for r in self.service.query_reservations()]
+        self.assertEqual(found, ids)
+        shards = [c.args[0] for c in parses.call_args_list if not c.args[0].endswith(MANIFEST)]
+        self.assertEqual(len(shards), len(set(shards)))
+
+
+class ConvertTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.json_path = os.path.join(self.tmp.name, 'database.json')
+        self.path = os.path.join(self.tmp.name, 'database.d')
+        init_json_schema(self.json_path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_convert_keeps_data_and_ids(self):
+        service = make_json_service(self.json_path)
+        client = service.add_client('Zoé', 'z@example.com', '555')
+        service.deposit(client.id, 300, 'USD')
+        reservation = service.add_reservation(client.id, 3, '2025-01-01', 1)
+
+        counts = convert_from_json(self.json_path, self.path)
+        self.assertEqual(counts['clients'], 1)
+        self.assertEqual(counts['payments'], 2)
+        sharded = make_service(self.path)
+        self.assertEqual(sharded.clients.find_by_email('z@example.com').wallet,
+                         service.clients.get(client.id).wallet)
+        self.assertEqual(sharded.reservations.get(reservation.id).room_id, 3)
+        self.assertEqual(len(list(sharded.payment_history(client.id))), 2)
+        self.assertEqual(sharded.add_client('Al', 'a@example.com', '1').id, 2)
+        with self.assertRaises(ValueError):
+            convert_from_json(self.json_path, self.path)
@@ -0,0 +1,62 @@
+import os
+import json
+import tempfile
+import unittest
+
+from infrastructure.repositories import init_schema, JsonUnitOfWork
+from infrastructure.snapshot import Snapshot, snapshot_path
+from tests.test_repositories import CountingUnitOfWork, make_service
+
+
+class SnapshotTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'database.json')
+        init_schema(self.path)
+        service = make_service(self.path)
+        client = service.add_client('Zoé', 'z@example.com', '555')
+        service.deposit(client.id, 300, 'USD')
+        service.add_reservation(client.id, 2, '2025-01-01', 2)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_snapshot_matches_document(self):
+        with open(self.path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        self.assertEqual(data['generation'], 3)
+        snapshot = Snapshot(snapshot_path(self.path))
+        try:
+            self.assertEqual(snapshot.generation, 3)
+            for name in ('clients', 'rooms', 'reservations', 'payments'):
+                self.assertEqual(snapshot.records(name), list(data[name].values()))
+            self.assertEqual(snapshot.find('payments', 2), data['payments']['2'])
+            self.assertIsNone(snapshot.find('clients', 99))
+        finally:
+            snapshot.close()
+
+    def test_reads_skip_the_json_parse(self):
+        uow = CountingUnitOfWork(self.path)
+        service = make_service(self.path, uow)
+        self.assertEqual(len(service.list_rooms()), 3)
+        self.assertEqual(service.clients.get(1).full_name, 'Zoé')
+        self.assertEqual(service.reservations.get(1).room_id, 2)
+        self.assertEqual(uow.reads, 0)
+
+    def test_stale_snapshot_falls_back_to_json(self):
+        make_service(self.path, JsonUnitOfWork(self.path, snapshot=False)).add_client('Al', 'a@example.com', '1')
+        uow = CountingUnitOfWork(self.path)
+        service = make_service(self.path, uow)
+        self.assertEqual(service.clients.get(2).full_name, 'Al')
+        self.assertEqual(uow.reads, 1)
+
+    def test_corrupt_snapshot_falls_back_to_json(self):
+        with open(snapshot_path(self.path), 'wb') as f:
+            f.write(b'garbage')
+        uow = CountingUnitOfWork(self.path)
+        self.assertEqual(make_service(self.path, uow).clients.get(1).email, 'z@example.com')
+        self.assertEqual(uow.reads, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,150 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from domain.services import ReservationService
+from infrastructure import db, sqlite_repositories
+from infrastructure.repositories import init_schema as init_json_schema
+from infrastructure.sqlite_repositories import (
+    init_schema,
+    migrate_from_json,
+    SqliteClientRepository,
+    SqliteRoomRepository,
+    SqliteReservationRepository,
+    SqlitePaymentRepository,
+    SqliteUnitOfWork,
+)
+from tests.test_repositories import make_service as make_json_service
+
+
+def make_service(path):
+    uow = SqliteUnitOfWork(path)
+    return ReservationService(SqliteClientRepository(uow), SqliteRoomRepository(uow),
+                              SqliteReservationRepository(uow), SqlitePaymentRepository(uow), uow)
+
+
+class SqliteRepositoryTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'database.sqlite3')
+        init_schema(self.path)
+        self.service = make_service(self.path)
+
+    def tearDown(self):
+        self.service.uow.close()
+        self.tmp.cleanup()
+
+    def test_reservation_flow(self):
+        client = self.service.add_client('Bob', 'b@example.com', '555')
+        self.assertEqual(self.service.deposit(client.id, 120, 'USD'), 108)
+        reservation = self.service.add_reservation(client.id, 1, '2025-01-01', 2)
+        self.assertEqual(reservation.id, 1)
+        with self.assertRaises(ValueError):
+            self.service.add_reservation(client.id, 1, '2025-01-02', 2)
+        self.service.confirm_reservation(reservation.id)
+        self.assertTrue(self.service.reservations.get(reservation.id).confirmed)
+        self.assertAlmostEqual(self.service.clients.get(client.id).wallet, 8)
+        kinds = [p.kind for p in self.service.payments.list_for_client(client.id)]
+        self.assertEqual(kinds, ['deposit', 'reservation_deposit', 'reservation_balance'])
+        self.assertEqual([r.id for r in self.service.find_available_rooms('2025-01-01', 1)], [2, 3])
+        self.service.cancel_reservation(reservation.id)
+        self.assertEqual(self.service.reservations.list(), [])
+
+    def test_group_reservation(self):
+        client = self.service.add_client('Bob', 'b@example.com', '555')
+        self.service.deposit(client.id, 500)
+        self.service.add_reservation(client.id, 2, '2025-01-03', 2)
+        self.assertEqual(self.service.reservations.booked_rooms([1, 2, 3], '2025-01-01', 3), {2})
+        with self.assertRaises(ValueError):
+            self.service.reserve_group(client.id, [1, 2], '2025-01-01', 3)
+        self.assertEqual(len(self.service.reservations.list()), 1)
+        reservations = self.service.reserve_group(client.id, [1, 3], '2025-01-01', 3)
+        self.assertEqual([r.room_id for r in reservations], [1, 3])
+        self.assertAlmostEqual(self.service.clients.get(client.id).wallet, 25)
+
+    def test_projection(self):
+        client = self.service.add_client('Bob', 'b@example.com', '555')
+        self.service.deposit(client.id, 100)
+        views = list(self.service.clients.project('email'))
+        self.assertEqual([(v.id, v.email) for v in views], [(1, 'b@example.com')])
+        self.assertEqual(views[0].hydrate().wallet, 100)
+        self.assertEqual([(p.amount, p.currency) for p in self.service.payments.project('amount', 'currency')],
+                         [(100, 'EUR')])
+
+    def test_unfinished_projection_does_not_hold_the_transaction(self):
+        self.service.add_client('Bob', 'b@example.com', '555')
+        views = self.service.clients.project('email')
+        next(views)
+        self.service.add_client('Al', 'a@example.com', '1')
+        views.close()
+        other = make_service(self.path)
+        self.assertIsNotNone(other.clients.find_by_email('a@example.com'))
+        other.uow.close()
+
+    def test_projection_reads_in_chunks(self):
+        with mock.patch.object(sqlite_repositories, 'CHUNK', 2):
+            for i in range(5):
+                self.service.add_client('C', f'c{i}@example.com', '0')
+            self.assertEqual([v.id for v in self.service.clients.project()], [1, 2, 3, 4, 5])
+
+    def test_scan_leaves_the_transaction_between_rows(self):
+        client = self.service.add_client('Bob', 'b@example.com', '555')
+        self.service.deposit(client.id, 100)
+        rows = self.service.payments.scan()
+        self.assertEqual(next(rows)[1:], (100, 'EUR', 'deposit'))
+        self.service.add_client('Al', 'a@example.com', '1')
+        rows.close()
+        other = make_service(self.path)
+        self.assertIsNotNone(other.clients.find_by_email('a@example.com'))
+        other.uow.close()
+
+    def test_duplicate_email_rejected(self):
+        self.service.add_client('Alice', 'a@example.com', '123')
+        with self.assertRaises(ValueError):
+            self.service.add_client('Alice', 'a@example.com', '123')
+        self.assertEqual(self.service.add_client('Bob', 'b@example.com', '555').id, 2)
+
+    def test_lock_held_by_another_writer(self):
+        with mock.patch.object(sqlite_repositories, 'BUSY_TIMEOUT', 50):
+            holder = make_service(self.path)
+            other = make_service(self.path)
+            try:
+                with holder.uow:
+                    holder.add_client('Bob', 'b@example.com', '555')
+                    with self.assertRaisesRegex(ValueError, 'locked by another process'):
+                        other.add_client('Al', 'a@example.com', '1')
+                self.assertEqual(other.add_client('Al', 'a@example.com', '1').id, 2)
+            finally:
+                holder.uow.close()
+                other.uow.close()
+
+    def test_module_service_takes_the_write_lock_up_front(self):
+        db.configure('sqlite', self.path)
+        try:
+            self.assertTrue(db._get_service().uow.immediate)
+        finally:
+            db._get_service().uow.close()
+            db.configure()
+
+    def test_migrate_from_json(self):
+        json_path = os.path.join(self.tmp.name, 'database.json')
+        init_json_schema(json_path)
+        json_service = make_json_service(json_path)
+        client = json_service.add_client('Bob', 'b@example.com', '555')
+        json_service.deposit(client.id, 200)
+        reservation = json_service.add_reservation(client.id, 2, '2025-06-01', 1)
+        json_service.cancel_reservation(reservation.id)
+        target = os.path.join(self.tmp.name, 'migrated.sqlite3')
+        counts = migrate_from_json(json_path, target)
+        self.assertEqual(counts, {'clients': 1, 'rooms': 3, 'reservations': 0, 'payments': 2})
+        service = make_service(target)
+        self.assertEqual(service.clients.find_by_email('b@example.com').wallet, 150)
+        self.assertEqual(service.add_reservation(client.id, 2, '2025-06-01', 1).id, 2)
+        service.uow.close()
+        with self.assertRaises(ValueError):
+            migrate_from_json(json_path, target)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from domain.value_objects import Money
+from infrastructure.repositories import init_schema
+from infrastructure.sqlite_repositories import init_schema as init_sqlite_schema
+from infrastructure.transfer import Importer, export_collection, read_rows
+from tests.test_repositories import CountingUnitOfWork, make_service
+from tests.test_sqlite_repositories import make_service as make_sqlite_service
+
+CLIENTS = """id,full_name,email,phone,wallet
+7,Alice,a@example.com,123,100
+8,Bob,b@example.com,555,
+9,Bobby,b@example.com,556,
+"""
+
+RESERVATIONS = [
+    {'id': 1, 'client_id': 7, 'room_id': 2, 'check_in': '2025-05-01', 'nights': 3},
+    {'id': 2, 'client_id': 8, 'room_id': 2, 'check_in': '2025-05-03', 'nights': 1},
+    {'id': 3, 'client_id': 9, 'room_id': 1, 'check_in': '2025-05-03', 'nights': 1},
+    {'id': 4, 'client_id': 8, 'room_id': 42, 'check_in': '2025-05-03', 'nights': 1},
+    {'id': 5, 'client_id': 8, 'room_id': 1, 'check_in': '2025-05-03', 'nights': 1, 'confirmed': True},
+]
+
+
+def jsonl(rows):
+    return io.StringIO(''.join(json.dumps(r) + '\n' for r in rows))
+
+
+class TransferTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'database.json')
+        init_schema(self.path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_import_validates_rows_and_writes_once(self):
+        uow = CountingUnitOfWork(self.path)
+        service = make_service(self.path, uow)
+        importer = Importer(service)
+        errors = io.StringIO()
+        importer.load('clients', read_rows(io.StringIO(CLIENTS), 'csv'), errors)
+        importer.load('reservations', read_rows(jsonl(RESERVATIONS), 'jsonl'), errors)
+        payments = [{'client_id': 7, 'reservation_id': 1, 'amount': 150, 'kind': 'reservation_deposit'},
+                    {'client_id': 7, 'reservation_id': 2, 'amount': 10, 'kind': 'deposit'}, 'not json']
+        importer.load('payments', ((n, json.dumps(p)) for n, p in enumerate(payments, 1)), errors)
+        self.assertEqual(importer.counts, {'clients': 2, 'rooms': 0, 'reservations': 2, 'payments': 1})
+        self.assertEqual(errors.getvalue().splitlines(), [
+            "clients line 4: client 'b@example.com' already exists",
+            'reservations line 2: room 2 is already booked for those dates',
+            'reservations line 3: unknown client id 9',
+            'reservations line 4: unknown room id 42',
+            'payments line 2: unknown reservation id 2',
+            'payments line 3: row must be a JSON object',
+        ])
+        self.assertEqual(uow.writes, 3)
+        self.assertEqual(service.clients.find_by_email('a@example.com').wallet, 100)
+        confirmed, = [r for r in service.reservations.list() if r.confirmed]
+        self.assertEqual((confirmed.client_id, confirmed.room_id, confirmed.total_amount), (2, 1, Money(50)))
+
+    def test_payments_keep_the_ledger_order(self):
+        service = make_service(self.path)
+        client = service.add_client('Bob', 'b@example.com', '555')
+        errors = io.StringIO()
+        payments = [
+            {'client_id': client.id, 'amount': 100, 'kind': 'deposit', 'created_at': '2025-03-01T10:00:00'},
+            {'client_id': client.id, 'amount': 20, 'kind': 'deposit', 'created_at': '2024-01-01'},
+            {'client_id': client.id, 'amount': 5, 'kind': 'deposit', 'created_at': 'not a date'},
+            {'client_id': client.id, 'amount': 30, 'kind': 'reservation_deposit', 'created_at': '2025-03-01'},
+            {'client_id': client.id, 'amount': 10, 'kind': 'reservation_deposit', 'created_at': '2025-04-01'},
+        ]
+        Importer(service).load('payments', read_rows(jsonl(payments), 'jsonl'), errors)
+        self.assertEqual(errors.getvalue().splitlines(), [
+            'payments line 2: payment recorded before payment 1 of the client; import payments oldest first',
+            "payments line 3: invalid timestamp 'not a date'",
+            'payments line 4: payment recorded before payment 1 of the client; import payments oldest first',
+        ])
+        self.assertEqual([p.created_at for p in service.payment_history(client.id, '2024-06-01')],
+                         ['2025-03-01T10:00:00', '2025-04-01T00:00:00'])
+        # The client was already in the database: the payments moved its wallet.
+        self.assertEqual(service.clients.get(client.id).wallet, 90)
+        self.assertTrue(service.verify_wallet(client.id))
+
+    def test_imported_clients_without_ids_keep_their_wallet(self):
+        service = make_service(self.path)
+        importer = Importer(service)
+        importer.load('clients', read_rows(io.StringIO('full_name,email,phone,wallet\nAl,a@example.com,1,100\n'),
+                                           'csv'), io.StringIO())
+        payments = [{'client_id': 1, 'amount': 100, 'kind': 'deposit', 'created_at': '2025-03-01'}]
+        importer.load('payments', read_rows(jsonl(payments), 'jsonl'), io.StringIO())
+        self.assertEqual(service.clients.get(1).wallet, 100)
+        self.assertTrue(service.verify_wallet(1))
+
+    def test_stop_on_error(self):
+        importer = Importer(make_service(self.path), stop_on_error=True)
+        importer.load('clients', read_rows(io.StringIO(CLIENTS + 'x,Carol,c@example.com,1,\n'), 'csv'),
+                      io.StringIO())
+        self.assertTrue(importer.stopped)
+        self.assertEqual(importer.counts['clients'], 2)
+
+    def test_export_round_trip(self):
+        service = make_service(self.path)
+        client = service.add_client('Bob', 'b@example.com', '555')
+        service.deposit(client.id, 120, 'USD')
+        room = service.add_room('loft', 80, 'Top floor')
+        reservation = service.add_reservation(client.id, room.id, '2025-03-01', 1)
+        service.confirm_reservation(reservation.id)
+        exported = {}
+        for collection, fmt in [('clients', 'csv'), ('rooms', 'jsonl'), ('reservations', 'csv'),
+                                ('payments', 'jsonl')]:
+            out = io.StringIO()
+            export_collection(service, collection, out, fmt)
+            exported[collection] = (out.getvalue(), fmt)
+        self.assertEqual(exported['reservations'][0].splitlines(), [
+            'id,client_id,room_id,check_in,nights,total_amount,confirmed', '1,1,4,2025-03-01,1,80.0,True'])
+
+        target = os.path.join(self.tmp.name, 'copy.sqlite3')
+        init_sqlite_schema(target)
+        copy = make_sqlite_service(target)
+        importer = Importer(copy)
+        for collection, (text, fmt) in exported.items():
+            importer.load(collection, read_rows(io.StringIO(text), fmt), io.StringIO())
+        self.assertEqual(importer.failures, 0)
+        reservation, = copy.reservations.list()
+        self.assertEqual((reservation.room_id, reservation.confirmed), (7, True))
+        self.assertEqual(copy.rooms.get(7).room_type, 'loft')
+        self.assertEqual([(p.kind, p.amount.amount, p.reservation_id) for p in copy.payments.list()],
+                         [('deposit', 120, None), ('reservation_deposit', 40, reservation.id),
+                          ('reservation_balance', 40, reservation.id)])
+        self.assertTrue(copy.verify_wallet(reservation.client_id))
+        copy.uow.close()
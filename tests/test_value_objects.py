@@ -0,0 +1,41 @@
+import unittest
+from unittest import mock
+
+from domain import value_objects
+from domain.value_objects import Money, Currency, convert_many
+
+
+class MoneyTestCase(unittest.TestCase):
+    def test_minor_units(self):
+        self.assertEqual(Money(10.29).minor, 1029)
+        self.assertEqual(Money(1500.4, Currency.JPY).minor, 1500)
+        self.assertEqual(Money(0.1) + Money(0.2), Money(0.3))
+        self.assertEqual((Money(0.1) + Money(0.2)).amount, 0.3)
+
+    def test_immutable(self):
+        with self.assertRaises(AttributeError):
+            Money(1).minor = 5
+        self.assertFalse(hasattr(Money(1), '__dict__'))
+
+    def test_arithmetic_requires_same_currency(self):
+        with self.assertRaises(ValueError):
+            Money(1) + Money(1, Currency.USD)
+        self.assertEqual(Money(50) * 3 / 2, Money(75))
+        self.assertTrue(Money(10) < Money(10.01))
+
+    def test_convert_to(self):
+        self.assertEqual(Money(120, Currency.USD).convert_to(Currency.EUR), Money(108))
+        self.assertEqual(Money(10000, Currency.JPY).convert_to(Currency.GBP), Money(60.87, Currency.GBP))
+        self.assertEqual(Money(1, Currency.EUR).convert_to(Currency.JPY), Money(143, Currency.JPY))
+
+    def test_convert_many_matches_convert_to(self):
+        amounts = [120, 10000, 1, 33.33, 5]
+        currencies = ['USD', 'JPY', 'EUR', Currency.GBP, 'CHF']
+        expected = [Money(a, c).convert_to(Currency.USD).amount for a, c in zip(amounts, currencies)]
+        self.assertEqual(list(convert_many(amounts, currencies, Currency.USD)), expected)
+        with mock.patch.object(value_objects, 'np', None):
+            self.assertEqual(convert_many(amounts, currencies, 'USD'), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()